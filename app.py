@@ -1,23 +1,37 @@
-from flask import Flask, render_template, jsonify, send_from_directory, request
+from flask import Flask, Response, render_template, jsonify, send_from_directory, request
 from flask_cors import CORS, cross_origin
-import requests
 import os
 from dotenv import load_dotenv
 import traceback
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import numpy as np
-import json
 import random
-import time
-from functools import lru_cache
-import pandas as pd
 
 # Import our new gold price service
 from gold_api_service import gold_service
+from http_cache import ResponseCache, parse_timestamp, prebuilt_response
+from price_stream import PriceBroadcaster, parse_event_id
+from ws_feed import FeedHub, serve_client
+from http_session import get_session
+from indicator_engine import signals_from
+import indicators
+from resample import INTERVALS
+from downsample import point_budget
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket feed is optional
+    Sock = None
 
 # Load environment variables from .env file
 load_dotenv()
 
+# The background poller owns upstream price fetches so request handlers only
+# ever read the latest snapshot. It starts with the first data request rather
+# than at import, so a worker that only serves pages never loads the data stack.
+PRICE_POLLER_ENABLED = os.getenv('PRICE_POLLER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DATA_PATH_PREFIXES = ('/api/', '/get_', '/ws')
+
 # Initialize Flask app
 app = Flask(__name__, 
     template_folder=os.path.abspath(os.path.join(os.path.dirname(__file__), 'templates')))
@@ -25,26 +39,19 @@ app = Flask(__name__,
 # Configure CORS to allow requests from any origin for all endpoints
 CORS(app)
 
-# Cache for gold price
-price_cache = {
-    'price': None,
-    'timestamp': None,
-    'cache_duration': timedelta(minutes=1)
-}
+@app.before_request
+def start_poller_for_data_routes():
+    """Start the price poller on the first data request (no-op once running)"""
+    if PRICE_POLLER_ENABLED and request.path.startswith(DATA_PATH_PREFIXES):
+        gold_service.start_poller()
 
-# Cache for historical prices
-historical_cache = {
-    'prices': {},  # Use a dict to store multiple time periods
-    'timestamp': {},
-    'cache_duration': timedelta(minutes=5)
-}
+# Share the gold service's cache backend so every worker serves the same data
+cache = gold_service.cache
 
-# Cache for news
-news_cache = {
-    'news': None,
-    'timestamp': None,
-    'cache_duration': timedelta(minutes=5)
-}
+# Cache lifetimes in seconds
+PRICE_CACHE_TTL = 60
+HISTORICAL_CACHE_TTL = 5 * 60
+NEWS_CACHE_TTL = 5 * 60
 
 # Fallback news for testing when API is not available
 FALLBACK_NEWS = [
@@ -105,118 +112,35 @@ FALLBACK_NEWS = [
     }
 ]
 
-@lru_cache(maxsize=1)
-def get_cached_gold_price(timestamp_minute):
-    """Cache gold price for one minute to avoid hitting rate limits"""
-    return _get_gold_price_from_api()
+# Market stats served when the stats lookup itself fails
+FALLBACK_STATS = {
+    "day_range": {"low": 2640, "high": 2660},
+    "week_range": {"low": 2620, "high": 2680},
+    "week_52_range": {"low": 1800, "high": 2700},
+    "year_range": {"low": 1800, "high": 2700},
+    "current_price": 2650,
+    "source": "Fallback Data",
+    "success": False
+}
 
 def get_gold_price():
-    # Generate a timestamp based on the current minute to use as cache key
-    # This ensures we only call the API once per minute maximum
-    current_minute = int(time.time() / 60)
-    return get_cached_gold_price(current_minute)
+    """Get the gold price, calling the API at most once per minute across all workers"""
+    cached = cache.get_value('legacy_gold_price')
+    if cached is not None:
+        return tuple(cached)
+    
+    price, change, change_percent = _get_gold_price_from_api()
+    if price is not None:
+        cache.set('legacy_gold_price', (price, change, change_percent), PRICE_CACHE_TTL)
+    return price, change, change_percent
 
 def _get_gold_price_from_api():
     """Internal function that actually calls the API"""
     try:
-        # Try Yahoo Finance API first
-        try:
-            print("Trying Yahoo Finance API for gold price (primary source)")
-            url = "https://query1.finance.yahoo.com/v8/finance/chart/GC=F"
-            params = {
-                "interval": "1d",
-                "range": "1d"
-            }
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, params=params, headers=headers, timeout=5)  # 5 second timeout
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "chart" in data and "result" in data["chart"] and len(data["chart"]["result"]) > 0:
-                    # Get the last closing price
-                    result = data["chart"]["result"][0]
-                    if "indicators" in result and "quote" in result["indicators"] and len(result["indicators"]["quote"]) > 0:
-                        quote = result["indicators"]["quote"][0]
-                        if "close" in quote and quote["close"] and len(quote["close"]) > 0:
-                            price = round(float(quote["close"][-1]), 2)  # Get the last close price
-                            print(f"Successfully retrieved gold price from Yahoo Finance API: ${price}")
-                            
-                            # Get the previous day's close price (if available)
-                            change = None
-                            change_percent = None
-                            if len(quote["close"]) > 1:
-                                prev_price = float(quote["close"][0])  # First price in the day
-                                change = round(price - prev_price, 2)
-                                change_percent = round(change / prev_price * 100, 2)
-                            
-                            # Return a more complete response with change data if available
-                            return price, change, change_percent
-            
-            print("Yahoo Finance API failed or returned invalid data")
-        except Exception as e:
-            print(f"Yahoo Finance API error: {e}")
-        
-        # Fall back to Coinbase API
-        try:
-            print("Falling back to Coinbase API for gold price")
-            url = "https://api.coinbase.com/v2/exchange-rates?currency=USD"
-            response = requests.get(url, timeout=5)  # 5 second timeout
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "data" in data and "rates" in data["data"] and "XAU" in data["data"]["rates"]:
-                    # Convert rate to price per ounce (invert the ratio)
-                    xau_usd_rate = float(data["data"]["rates"]["XAU"])
-                    price = round(1 / xau_usd_rate, 2)  # Price per ounce
-                    print(f"Successfully retrieved gold price from Coinbase API: ${price}")
-                    return price, None, None  # No change data available
-            
-            print("Coinbase API failed or returned invalid data")
-        except Exception as e:
-            print(f"Coinbase API error: {e}")
-        
-        # Fall back to FCS API
-        try:
-            api_key = os.getenv('FCS_API_KEY')
-            if api_key:
-                print("Trying FCS API for gold price")
-                url = f'https://fcsapi.com/api-v3/forex/latest?symbol=XAU/USD&access_key={api_key}'
-                response = requests.get(url, timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if "response" in data and len(data["response"]) > 0:
-                        price = float(data["response"][0]["price"])
-                        print(f"Successfully retrieved gold price from FCS API: ${price}")
-                        return price, None, None  # No change data available
-                else:
-                    print(f"FCS API error: {response.status_code} - {response.text}")
-            else:
-                print("Skipping FCS API (no API key)")
-        except Exception as e:
-            print(f"FCS API error: {e}")
-        
-        # Fall back to Alpha Vantage
-        try:
-            api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
-            if api_key:
-                print("Trying Alpha Vantage API for gold price")
-                url = f'https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency=XAU&to_currency=USD&apikey={api_key}'
-                response = requests.get(url, timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    exchange_data = data.get("Realtime Currency Exchange Rate")
-                    if exchange_data and "5. Exchange Rate" in exchange_data:
-                        price = float(exchange_data["5. Exchange Rate"])
-                        print(f"Successfully retrieved gold price from Alpha Vantage: {price}")
-                        return price, None, None  # No change data available
-            
-            print("Alpha Vantage API failed")
-        except Exception as e:
-            print(f"Alpha Vantage API error: {e}")
+        # Same ranked, hedged provider chain the service polls
+        provider, quote = gold_service.price_fetcher.fetch()
+        if quote is not None:
+            return quote['price'], quote['change'], quote['change_percent']
         
         # If all APIs fail, return the current accurate price as a last resort
         print("All APIs failed - using current market price of $3,405.00")
@@ -228,15 +152,11 @@ def _get_gold_price_from_api():
         return None, None, None
 
 def get_historical_prices():
-    global historical_cache
-    
     # Check cache first
-    current_time = datetime.now()
-    if (historical_cache['prices'] is not None and 
-        historical_cache['timestamp'] is not None and 
-        current_time - historical_cache['timestamp'] < historical_cache['cache_duration']):
+    cached = cache.get_value('legacy_historical')
+    if cached is not None:
         print("Returning cached historical prices")
-        return historical_cache['prices']
+        return cached
     
     try:
         api_key = os.getenv('FCS_API_KEY')
@@ -248,7 +168,7 @@ def get_historical_prices():
         url = f'https://fcsapi.com/api-v3/forex/history?symbol=XAU/USD&period=1d&access_key={api_key}'
         print(f"Fetching historical prices from FCS API")
         
-        response = requests.get(url)
+        response = get_session().get(url)
         data = response.json()
         print(f"API Response: {data.keys()}")  # Debug: print available keys
         
@@ -282,8 +202,7 @@ def get_historical_prices():
             
             print(f"Successfully processed {len(prices)} price points")
             prices.sort(key=lambda x: x['date'])
-            historical_cache['prices'] = prices
-            historical_cache['timestamp'] = current_time
+            cache.set('legacy_historical', prices, HISTORICAL_CACHE_TTL)
             return prices
         else:
             print(f"Invalid response format: {data}")
@@ -340,10 +259,138 @@ def generate_fallback_prices():
     print("Last price:", fallback_prices[-1])  # Debug log
     
     # Update cache
-    historical_cache['prices'] = fallback_prices
-    historical_cache['timestamp'] = current_time
+    cache.set('legacy_historical', fallback_prices, HISTORICAL_CACHE_TTL)
     return fallback_prices
 
+def build_price_response(price_data):
+    """Shape a service price quote into the /api/gold/price response"""
+    response = {
+        'price': price_data['price'],
+        'change': price_data.get('change'),
+        'change_percent': price_data.get('change_percent'),
+        'timestamp': price_data['timestamp'],
+        'source': price_data.get('source', 'Unknown'),
+        'success': price_data.get('success', True),
+        'formatted': {
+            'price': f"{float(price_data['price']):.2f}",
+            'change': f"{float(price_data.get('change') or 0):.2f}",
+            'percent': f"{float(price_data.get('change_percent') or 0):.2f}"
+        }
+    }
+    
+    if not price_data.get('success', True):
+        response['message'] = price_data.get('message', 'Using fallback data')
+    
+    return response
+
+def build_stats_response(stats_data):
+    """Shape service market stats into the /api/gold/stats response"""
+    response = {
+        "day_range": stats_data.get('day_range', {"low": 2640, "high": 2660}),
+        "week_range": stats_data.get('week_range', {"low": 2620, "high": 2680}),
+        "year_range": stats_data.get('year_range', {"low": 1800, "high": 2700}),
+        "current_price": stats_data.get('current_price', 2650),
+        "source": stats_data.get('source', 'Unknown'),
+        "success": stats_data.get('success', True)
+    }
+    
+    # Legacy format support
+    response["week_52_range"] = response["year_range"]
+    
+    # Live day/week open, high, low, last and VWAP
+    if 'intraday' in stats_data:
+        response["intraday"] = stats_data['intraday']
+    
+    return response
+
+def bars_last_modified(payload):
+    """Time of the last bar in a historical or indicator payload (dates are UTC), or None"""
+    dates = payload.get('dates') or payload.get('columns', {}).get('dates')
+    if not dates and payload.get('prices'):
+        dates = [payload['prices'][-1]['date']]
+    try:
+        return datetime.fromisoformat(dates[-1]).replace(tzinfo=timezone.utc)
+    except (IndexError, TypeError, ValueError):
+        return None
+
+def stats_last_modified(stats_data):
+    """When the stats last changed: the shared entry's stored_at, or the quote time
+    of the latest live tick if the intraday ranges it moved are newer"""
+    entry = gold_service.cache.get('market_stats')
+    times = [datetime.fromtimestamp(entry.stored_at, timezone.utc)] if entry is not None else []
+    snapshot = gold_service.poller.snapshot()
+    if 'intraday' in stats_data and snapshot is not None:
+        times.append(parse_timestamp(snapshot.data.get('timestamp')))
+    times = [stamp for stamp in times if stamp is not None]
+    return max(times) if times else None
+
+# Encoded responses for the hot endpoints; each payload is serialized once per
+# refresh and handlers just return the prebuilt bytes
+response_cache = ResponseCache()
+
+# Live price ticks for /api/gold/stream subscribers
+price_broadcaster = PriceBroadcaster()
+
+def historical_topic(argument):
+    """(period, interval) of a `historical:<period>[:<interval>]` feed topic, or None if invalid"""
+    period, _, interval = (argument or '1M').partition(':')
+    interval = interval or '1d'
+    if period not in gold_service.period_days or interval not in INTERVALS:
+        return None
+    return period, interval
+
+def load_historical_topic(argument):
+    """Bar records of a `historical:<period>[:<interval>]` feed topic, in the endpoint's `prices` shape"""
+    period, interval = historical_topic(argument)
+    return gold_service.get_historical_prices(period, interval=interval)
+
+# Topic subscriptions for /ws clients; price is pushed by the poller, the other
+# topics are reloaded from the service caches while someone is subscribed
+feed_hub = FeedHub({
+    'price': lambda _: build_price_response(gold_service.get_current_price()),
+    'stats': lambda _: build_stats_response(gold_service.get_market_stats()),
+    'historical': lambda argument: load_historical_topic(argument)
+}, arguments={'historical': lambda argument: historical_topic(argument) is not None})
+
+def on_price_snapshot(snapshot):
+    """Encode a new price snapshot once and fan it out to stream subscribers"""
+    last_modified = parse_timestamp(snapshot.data['timestamp'])
+    prebuilt = response_cache.get('price', snapshot.data, build_price_response, last_modified)
+    # Ids come from the quote time, so they agree across workers for Last-Event-ID
+    event_id = int(last_modified.timestamp() * 1000) if last_modified else snapshot.version
+    price_broadcaster.publish(event_id, prebuilt.body)
+    feed_hub.publish('price', build_price_response(snapshot.data))
+
+gold_service.poller.add_listener(on_price_snapshot)
+if gold_service.poller.snapshot() is not None:
+    on_price_snapshot(gold_service.poller.snapshot())
+
+def historical_response_key(period, interval, columnar, max_points, method):
+    """Response cache key for one historical query"""
+    cache_key = f"historical:{period}:{interval}:{'columnar' if columnar else 'records'}"
+    if max_points is not None:
+        cache_key += f':{method}{point_budget(max_points)}'
+    return cache_key
+
+def load_news():
+    """Cached gold news, fetched on a miss; the fallback list if nothing is available"""
+    news_list = cache.get_value('news')
+    if news_list is None:
+        news_list = fetch_yahoo_finance_news()
+        if news_list:
+            cache.set('news', news_list, NEWS_CACHE_TTL)
+    if not news_list:
+        print("Using fallback news for /get_news endpoint")
+        news_list = FALLBACK_NEWS
+    return news_list
+
+def price_max_age():
+    """Seconds until the poller replaces the current price snapshot"""
+    age = gold_service.poller.snapshot_age()
+    if age is None:
+        return 0
+    return gold_service.poll_interval - age
+
 @app.route('/get_historical_prices')
 @app.route('/api/historical_prices')
 @app.route('/api/gold/historical')
@@ -351,11 +398,25 @@ def historical_prices():
     try:
         # Get period parameter for different time ranges (1D, 1W, 1M, 3M, 6M, 1Y)
         period = request.args.get('period', '1M')
+        # format=columnar returns {dates, open, high, low, close, volume} lists
+        columnar = request.args.get('format') == 'columnar'
+        # max_points caps the number of bars (downsample=lttb or ohlc)
+        max_points = request.args.get('max_points', type=int)
+        method = request.args.get('downsample', 'lttb')
+        # Bar interval: 1m, 5m, 15m, 1h, 4h, 1d (default) or 1w
+        interval = request.args.get('interval', '1d')
         
         # Use the new gold service
-        historical_data = gold_service.get_historical_prices(period)
-        
-        return jsonify(historical_data)
+        try:
+            historical_data = gold_service.get_historical_prices(period, columnar=columnar, max_points=max_points,
+                                                                 method=method, interval=interval)
+        except ValueError as e:
+            return jsonify({'error': True, 'message': str(e), 'prices': [], 'period': period}), 400
+        
+        cache_key = historical_response_key(period, interval, columnar, max_points, method)
+        return prebuilt_response(response_cache.get(cache_key, historical_data, last_modified=bars_last_modified),
+                                 max_age=gold_service.cache_duration,
+                                 stale_while_revalidate=gold_service.cache_duration)
     except Exception as e:
         print(f"Error in historical prices endpoint: {e}")
         traceback.print_exc()
@@ -374,33 +435,14 @@ def get_market_stats():
         # Use the new gold service
         stats_data = gold_service.get_market_stats()
         
-        # Format response to match expected structure
-        response = {
-            "day_range": stats_data.get('day_range', {"low": 2640, "high": 2660}),
-            "week_range": stats_data.get('week_range', {"low": 2620, "high": 2680}),
-            "year_range": stats_data.get('year_range', {"low": 1800, "high": 2700}),
-            "current_price": stats_data.get('current_price', 2650),
-            "source": stats_data.get('source', 'Unknown'),
-            "success": stats_data.get('success', True)
-        }
-        
-        # Legacy format support
-        response["week_52_range"] = response["year_range"]
-        
-        return jsonify(response)
+        return prebuilt_response(response_cache.get('stats', stats_data, build_stats_response, stats_last_modified),
+                                 max_age=gold_service.cache_duration,
+                                 stale_while_revalidate=gold_service.cache_duration)
     except Exception as e:
         print(f"Error in market stats: {e}")
         traceback.print_exc()
         # Fallback values if API fails
-        return jsonify({
-            "day_range": {"low": 2640, "high": 2660},
-            "week_range": {"low": 2620, "high": 2680},
-            "week_52_range": {"low": 1800, "high": 2700},
-            "year_range": {"low": 1800, "high": 2700},
-            "current_price": 2650,
-            "source": "Fallback Data",
-            "success": False
-        })
+        return jsonify(FALLBACK_STATS)
 
 @app.route('/get_gold_price')
 @app.route('/api/gold_price')
@@ -410,39 +452,52 @@ def gold_price():
         # Use the new gold service
         price_data = gold_service.get_current_price()
         
-        response = {
-            'price': price_data['price'],
-            'change': price_data.get('change'),
-            'change_percent': price_data.get('change_percent'),
-            'timestamp': price_data['timestamp'],
-            'source': price_data.get('source', 'Unknown'),
-            'success': price_data.get('success', True),
-            'formatted': {
-                'price': f"{float(price_data['price']):.2f}",
-                'change': f"{float(price_data.get('change', 0)):.2f}",
-                'percent': f"{float(price_data.get('change_percent', 0)):.2f}"
-            }
-        }
-        
-        if not price_data.get('success', True):
-            response['message'] = price_data.get('message', 'Using fallback data')
-        
-        return jsonify(response)
+        return prebuilt_response(response_cache.get('price', price_data, build_price_response,
+                                                    parse_timestamp(price_data['timestamp'])),
+                                 max_age=price_max_age(),
+                                 stale_while_revalidate=gold_service.poll_interval)
     except Exception as e:
         print(f"Error in gold price endpoint: {e}")
         traceback.print_exc()
         return jsonify({'error': True, 'message': 'Error retrieving gold price'})
 
+@app.route('/api/gold/stream')
+def price_stream():
+    """Stream live price updates as Server-Sent Events"""
+    last_event_id = parse_event_id(request.headers.get('Last-Event-ID')
+                                   or request.args.get('last_event_id'))
+    return Response(price_broadcaster.stream(last_event_id),
+                    mimetype='text/event-stream',
+                    headers={
+                        'Cache-Control': 'no-cache',
+                        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+                    })
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/ws')
+    def price_feed(ws):
+        """WebSocket feed: subscribe to price, stats and historical:<period>[:<interval>] topics"""
+        feed_hub.start_refresher(gold_service.cache_duration, skip={'price'})
+        serve_client(feed_hub, ws)
+
+@app.route('/api/gold/diagnostics')
+def diagnostics():
+    """Expose service health metrics such as the price snapshot age"""
+    diagnostics_data = gold_service.get_diagnostics()
+    diagnostics_data['responses'] = response_cache.get_metrics()
+    diagnostics_data['stream'] = price_broadcaster.get_metrics()
+    diagnostics_data['feed'] = feed_hub.get_metrics()
+    return jsonify(diagnostics_data)
+
 @app.route('/get_news')
 @cross_origin()
 def get_news_compat():
     """Endpoint for retrieving gold market news"""
     try:
         # Create a simplified response format that matches the expected structure
-        news_list = fetch_yahoo_finance_news()
-        if not news_list:
-            print("Using fallback news for /get_news endpoint")
-            news_list = FALLBACK_NEWS
+        news_list = load_news()
         
         # Simple format expected by frontend
         return jsonify({
@@ -471,7 +526,8 @@ def historical_signals():
             'message': 'No price data available'
         })
     
-    signals = get_trading_signals(prices)
+    # The legacy history is a list of {'date', 'price'} records
+    signals = get_trading_signals([p['price'] for p in prices])
     print(f"Generated {len(signals)} signals")  # Debug print
     
     return jsonify({
@@ -481,221 +537,37 @@ def historical_signals():
 
 # Simple function to generate trading signals based on price data
 def get_trading_signals(prices):
+    """Signals for the latest of a list of closing prices, with the same rules
+    and indicator definitions as the precomputed /get_signals"""
     if not prices or len(prices) < 14:
         return []
-        
-    signals = []
-    
-    # Simple Moving Average crossover
-    if len(prices) >= 50:
-        sma20 = np.mean(prices[-20:])
-        sma50 = np.mean(prices[-50:])
-        
-        if sma20 > sma50:
-            signals.append({
-                'type': 'SMA Crossover',
-                'signal': 'buy',
-                'strength': 'medium',
-                'description': '20-day SMA crossed above 50-day SMA',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif sma20 < sma50:
-            signals.append({
-                'type': 'SMA Crossover',
-                'signal': 'sell',
-                'strength': 'medium',
-                'description': '20-day SMA crossed below 50-day SMA',
-                'timestamp': datetime.now().isoformat()
-            })
-    
-    # RSI indicator
-    if len(prices) >= 14:
-        delta = np.diff(prices)
-        gain = np.zeros_like(delta)
-        loss = np.zeros_like(delta)
-        gain[delta > 0] = delta[delta > 0]
-        loss[delta < 0] = -delta[delta < 0]
-        avg_gain = np.mean(gain[-14:])
-        avg_loss = np.mean(loss[-14:])
-        
-        if avg_loss == 0:
-            rsi = 50
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        
-        if rsi < 30:
-            signals.append({
-                'type': 'RSI',
-                'signal': 'buy',
-                'strength': 'strong',
-                'description': f'RSI is oversold at {rsi:.2f}',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif rsi > 70:
-            signals.append({
-                'type': 'RSI',
-                'signal': 'sell',
-                'strength': 'strong',
-                'description': f'RSI is overbought at {rsi:.2f}',
-                'timestamp': datetime.now().isoformat()
-            })
-    
-    # Recent price action
-    if len(prices) >= 5:
-        recent_change = (prices[-1] - prices[-5]) / prices[-5] * 100
-        
-        if recent_change > 1.0:  # 1% increase
-            signals.append({
-                'type': 'Price Action',
-                'signal': 'sell',
-                'strength': 'weak',
-                'description': f'Price rose {recent_change:.2f}% in the last 5 periods',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif recent_change < -1.0:  # 1% decrease
-            signals.append({
-                'type': 'Price Action',
-                'signal': 'buy',
-                'strength': 'weak',
-                'description': f'Price fell {abs(recent_change):.2f}% in the last 5 periods',
-                'timestamp': datetime.now().isoformat()
-            })
-    
-    return signals
-
-def historical_prices(period='1M'):
-    """Get historical gold prices for a given time period
     
-    Args:
-        period: Time period (1D, 1W, 1M, 3M, 6M, 1Y)
-        
-    Returns:
-        Dictionary with historical price data
-    """
-    # Check if we have valid cached data for this period
-    if (period in historical_cache['prices'] and 
-        period in historical_cache['timestamp'] and
-        historical_cache['timestamp'][period] is not None and
-        datetime.now() - historical_cache['timestamp'][period] < historical_cache['cache_duration']):
-        print(f"Using cached historical prices for {period}")
-        return historical_cache['prices'][period]
-        
-    # Define time intervals based on period
-    intervals = {
-        '1D': {'count': 24, 'unit': 'hour'},
-        '1W': {'count': 7, 'unit': 'day'},
-        '1M': {'count': 30, 'unit': 'day'},
-        '3M': {'count': 90, 'unit': 'day'},
-        '6M': {'count': 180, 'unit': 'day'},
-        '1Y': {'count': 365, 'unit': 'day'}
+    closes = np.asarray(prices, dtype=float)
+    values = {
+        'sma20': indicators.sma(closes, 20)[-1],
+        'sma50': indicators.sma(closes, 50)[-1],
+        'rsi': indicators.rsi(closes)[-1]
     }
-    
-    # Default to 1M if period not recognized
-    if period not in intervals:
-        period = '1M'
-    
-    interval = intervals[period]
-    
-    try:
-        # Generate synthetic data for demonstration purposes
-        # In a real app, this would call an external API for historical data
-        now = datetime.now()
-        base_price = 3438.00
-        prices = []
-        
-        for i in range(interval['count']):
-            if interval['unit'] == 'hour':
-                point_time = now - timedelta(hours=i)
-            else:  # 'day'
-                point_time = now - timedelta(days=i)
-                
-            # Add some realistic price variation
-            variation = (random.random() - 0.5) * 10  # Up to +/- $5
-            trend = i * 0.05  # Slight uptrend as we go back in time
-            
-            price = base_price + variation - trend
-            
-            prices.append({
-                'date': point_time.strftime('%Y-%m-%d %H:%M'),
-                'price': round(price, 2),
-                'volume': random.randint(5000, 20000)
-            })
-        
-        # Reverse to get chronological order
-        prices.reverse()
-        
-        # Cache the results
-        result = {
-            'prices': prices,
-            'period': period
-        }
-        historical_cache['prices'][period] = result
-        historical_cache['timestamp'][period] = datetime.now()
-        
-        return result
-        
-    except Exception as e:
-        print(f"Error generating historical prices: {e}")
-        traceback.print_exc()
-        return {'error': True, 'message': str(e)}
+    values = {name: round(float(value), 2) if np.isfinite(value) else None for name, value in values.items()}
+    if len(closes) >= 5:
+        values['change_5'] = round(float((closes[-1] - closes[-5]) / closes[-5] * 100), 2)
+    return signals_from(values, datetime.now().isoformat())
 
 @app.route('/get_signals')
 def get_signals_endpoint():
     try:
-        # Get historical prices
-        period = request.args.get('period', '1M')
-        prices_data = historical_prices(period)
-        
-        if 'error' in prices_data:
+        # Indicators and signals are maintained incrementally as daily bars
+        # arrive; this only reads the latest precomputed values
+        latest = gold_service.get_signals()
+        if latest is None:
             return jsonify({
                 'error': True,
                 'message': 'Failed to fetch historical prices'
             }), 500
-            
-        # Extract price data for signal generation
-        prices = [float(item['price']) for item in prices_data['prices']]
-        
-        # Generate trading signals
-        signals = get_trading_signals(prices)
-        
-        # Calculate additional technical indicators
-        indicators = {}
-        if len(prices) >= 14:
-            # RSI
-            delta = np.diff(prices)
-            gain = np.zeros_like(delta)
-            loss = np.zeros_like(delta)
-            gain[delta > 0] = delta[delta > 0]
-            loss[delta < 0] = -delta[delta < 0]
-            avg_gain = np.mean(gain[-14:])
-            avg_loss = np.mean(loss[-14:])
-            
-            if avg_loss == 0:
-                rsi = 50
-            else:
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-            indicators['rsi'] = round(float(rsi), 2)
-            
-            # Moving Averages
-            if len(prices) >= 20:
-                indicators['sma20'] = round(float(np.mean(prices[-20:])), 2)
-            if len(prices) >= 50:
-                indicators['sma50'] = round(float(np.mean(prices[-50:])), 2)
-            
-            # Current price
-            indicators['current_price'] = round(float(prices[-1]), 2)
-            
-            # Market trend
-            if len(prices) >= 10:
-                recent_trend = prices[-1] - prices[-10]
-                indicators['trend'] = 'bullish' if recent_trend > 0 else 'bearish' if recent_trend < 0 else 'neutral'
-                indicators['trend_strength'] = abs(round(recent_trend / prices[-10] * 100, 2))
         
         return jsonify({
-            'signals': signals,
-            'indicators': indicators,
+            'signals': latest['signals'],
+            'indicators': latest['indicators'],
             'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
     except Exception as e:
@@ -706,6 +578,74 @@ def get_signals_endpoint():
             'message': str(e)
         }), 500
 
+@app.route('/api/gold/indicators')
+def indicator_series():
+    """Indicator series aligned with the historical dates, for chart overlays"""
+    period = request.args.get('period', '1M')
+    names = [name for name in request.args.get('names', 'sma20,sma50').split(',') if name]
+    try:
+        data = gold_service.get_indicator_series(period, names)
+    except ValueError as e:
+        return jsonify({'error': True, 'message': str(e), 'available': list(indicators.AVAILABLE)}), 400
+    if data is None:
+        return jsonify({'error': True, 'message': 'Failed to fetch historical prices'}), 500
+    
+    return prebuilt_response(response_cache.get(f"indicators:{period}:{','.join(names)}", data,
+                                                last_modified=bars_last_modified),
+                             max_age=gold_service.cache_duration,
+                             stale_while_revalidate=gold_service.cache_duration)
+
+@app.route('/api/gold/backtest')
+def backtest_rules():
+    """Backtest a signal rule over the stored history; query args are backtest params"""
+    params = request.args.to_dict()
+    interval = params.pop('interval', '1d')
+    if interval not in INTERVALS:
+        return jsonify({'error': True, 'message': f'Unsupported interval: {interval}'}), 400
+    try:
+        result = gold_service.run_backtest(params, interval)
+    except ValueError as e:
+        return jsonify({'error': True, 'message': str(e)}), 400
+    if result is None:
+        return jsonify({'error': True, 'message': 'Failed to fetch historical prices'}), 500
+    
+    # Encoded once per result object; the service reuses it until the data changes
+    return prebuilt_response(response_cache.get(f"backtest:{interval}:{result['params']['rule']}", result),
+                             max_age=gold_service.cache_duration)
+
+@app.route('/api/gold/backtest/sweep', methods=['POST'])
+def start_backtest_sweep():
+    """Queue a parameter sweep: {"grid": {"oversold": [20, 25, 30], ...}, "interval", "sort_by", "top"}"""
+    body = request.get_json(silent=True) or {}
+    grid = body.get('grid')
+    interval = body.get('interval', '1d')
+    if not isinstance(grid, dict) or not grid:
+        return jsonify({'error': True, 'message': 'Expected a "grid" object of parameter value lists'}), 400
+    if interval not in INTERVALS:
+        return jsonify({'error': True, 'message': f'Unsupported interval: {interval}'}), 400
+    try:
+        job = gold_service.start_sweep(grid, interval, sort_by=body.get('sort_by', 'sharpe'),
+                                       top=int(body.get('top', 20)))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': True, 'message': str(e)}), 400
+    except TimeoutError as e:
+        # Another worker is creating the same job; it can be submitted again shortly
+        return jsonify({'error': True, 'message': str(e)}), 503, {'Retry-After': '1'}
+    if job is None:
+        return jsonify({'error': True, 'message': 'Failed to fetch historical prices'}), 500
+    
+    response = jsonify(dict(job, status_url=f"/api/gold/backtest/sweep/{job['id']}"))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/gold/backtest/sweep/{job['id']}"
+    return response
+
+@app.route('/api/gold/backtest/sweep/<job_id>')
+def backtest_sweep_status(job_id):
+    job = gold_service.sweeps.get(job_id)
+    if job is None:
+        return jsonify({'error': True, 'message': 'Unknown or expired sweep job'}), 404
+    return jsonify(job)
+
 @app.route('/get_price')
 def price_redirect():
     """Compatibility route for older JavaScript that might be calling /get_price"""
@@ -0,0 +1,340 @@
+"""
+ASGI entry point
+Serves the price, historical, stats and news routes (with all their legacy
+aliases) and the SSE price stream as coroutines; every other path goes to the
+Flask app in app.py, so the URL surface is the same in both modes.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+An open connection costs a coroutine, not a worker thread: price requests are
+answered from the poller's snapshot on the event loop, and stream subscribers
+wait on an asyncio future until the next tick. Upstream fetches stay where they
+already are, on the poller thread and behind the service caches; a cache miss
+runs on a bounded pool of ASGI_THREADS threads (default 32), so a slow fetch
+holds a pool thread rather than the connection. The Flask routes run on the
+same pool, and /ws clients get the same thread pair they have under gunicorn.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs
+
+import app as web
+from http_cache import cache_headers, is_not_modified, parse_timestamp
+from price_stream import parse_event_id
+from ws_feed import serve_client
+
+gold_service = web.gold_service
+
+BLOCKING_THREADS = int(os.getenv('ASGI_THREADS', 32))
+
+# Service calls that may wait on upstream, and the WSGI fallback, run here
+_blocking = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix='asgi-blocking')
+
+JSON_HEADERS = [('Content-Type', 'application/json'), ('Access-Control-Allow-Origin', '*')]
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call on the bounded pool without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(_blocking, lambda: fn(*args, **kwargs))
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the handlers read"""
+
+    def __init__(self, scope):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {name: values[0] for name, values in
+                     parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+        self.headers = {}
+        for name, value in scope.get('headers', []):
+            name, value = name.decode('latin-1').lower(), value.decode('latin-1')
+            self.headers[name] = f'{self.headers[name]}, {value}' if name in self.headers else value
+
+    def int_arg(self, name):
+        """A query argument as an int, None when missing or malformed (like Flask's type=int)"""
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return None
+
+
+def json_response(payload, status=200):
+    return status, JSON_HEADERS, json.dumps(payload).encode('utf-8')
+
+
+def prebuilt_response(request, prebuilt, max_age=None, stale_while_revalidate=None):
+    """Prebuilt bytes with caching headers, or a bodyless 304 if the client is current"""
+    headers = JSON_HEADERS + cache_headers(prebuilt, max_age, stale_while_revalidate)
+    if is_not_modified(prebuilt, request.headers.get('if-none-match'), request.headers.get('if-modified-since')):
+        return 304, headers[1:], b''
+    return 200, headers, prebuilt.body
+
+
+async def gold_price(request):
+    try:
+        if gold_service.poller.running and gold_service.poller.snapshot() is not None:
+            # Never blocks: a stale snapshot is served while the poller revalidates
+            price_data = gold_service.get_current_price()
+        else:
+            price_data = await run_blocking(gold_service.get_current_price)
+        prebuilt = web.response_cache.get('price', price_data, web.build_price_response,
+                                          parse_timestamp(price_data['timestamp']))
+        return prebuilt_response(request, prebuilt, max_age=web.price_max_age(),
+                                 stale_while_revalidate=gold_service.poll_interval)
+    except Exception as e:
+        print(f"Error in gold price endpoint: {e}")
+        traceback.print_exc()
+        return json_response({'error': True, 'message': 'Error retrieving gold price'})
+
+
+async def historical_prices(request):
+    period = request.args.get('period', '1M')
+    try:
+        columnar = request.args.get('format') == 'columnar'
+        max_points = request.int_arg('max_points')
+        method = request.args.get('downsample', 'lttb')
+        interval = request.args.get('interval', '1d')
+        try:
+            historical_data = await run_blocking(gold_service.get_historical_prices, period, columnar=columnar,
+                                                 max_points=max_points, method=method, interval=interval)
+        except ValueError as e:
+            return json_response({'error': True, 'message': str(e), 'prices': [], 'period': period}, 400)
+
+        cache_key = web.historical_response_key(period, interval, columnar, max_points, method)
+        return prebuilt_response(request, web.response_cache.get(cache_key, historical_data,
+                                                                 last_modified=web.bars_last_modified),
+                                 max_age=gold_service.cache_duration,
+                                 stale_while_revalidate=gold_service.cache_duration)
+    except Exception as e:
+        print(f"Error in historical prices endpoint: {e}")
+        traceback.print_exc()
+        return json_response({
+            'error': True,
+            'message': f'Error retrieving historical prices: {str(e)}',
+            'prices': [],
+            'period': period
+        })
+
+
+async def market_stats(request):
+    try:
+        stats_data = await run_blocking(gold_service.get_market_stats)
+        return prebuilt_response(request, web.response_cache.get('stats', stats_data, web.build_stats_response,
+                                                                 web.stats_last_modified),
+                                 max_age=gold_service.cache_duration,
+                                 stale_while_revalidate=gold_service.cache_duration)
+    except Exception as e:
+        print(f"Error in market stats: {e}")
+        traceback.print_exc()
+        return json_response(web.FALLBACK_STATS)
+
+
+async def news(request):
+    try:
+        return json_response({'status': 'success', 'news': await run_blocking(web.load_news)})
+    except Exception as e:
+        print(f"Error in get_news_compat: {e}")
+        print(traceback.format_exc())
+        return json_response({
+            'status': 'error',
+            'message': f'Error fetching news: {str(e)}',
+            'news': web.FALLBACK_NEWS
+        })
+
+
+ROUTES = {
+    ('/get_gold_price', '/api/gold_price', '/api/gold/price'): gold_price,
+    ('/get_historical_prices', '/api/historical_prices', '/api/gold/historical'): historical_prices,
+    ('/api/market_stats', '/api/gold/stats'): market_stats,
+    ('/get_news',): news
+}
+HANDLERS = {path: handler for paths, handler in ROUTES.items() for path in paths}
+
+STREAM_PATH = '/api/gold/stream'
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),  # Disable proxy buffering (nginx)
+    (b'access-control-allow-origin', b'*')
+]
+
+
+async def send_response(send, status, headers, body, head=False):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+                + [(b'content-length', str(len(body)).encode('ascii'))]})
+    await send({'type': 'http.response.body', 'body': b'' if head else body})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def price_stream(request, receive, send):
+    """Server-Sent Events until the client disconnects; a HEAD gets the headers only"""
+    if request.method == 'HEAD':
+        await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    last_event_id = parse_event_id(request.headers.get('last-event-id') or request.args.get('last_event_id'))
+
+    async def pump():
+        await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS})
+        async for chunk in web.price_broadcaster.astream(last_event_id):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    tasks = {asyncio.ensure_future(pump()), asyncio.ensure_future(_wait_for_disconnect(receive))}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()  # Surface a failed send
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _wsgi_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in Request(scope).headers.items():
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        environ[key] = value
+    return environ
+
+
+def _call_wsgi(environ):
+    """Run the Flask app to completion, returning (status, headers, body)"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = int(status.split(' ', 1)[0]), headers
+
+    result = web.app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return started['status'], started['headers'], body
+
+
+async def wsgi_fallback(scope, receive, send):
+    """Serve a request with the Flask app on the blocking pool"""
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    status, headers, content = await run_blocking(_call_wsgi, _wsgi_environ(scope, body))
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+class BlockingWebSocket:
+    """The blocking receive()/send() interface serve_client expects, over an ASGI connection"""
+
+    def __init__(self, loop, receive, send):
+        self.loop = loop
+        self._receive = receive
+        self._send = send
+
+    def receive(self):
+        while True:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self.loop).result()
+            if message['type'] == 'websocket.disconnect':
+                return None
+            if message['type'] == 'websocket.receive':
+                return message.get('text') or (message.get('bytes') or b'').decode('utf-8')
+
+    def send(self, text):
+        asyncio.run_coroutine_threadsafe(self._send({'type': 'websocket.send', 'text': text}), self.loop).result()
+
+
+async def price_feed(scope, receive, send):
+    """WebSocket feed on /ws, served by the same FeedHub as under gunicorn"""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if scope['path'] != '/ws':
+        await send({'type': 'websocket.close', 'code': 1000})
+        return
+    await send({'type': 'websocket.accept'})
+    web.feed_hub.start_refresher(gold_service.cache_duration, skip={'price'})
+
+    # serve_client blocks on its socket, so it gets its own thread as it does under gunicorn
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+    ws = BlockingWebSocket(loop, receive, send)
+
+    def run():
+        try:
+            serve_client(web.feed_hub, ws)
+        finally:
+            loop.call_soon_threadsafe(finished.set_result, None)
+
+    threading.Thread(target=run, name='ws-client', daemon=True).start()
+    await finished
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if web.PRICE_POLLER_ENABLED:
+                gold_service.start_poller()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            gold_service.stop_poller()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    # Servers without lifespan support start the poller with the first data request
+    if web.PRICE_POLLER_ENABLED and scope['path'].startswith(web.DATA_PATH_PREFIXES):
+        gold_service.start_poller()
+    if scope['type'] == 'websocket':
+        return await price_feed(scope, receive, send)
+
+    if scope['method'] in ('GET', 'HEAD'):
+        if scope['path'] == STREAM_PATH:
+            return await price_stream(Request(scope), receive, send)
+        handler = HANDLERS.get(scope['path'])
+        if handler is not None:
+            status, headers, body = await handler(Request(scope))
+            return await send_response(send, status, headers, body, head=scope['method'] == 'HEAD')
+    await wsgi_fallback(scope, receive, send)
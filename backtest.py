@@ -0,0 +1,185 @@
+"""
+Vectorized backtests of the trading signal rules
+Evaluates the SMA crossover, RSI and price-action rules from indicator_engine's
+signals_from at every bar of a stored series at once, and turns the positions
+they imply into trades, an equity curve and summary statistics.
+
+A position decided on a bar's close is held over the following bar, so no rule
+sees the price it trades on.
+"""
+
+import math
+
+import numpy as np
+
+import indicators
+
+RULES = ('sma_crossover', 'rsi', 'price_action', 'combined')
+
+DEFAULT_PARAMS = {
+    'rule': 'sma_crossover',
+    'fast': 20,            # SMA crossover periods
+    'slow': 50,
+    'rsi_period': 14,
+    'oversold': 30.0,
+    'overbought': 70.0,
+    'lookback': 5,         # Price action: change over this many bars, in percent
+    'threshold': 1.0,
+    'allow_short': False,  # Sell signals go short instead of flat
+    'fee_bps': 0.0         # Cost per unit of position change, in basis points
+}
+
+SECONDS_PER_YEAR = 365.25 * 86400
+
+
+def normalize_params(params=None):
+    """Defaults filled in and values coerced to their default's type; raises ValueError"""
+    result = dict(DEFAULT_PARAMS)
+    for name, value in (params or {}).items():
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown backtest parameter: {name}")
+        default = DEFAULT_PARAMS[name]
+        if isinstance(default, bool):
+            result[name] = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+        else:
+            result[name] = type(default)(value)
+            if isinstance(default, float) and not math.isfinite(result[name]):
+                raise ValueError(f"{name} must be a finite number")
+    if result['rule'] not in RULES:
+        raise ValueError(f"Unknown rule: {result['rule']} (expected one of {', '.join(RULES)})")
+    if not 0 < result['fast'] < result['slow']:
+        raise ValueError("Expected 0 < fast < slow")
+    if result['rsi_period'] < 1 or result['lookback'] < 1:
+        raise ValueError("Periods must be positive")
+    if not 0 <= result['oversold'] < result['overbought'] <= 100:
+        raise ValueError("Expected 0 <= oversold < overbought <= 100")
+    if result['threshold'] < 0 or result['fee_bps'] < 0:
+        raise ValueError("threshold and fee_bps must not be negative")
+    return result
+
+
+def _hold_last(votes):
+    """Carry each +1/-1 vote forward over the bars without one (0 before the first)"""
+    index = np.where(votes != 0, np.arange(len(votes)), 0)
+    np.maximum.accumulate(index, out=index)
+    return votes[index]
+
+
+def rule_votes(close, params):
+    """+1 (buy), -1 (sell) or 0 for every bar, per the rule's signal at that bar"""
+    rule = params['rule']
+    votes = {}
+    if rule in ('sma_crossover', 'combined'):
+        fast, slow = indicators.sma(close, params['fast']), indicators.sma(close, params['slow'])
+        votes['sma_crossover'] = np.sign(np.nan_to_num(fast - slow)).astype(np.int8)
+    if rule in ('rsi', 'combined'):
+        rsi = indicators.rsi(close, params['rsi_period'])
+        # Oversold/overbought readings persist until the opposite extreme
+        votes['rsi'] = _hold_last((rsi < params['oversold']).astype(np.int8)
+                                  - (rsi > params['overbought']).astype(np.int8))
+    if rule in ('price_action', 'combined'):
+        lookback = params['lookback']
+        change = np.zeros(len(close))
+        if len(close) > lookback:
+            change[lookback:] = (close[lookback:] - close[:-lookback]) / close[:-lookback] * 100
+        # Mean reversion: fade moves larger than the threshold
+        votes['price_action'] = _hold_last((change < -params['threshold']).astype(np.int8)
+                                           - (change > params['threshold']).astype(np.int8))
+    if rule == 'combined':
+        return np.sign(sum(v.astype(np.int16) for v in votes.values())).astype(np.int8)
+    return votes[rule]
+
+
+def positions_from(votes, allow_short=False):
+    return votes if allow_short else np.maximum(votes, 0)
+
+
+def _trades(timestamp, close, position, limit):
+    """Each run of a constant non-zero position as a trade, with its entry and exit close"""
+    changes = np.flatnonzero(np.diff(position)) + 1
+    starts = np.concatenate(([0], changes))
+    ends = np.concatenate((changes, [len(position) - 1]))
+    held = position[starts] != 0
+    starts, ends = starts[held], ends[held]
+    sides = position[starts].astype(np.float64)
+    returns = sides * (close[ends] / close[starts] - 1) * 100
+    # The last trade is still open if the position is held on the final bar
+    open_trade = len(starts) > 0 and position[-1] != 0
+    trades = {
+        'count': int(len(starts)),
+        'wins': int((returns > 0).sum()),
+        'returns': returns
+    }
+    recent = slice(max(len(starts) - limit, 0), None)
+    trades['list'] = [
+        {'side': 'long' if side > 0 else 'short',
+         'entry_time': int(timestamp[start]), 'entry_price': round(float(close[start]), 2),
+         'exit_time': int(timestamp[end]), 'exit_price': round(float(close[end]), 2),
+         'return_pct': round(float(ret), 2), 'bars': int(end - start)}
+        for side, start, end, ret in zip(sides[recent], starts[recent], ends[recent], returns[recent])
+    ]
+    if open_trade and trades['list']:
+        trades['list'][-1]['open'] = True
+    return trades
+
+
+def _sample(length, max_points):
+    """Evenly spaced indices including the first and last"""
+    if length <= max_points:
+        return np.arange(length)
+    return np.unique(np.linspace(0, length - 1, max_points).round().astype(np.int64))
+
+
+def run(bars, params=None, max_points=1000, max_trades=500):
+    """Backtest a rule over a BarSeries
+
+    Returns {'params', 'stats', 'trades', 'equity': {'timestamps', 'values'}}.
+    The equity curve starts at 1.0 and is sampled down to max_points; only the
+    most recent max_trades trades are listed, while stats cover all of them.
+    """
+    params = normalize_params(params)
+    close = np.asarray(bars.close, dtype=np.float64)
+    timestamp = np.asarray(bars.timestamp)
+    if len(close) < 2:
+        raise ValueError("Not enough bars to backtest")
+
+    position = positions_from(rule_votes(close, params), params['allow_short'])
+    bar_returns = np.zeros(len(close))
+    bar_returns[1:] = close[1:] / close[:-1] - 1
+    held = np.concatenate(([0], position[:-1])).astype(np.float64)
+    turnover = np.abs(np.diff(np.concatenate(([0], position)))).astype(np.float64)
+    strategy = held * bar_returns - turnover * params['fee_bps'] / 10000
+    equity = np.cumprod(1 + strategy)
+
+    peak = np.maximum.accumulate(equity)
+    drawdown = (equity / peak - 1).min()
+    years = (timestamp[-1] - timestamp[0]) / SECONDS_PER_YEAR
+    bars_per_year = (len(close) - 1) / years if years > 0 else 0
+    std = strategy[1:].std()
+    trades = _trades(timestamp, close, position, max_trades)
+
+    stats = {
+        'bars': int(len(close)),
+        'start': int(timestamp[0]),
+        'end': int(timestamp[-1]),
+        'total_return_pct': round(float(equity[-1] - 1) * 100, 2),
+        'buy_and_hold_pct': round(float(close[-1] / close[0] - 1) * 100, 2),
+        'annualized_return_pct': round(float(equity[-1] ** (1 / years) - 1) * 100, 2)
+        if years > 0 and equity[-1] > 0 else None,
+        'sharpe': round(float(strategy[1:].mean() / std * np.sqrt(bars_per_year)), 2) if std > 0 else None,
+        'max_drawdown_pct': round(float(drawdown) * 100, 2),
+        'exposure_pct': round(float((held != 0).mean()) * 100, 2),
+        'trades': trades['count'],
+        'win_rate_pct': round(trades['wins'] / trades['count'] * 100, 2) if trades['count'] else None,
+        'avg_trade_pct': round(float(trades['returns'].mean()), 2) if trades['count'] else None
+    }
+    points = _sample(len(equity), max_points)
+    return {
+        'params': params,
+        'stats': stats,
+        'trades': trades['list'],
+        'equity': {
+            'timestamps': timestamp[points].tolist(),
+            'values': np.round(equity[points], 6).tolist()
+        }
+    }
@@ -0,0 +1,37 @@
+"""
+Vectorized serialization of OHLCV bars for API responses
+Rounds and formats whole columns with NumPy instead of looping over rows
+"""
+
+import numpy as np
+
+
+def format_dates(timestamps, unit='D'):
+    """Format UTC epoch seconds as 'YYYY-MM-DD' (unit='D') or 'YYYY-MM-DD HH:MM' (unit='m')"""
+    dates = np.datetime_as_string(np.asarray(timestamps, dtype='datetime64[s]'), unit=unit)
+    if unit != 'D':
+        dates = np.char.replace(dates, 'T', ' ')
+    return dates.tolist()
+
+
+def bars_to_columns(bars, date_unit='D'):
+    """Column-oriented payload: one list per field, ready for charting libraries"""
+    return {
+        'dates': format_dates(bars.timestamp, date_unit),
+        'open': np.round(bars.open, 2).tolist(),
+        'high': np.round(bars.high, 2).tolist(),
+        'low': np.round(bars.low, 2).tolist(),
+        'close': np.round(bars.close, 2).tolist(),
+        'volume': bars.volume.tolist()
+    }
+
+
+def bars_to_records(bars, date_unit='D'):
+    """Row-oriented payload matching the historical endpoint's `prices` list"""
+    columns = bars_to_columns(bars, date_unit)
+    return [
+        {'date': date, 'price': close, 'volume': volume, 'high': high, 'low': low, 'open': open_}
+        for date, close, volume, high, low, open_ in zip(
+            columns['dates'], columns['close'], columns['volume'],
+            columns['high'], columns['low'], columns['open'])
+    ]
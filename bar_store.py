@@ -0,0 +1,403 @@
+"""
+Incremental OHLCV bar store
+Keeps one bar series per (symbol, interval), persists it to disk and only asks
+upstream for bars newer than the last stored timestamp. Every chart period is
+served as a slice of that one series.
+
+Each series lives in a columnar file of fixed-width arrays that is memory-mapped
+read-only by every worker, so reads are zero-copy slices of the shared page cache.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+from cache_backend import private_directory, user_temp_directory
+from http_session import get_yfinance_session
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process write locking is unavailable
+    fcntl = None
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+COLUMN_DTYPES = {
+    'timestamp': np.dtype('<i8'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<i8')
+}
+
+# 64-byte file header followed by one fixed-capacity block per column
+FILE_MAGIC = b'XAUBARS1'
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('capacity', '<i8'),
+    ('length', '<i8'),
+    ('refreshed_at', '<f8'),
+    ('superseded', '<i8'),
+    ('reserved', '<i8', (3,))
+])
+MIN_CAPACITY = 1024
+
+# Initial history for intraday series, within what Yahoo serves per interval;
+# other intervals use the store's backfill_period
+INTRADAY_BACKFILL = {'1m': '7d', '5m': '60d', '15m': '60d', '1h': '730d'}
+
+# Seconds back from now that a start-based intraday request can reach; a series
+# whose last bar is older is reloaded with a full backfill instead
+PROVIDER_WINDOW = {interval: int(period[:-1]) * 86400 for interval, period in INTRADAY_BACKFILL.items()}
+
+
+class BarSeries:
+    """Column-oriented OHLCV bars; timestamps are UTC epoch seconds"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.int64)
+
+    @classmethod
+    def empty(cls):
+        return cls(*([] for _ in COLUMNS))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamp[-1]) if len(self) else None
+
+    def columns(self):
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def slice(self, start, stop=None):
+        """Return a view of bars[start:stop] without copying the columns"""
+        return BarSeries(*(getattr(self, name)[start:stop] for name in COLUMNS))
+
+    def since(self, cutoff):
+        """Return the bars with a timestamp strictly after cutoff"""
+        return self.slice(int(np.searchsorted(self.timestamp, cutoff, side='right')))
+
+
+def frame_to_series(data):
+    """Convert a yfinance history DataFrame into a BarSeries"""
+    if data is None or data.empty:
+        return BarSeries.empty()
+    index = data.index
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return BarSeries(
+        index.asi8 // 10**9,
+        data['Open'].to_numpy(dtype=np.float64),
+        data['High'].to_numpy(dtype=np.float64),
+        data['Low'].to_numpy(dtype=np.float64),
+        data['Close'].to_numpy(dtype=np.float64),
+        data['Volume'].fillna(0).to_numpy(dtype=np.int64)
+    )
+
+
+def download_bars(symbol, interval, start=None, period=None):
+    """Fetch bars from Yahoo Finance, either from a start time (UTC epoch seconds) or for a whole period"""
+    import yfinance as yf  # Deferred: pandas and yfinance load on the first upstream fetch
+    ticker = yf.Ticker(symbol, session=get_yfinance_session())
+    if start is not None:
+        data = ticker.history(start=start, interval=interval)
+    else:
+        data = ticker.history(period=period, interval=interval)
+    return frame_to_series(data)
+
+
+def download_bars_batch(symbols, interval, start=None, period=None):
+    """Fetch several symbols with one yf.download call, returning {symbol: BarSeries}"""
+    import yfinance as yf
+    options = {'start': start} if start is not None else {'period': period}
+    data = yf.download(list(symbols), interval=interval, group_by='ticker', auto_adjust=True,
+                       progress=False, threads=True, session=get_yfinance_session(), **options)
+    result = {}
+    for symbol in symbols:
+        if data is None or data.empty or symbol not in data.columns.get_level_values(0):
+            result[symbol] = BarSeries.empty()
+            continue
+        # Symbols trade on different days; drop the rows that belong to the others
+        result[symbol] = frame_to_series(data[symbol].dropna(subset=['Close']))
+    return result
+
+
+class ColumnarBarFile:
+    """Memory-mapped column file holding one bar series
+
+    Layout: header, then `capacity` slots per column. Rows below `length` are
+    never modified: appends write past it and publish the new rows by bumping
+    `length` last, so readers never see rows that are not fully written and a
+    view they hold never changes. Revising stored rows (or running out of
+    capacity) rewrites the file and swaps it in with os.replace; the old file is
+    flagged as superseded so readers know to remap, and views of it stay valid.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._header = None
+        self._columns = None
+
+    def _map(self, mode='r'):
+        buffer = np.memmap(self.path, dtype=np.uint8, mode=mode)
+        header = buffer[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+        if header['magic'][0] != FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a bar store file")
+        capacity = int(header['capacity'][0])
+        columns = {}
+        offset = HEADER_DTYPE.itemsize
+        for name in COLUMNS:
+            dtype = COLUMN_DTYPES[name]
+            columns[name] = buffer[offset:offset + capacity * dtype.itemsize].view(dtype)
+            offset += capacity * dtype.itemsize
+        return header, columns
+
+    def read(self):
+        """Return (series, refreshed_at); the series columns are views of the mapping"""
+        if self._header is None or self._header['superseded'][0]:
+            try:
+                self._header, self._columns = self._map()
+            except (FileNotFoundError, ValueError):
+                self._header = self._columns = None
+                return BarSeries.empty(), 0.0
+        length = int(self._header['length'][0])
+        series = BarSeries(*(self._columns[name][:length] for name in COLUMNS))
+        return series, float(self._header['refreshed_at'][0])
+
+    def write(self, newer, refreshed_at):
+        """Upsert newer bars (replacing any overlapping tail) and mark the file refreshed
+
+        Overlapping rows that are unchanged are skipped; if any stored row is
+        revised, the file is rewritten rather than modified under its readers.
+        Callers must hold the file lock so there is a single writer at a time.
+        """
+        try:
+            header, columns = self._map('r+')
+        except (FileNotFoundError, ValueError):
+            header = columns = None
+
+        length = int(header['length'][0]) if header is not None else 0
+        keep = length
+        if len(newer):
+            keep = int(np.searchsorted(columns['timestamp'][:length], newer.timestamp[0], side='left')) \
+                if header is not None else 0
+            overlap = length - keep
+            if 0 < overlap <= len(newer) and all(
+                    np.array_equal(columns[name][keep:length], getattr(newer, name)[:overlap]) for name in COLUMNS):
+                newer, keep = newer.slice(overlap), length
+        new_length = keep + len(newer) if len(newer) else length
+
+        if header is None or keep < length or new_length > int(header['capacity'][0]):
+            current = BarSeries(*(columns[name][:keep] for name in COLUMNS)) \
+                if header is not None else BarSeries.empty()
+            capacity = int(header['capacity'][0]) if header is not None else 0
+            if new_length > capacity:
+                capacity = max(MIN_CAPACITY, 2 * new_length)
+            self._rewrite(current, newer, capacity, refreshed_at)
+            if header is not None:
+                header['superseded'][0] = 1
+                header.flush()
+            return
+
+        # Append past the committed rows, then publish them by updating the header
+        for name in COLUMNS:
+            columns[name][length:new_length] = getattr(newer, name)
+        for column in columns.values():
+            column.flush()
+        header['length'][0] = new_length
+        header['refreshed_at'][0] = refreshed_at
+        header.flush()
+
+    def _rewrite(self, current, newer, capacity, refreshed_at):
+        size = HEADER_DTYPE.itemsize + sum(capacity * COLUMN_DTYPES[name].itemsize for name in COLUMNS)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        os.close(fd)
+        try:
+            buffer = np.memmap(tmp_path, dtype=np.uint8, mode='w+', shape=(size,))
+            header = buffer[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+            header['magic'][0] = FILE_MAGIC
+            header['capacity'][0] = capacity
+            header['length'][0] = len(current) + len(newer)
+            header['refreshed_at'][0] = refreshed_at
+            offset = HEADER_DTYPE.itemsize
+            for name in COLUMNS:
+                dtype = COLUMN_DTYPES[name]
+                column = buffer[offset:offset + capacity * dtype.itemsize].view(dtype)
+                column[:len(current)] = getattr(current, name)
+                column[len(current):len(current) + len(newer)] = getattr(newer, name)
+                offset += capacity * dtype.itemsize
+            buffer.flush()
+            del buffer, header, column
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class _FileLock:
+    """Exclusive cross-process lock held while a worker writes a bar file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class BarStore:
+    def __init__(self, directory=None, fetch_fn=download_bars, backfill_period='1y',
+                 batch_fetch_fn=download_bars_batch):
+        # Stored bars are served as prices, so only this user may write them
+        self.directory = private_directory(
+            directory or os.getenv('BAR_STORE_DIR') or user_temp_directory('xauusd-bars'))
+        self.fetch_fn = fetch_fn
+        self.batch_fetch_fn = batch_fetch_fn
+        self.backfill_period = backfill_period
+        self._files = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+        # Metrics
+        self.delta_fetches = 0
+        self.backfill_fetches = 0
+        self.batch_fetches = 0
+        self.bars_fetched = 0
+
+    def after_fork(self):
+        """Drop the per-series thread locks, which a parent thread may have held at fork"""
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _file(self, symbol, interval):
+        key = (symbol, interval)
+        bar_file = self._files.get(key)
+        if bar_file is None:
+            path = os.path.join(self.directory, f'{symbol}_{interval}.bars')
+            bar_file = self._files.setdefault(key, ColumnarBarFile(path))
+        return bar_file
+
+    def backfill_for(self, interval):
+        return INTRADAY_BACKFILL.get(interval, self.backfill_period)
+
+    def get(self, symbol, interval):
+        """Return the stored bars without contacting upstream"""
+        return self._file(symbol, interval).read()[0]
+
+    def refresh(self, symbol, interval, max_age=60):
+        """Bring the series up to date, fetching only bars from the last stored one on
+
+        Skips the upstream call entirely if the series was refreshed within max_age
+        seconds (by this or another worker). A series whose last bar is older than
+        the provider serves for its interval is reloaded with a full backfill. An
+        empty or failed fetch is not recorded as a refresh, so the next call
+        retries. Returns the current series.
+        """
+        bar_file = self._file(symbol, interval)
+        with self._lock_for((symbol, interval)), _FileLock(bar_file.lock_path):
+            series, refreshed_at = bar_file.read()
+            now = time.time()
+            if now - refreshed_at < max_age:
+                return series
+
+            window = PROVIDER_WINDOW.get(interval)
+            try:
+                if len(series) and (window is None or now - series.last_timestamp < window):
+                    # Re-request from the last stored bar (epoch seconds) so it gets updated too
+                    newer = self.fetch_fn(symbol, interval, start=series.last_timestamp)
+                    self.delta_fetches += 1
+                else:
+                    newer = self.fetch_fn(symbol, interval, period=self.backfill_for(interval))
+                    self.backfill_fetches += 1
+            except Exception as e:
+                print(f"Error fetching {interval} bars for {symbol}: {e}")
+                return series
+
+            if len(newer) == 0:
+                return series
+            self.bars_fetched += len(newer)
+            bar_file.write(newer, now)
+            return bar_file.read()[0]
+
+    def refresh_many(self, symbols, interval, max_age=60):
+        """Refresh several series with a single batched upstream call
+
+        Only series older than max_age are requested; they share one request
+        starting at the earliest of their last stored bars (or a full backfill
+        if any is empty). Returns {symbol: series}.
+        """
+        keys = sorted((symbol, interval) for symbol in symbols)
+        with ExitStack() as stack:
+            # Always lock in sorted order so concurrent batches cannot deadlock
+            for key in keys:
+                stack.enter_context(self._lock_for(key))
+                stack.enter_context(_FileLock(self._file(*key).lock_path))
+
+            result = {}
+            stale = []
+            for symbol, _ in keys:
+                series, refreshed_at = self._file(symbol, interval).read()
+                result[symbol] = series
+                if time.time() - refreshed_at >= max_age:
+                    stale.append(symbol)
+            if not stale:
+                return result
+
+            try:
+                if all(len(result[symbol]) for symbol in stale):
+                    start = min(result[symbol].last_timestamp for symbol in stale)
+                    fetched = self.batch_fetch_fn(stale, interval, start=start)
+                else:
+                    fetched = self.batch_fetch_fn(stale, interval, period=self.backfill_for(interval))
+                self.batch_fetches += 1
+            except Exception as e:
+                print(f"Error fetching {interval} bars for {', '.join(stale)}: {e}")
+                return result
+
+            for symbol in stale:
+                newer = fetched.get(symbol, BarSeries.empty())
+                if len(newer) == 0:
+                    continue
+                self.bars_fetched += len(newer)
+                bar_file = self._file(symbol, interval)
+                bar_file.write(newer, time.time())
+                result[symbol] = bar_file.read()[0]
+            return result
+
+    def get_metrics(self):
+        return {
+            'series': {f'{symbol}:{interval}': len(bar_file.read()[0])
+                       for (symbol, interval), bar_file in self._files.items()},
+            'delta_fetches': self.delta_fetches,
+            'backfill_fetches': self.backfill_fetches,
+            'batch_fetches': self.batch_fetches,
+            'bars_fetched': self.bars_fetched
+        }
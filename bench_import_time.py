@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker import time
+Runs `python -X importtime -c "import app"` in fresh interpreters, reports the
+best total and the slowest top-level imports, and fails if the total exceeds
+--max-ms or if a heavy data library (pandas, yfinance) is imported eagerly.
+Those load on the first data request, or in the master with --preload.
+
+Usage: python bench_import_time.py [--module app] [--repeat 5] [--max-ms 0]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# import time: <self us> | <cumulative us> | <indent><module>
+LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$')
+
+DEFAULT_FORBIDDEN = ('pandas', 'yfinance', 'curl_cffi')
+
+
+def import_times(module):
+    """{module: cumulative microseconds} for one fresh `import module`, with nesting depth"""
+    env = dict(os.environ, PRICE_POLLER_ENABLED='false')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+            # importtime indents one space per level, plus one leading space
+            times[name] = (cumulative, (indent - 1) // 2)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=0, help='fail above this total (0 disables)')
+    parser.add_argument('--forbid', default=','.join(DEFAULT_FORBIDDEN),
+                        help='comma-separated modules that must not be imported')
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[args.module][0])
+    total = best[args.module][0] / 1000
+
+    print(f"Import time for `import {args.module}` (best of {args.repeat})")
+    print("=" * 50)
+    direct = sorted(((us, name) for name, (us, depth) in best.items() if depth == 1), reverse=True)
+    for us, name in direct[:args.top]:
+        print(f"   {name:<28} {us / 1000:9.2f} ms")
+    print(f"   {'total':<28} {total:9.2f} ms")
+
+    failures = []
+    forbidden = [name for name in args.forbid.split(',') if name]
+    loaded = [name for name in forbidden if name in best]
+    if loaded:
+        failures.append(f"eagerly imported: {', '.join(loaded)}")
+    if args.max_ms and total > args.max_ms:
+        failures.append(f"total {total:.0f} ms exceeds {args.max_ms:.0f} ms")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
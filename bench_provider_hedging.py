@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Offline harness comparing the sequential provider chain with hedged fan-out
+Fake providers draw latencies from a long-tailed distribution and fail at a
+configurable rate, so the tail latency of both strategies can be measured
+without touching the network
+
+Usage: python bench_provider_hedging.py --requests 200 --slow-rate 0.03
+"""
+
+import argparse
+import random
+import time
+
+from hedged_fetch import HedgedFetcher, percentile
+from price_providers import PriceProvider, ProviderRegistry, quote
+
+
+class FakeProvider(PriceProvider):
+    """Answers after `latency` seconds, occasionally slow or failing"""
+
+    def __init__(self, name, latency, slow_latency=None, slow_rate=0.0, error_rate=0.0, price=2650.0):
+        self.name = self.source = name
+        self.latency = latency
+        self.slow_latency = slow_latency if slow_latency is not None else latency * 20
+        self.slow_rate = slow_rate
+        self.error_rate = error_rate
+        self.price = price
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        slow = random.random() < self.slow_rate
+        time.sleep(self.slow_latency if slow else self.latency * random.uniform(0.8, 1.2))
+        if random.random() < self.error_rate:
+            return None
+        return quote(self.price)
+
+
+def run_sequential(providers):
+    for provider in providers:
+        result = provider.fetch()
+        if result is not None:
+            return result
+    return None
+
+
+def measure(fn, requests):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(label, latencies, calls):
+    print(f"{label:<12} p50 {percentile(latencies, 0.5) * 1000:7.1f} ms   "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms   upstream calls {calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02, help='typical provider latency (s)')
+    parser.add_argument('--slow-rate', type=float, default=0.03, help='fraction of very slow responses')
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--hedge-delay', type=float, help='fixed hedge delay (default: adaptive p95)')
+    args = parser.parse_args()
+
+    def make_providers():
+        return [FakeProvider(name, args.latency * factor, slow_rate=args.slow_rate, error_rate=args.error_rate)
+                for name, factor in (('primary', 1.0), ('secondary', 1.5), ('tertiary', 2.0))]
+
+    print(f"{args.requests} requests, provider latency ~{args.latency * 1000:.0f} ms, "
+          f"{args.slow_rate:.0%} slow, {args.error_rate:.0%} errors")
+
+    providers = make_providers()
+    latencies = measure(lambda: run_sequential(providers), args.requests)
+    report('sequential', latencies, sum(p.calls for p in providers))
+
+    providers = make_providers()
+    fetcher = HedgedFetcher(ProviderRegistry(providers, default_latency=args.latency * 2),
+                            hedge_delay=args.hedge_delay, default_delay=args.latency * 2)
+    latencies = measure(fetcher.fetch, args.requests)
+    report('hedged', latencies, sum(p.calls for p in providers))
+    for name, stats in fetcher.get_metrics()['providers'].items():
+        print(f"   {name:<10} {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Pluggable cache backends
+In-process cache for single-worker setups, plus shared backends (file and Redis)
+so every gunicorn worker serves the same fetched snapshot
+
+Select the backend with CACHE_BACKEND=memory|file|redis (default: file).
+"""
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    import redis
+except ImportError:  # Optional dependency, only needed for CACHE_BACKEND=redis
+    redis = None
+
+# Expired entries are kept this long so callers can still serve stale data
+# while a refresh is in progress or upstream is down
+DEFAULT_STALE_RETENTION = 24 * 60 * 60
+
+# Decoded entries memoized per worker, least recently used evicted first
+DEFAULT_MAX_DECODED = 256
+
+
+class CacheEntry(namedtuple('CacheEntry', ['value', 'stored_at', 'expires_at'])):
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+
+def encode_entry(value, stored_at, expires_at):
+    """Serialize an entry as JSON; cached values are plain JSON data"""
+    return json.dumps({'value': value, 'stored_at': stored_at, 'expires_at': expires_at},
+                      separators=(',', ':')).encode('utf-8')
+
+
+def decode_entry(payload):
+    data = json.loads(payload)
+    return CacheEntry(data['value'], data['stored_at'], data['expires_at'])
+
+
+def private_directory(path):
+    """Create path (mode 0700) if needed and check that only this user can write to it
+
+    Raises PermissionError for a directory owned by someone else, writable by
+    group or others, or reached through a symlink.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"Cache directory {path} is not a directory")
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"Cache directory {path} is owned by another user")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"Cache directory {path} is writable by other users")
+    return path
+
+
+def user_temp_directory(name):
+    """Per-user directory `<name>-<uid>` under the system temp directory"""
+    user = os.getuid() if hasattr(os, 'getuid') else os.getenv('USERNAME', 'user')
+    return os.path.join(tempfile.gettempdir(), f'{name}-{user}')
+
+
+def default_cache_directory():
+    """Per-user cache directory under the system temp directory"""
+    return user_temp_directory('xauusd-cache')
+
+
+class DecodedMemo:
+    """Bounded LRU of decoded entries keyed by cache key, valid for one stored version"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_DECODED):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            memo = self._entries.get(key)
+            if memo is None or memo[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return memo[1]
+
+    def put(self, key, version, entry):
+        with self._lock:
+            self._entries[key] = (version, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheBackend:
+    """Interface shared by every cache backend"""
+
+    def get(self, key):
+        """Return the CacheEntry for key (fresh or stale), or None"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        """Store value under key, fresh for ttl seconds"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def try_lock(self, key, ttl):
+        """Try to take a short-lived lease on key; returns True if acquired"""
+        raise NotImplementedError
+
+    def unlock(self, key):
+        raise NotImplementedError
+
+    def get_value(self, key):
+        """Return the value for key only if it is still fresh"""
+        entry = self.get(key)
+        if entry is not None and entry.fresh:
+            return entry.value
+        return None
+
+
+class InProcessCache(CacheBackend):
+    """Dictionary-backed cache local to one process"""
+
+    def __init__(self, stale_retention=DEFAULT_STALE_RETENTION):
+        self.stale_retention = stale_retention
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.time() >= entry.expires_at + self.stale_retention:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return entry
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        # Replacing the whole entry tuple keeps readers consistent without locking
+        self._entries[key] = CacheEntry(value, now, now + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def try_lock(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            held_until = self._locks.get(key)
+            if held_until is not None and held_until > now:
+                return False
+            self._locks[key] = now + ttl
+            return True
+
+    def unlock(self, key):
+        with self._lock:
+            self._locks.pop(key, None)
+
+
+class FileCache(CacheBackend):
+    """Directory-backed cache shared by every process on the host
+
+    Each key is a JSON file replaced atomically with os.replace, so readers
+    never see a partial write. Decoded values are memoized per file version,
+    so repeated reads within a worker cost one stat() instead of a decode.
+    The directory must be private to this user; entries too stale to serve
+    are deleted when read and by a periodic sweep.
+    """
+
+    def __init__(self, directory=None, stale_retention=DEFAULT_STALE_RETENTION,
+                 max_decoded=DEFAULT_MAX_DECODED, sweep_interval=300):
+        self.directory = private_directory(directory or default_cache_directory())
+        self.stale_retention = stale_retention
+        self.sweep_interval = sweep_interval
+        self._decoded = DecodedMemo(max_decoded)
+        self._last_sweep = time.time()
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        version = (info.st_ino, info.st_mtime_ns, info.st_size)
+        entry = self._decoded.get(key, version)
+        if entry is None:
+            try:
+                with open(path, 'rb') as f:
+                    entry = decode_entry(f.read())
+            except (FileNotFoundError, ValueError, KeyError) as e:
+                print(f"Error reading cache entry {key}: {e}")
+                return None
+            self._decoded.put(key, version, entry)
+
+        if time.time() >= entry.expires_at + self.stale_retention:
+            self.delete(key)
+            return None
+        return entry
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        payload = encode_entry(value, now, now + ttl)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self):
+        """Delete every entry that is past its stale retention; returns how many"""
+        self._last_sweep = now = time.time()
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'rb') as f:
+                    expires_at = json.loads(f.read())['expires_at']
+            except FileNotFoundError:
+                continue
+            except (ValueError, KeyError):
+                expires_at = 0  # Unreadable: nothing can be served from it
+            if now >= expires_at + self.stale_retention:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def delete(self, key):
+        self._decoded.discard(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def try_lock(self, key, ttl):
+        lock_path = self._path(key) + '.lock'
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # Break leases left behind by a worker that died while holding them
+            try:
+                if time.time() - os.path.getmtime(lock_path) < ttl:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            return self.try_lock(key, ttl)
+        os.close(fd)
+        return True
+
+    def unlock(self, key):
+        try:
+            os.remove(self._path(key) + '.lock')
+        except FileNotFoundError:
+            pass
+
+
+class RedisCache(CacheBackend):
+    """Redis-backed cache for multi-host deployments
+
+    Entries are JSON; the decoded entry is memoized per key and payload, so a
+    value that has not changed is returned as the same object on every hit.
+    """
+
+    def __init__(self, url, prefix='xauusd:', stale_retention=DEFAULT_STALE_RETENTION,
+                 max_decoded=DEFAULT_MAX_DECODED):
+        if redis is None:
+            raise ImportError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.stale_retention = stale_retention
+        self._decoded = DecodedMemo(max_decoded)
+
+    def get(self, key):
+        payload = self.client.get(self.prefix + key)
+        if payload is None:
+            self._decoded.discard(key)
+            return None
+        # The payload embeds its stored_at time, so equal digests mean the same version
+        version = hashlib.sha1(payload).digest()
+        entry = self._decoded.get(key, version)
+        if entry is None:
+            entry = decode_entry(payload)
+            self._decoded.put(key, version, entry)
+        return entry
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        payload = encode_entry(value, now, now + ttl)
+        # SET replaces the value atomically; Redis evicts it once it is too stale to serve
+        self.client.set(self.prefix + key, payload, ex=int(ttl + self.stale_retention))
+
+    def delete(self, key):
+        self._decoded.discard(key)
+        self.client.delete(self.prefix + key)
+
+    def try_lock(self, key, ttl):
+        return bool(self.client.set(self.prefix + key + ':lock', b'1', nx=True, px=int(ttl * 1000)))
+
+    def unlock(self, key):
+        self.client.delete(self.prefix + key + ':lock')
+
+
+def create_cache_backend():
+    """Create the cache backend selected by the CACHE_BACKEND environment variable"""
+    backend = os.getenv('CACHE_BACKEND', 'file').lower()
+    if backend == 'memory':
+        return InProcessCache()
+    if backend == 'redis':
+        return RedisCache(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    if backend != 'file':
+        print(f"Unknown CACHE_BACKEND '{backend}', using file cache")
+    return FileCache(os.getenv('CACHE_DIR'))
@@ -0,0 +1,111 @@
+"""
+Circuit breaker for upstream providers
+Closed: calls flow and outcomes are tracked over a rolling window. Once enough
+of them fail or exceed the latency threshold, the breaker opens and the
+provider is skipped without a network call. After the cooldown it goes
+half-open and lets a single probe through; a good probe closes it again, a
+bad one re-opens it for another cooldown.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=0.5, latency_threshold=None, window=20,
+                 min_calls=5, cooldown=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold  # Slower calls count as failures
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.clock = clock
+        self._outcomes = deque(maxlen=window)  # True for a bad call
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_started = None
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def _probe_pending(self):
+        # A probe that never reported back (e.g. cancelled) expires after a cooldown
+        return self._probe_started is not None and self.clock() - self._probe_started < self.cooldown
+
+    def ready(self):
+        """Whether a call would currently be allowed, without claiming the probe"""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probe_pending())
+
+    def allow(self):
+        """Claim permission for one call; in half-open state only one probe is let through"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_pending():
+                self._probe_started = self.clock()
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Return an unused permission; frees the half-open probe for another caller"""
+        with self._lock:
+            self._probe_started = None
+
+    def record(self, latency, ok):
+        bad = not ok or (self.latency_threshold is not None and latency > self.latency_threshold)
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if bad:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                self._probe_started = None
+                return
+            if state == OPEN:
+                return  # Late result from before the breaker opened
+
+            self._outcomes.append(bad)
+            if (len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_threshold):
+                self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.trips += 1
+
+    def get_metrics(self):
+        with self._lock:
+            state = self._current_state()
+            metrics = {
+                'state': state,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'window_failures': sum(self._outcomes),
+                'window_calls': len(self._outcomes)
+            }
+            if state == OPEN:
+                metrics['retry_in'] = round(max(0.0, self.cooldown - (self.clock() - self._opened_at)), 1)
+            return metrics
@@ -0,0 +1,28 @@
+"""
+Shared test fixtures
+"""
+
+import itertools
+
+import pytest
+
+from bar_store import BarStore
+from cache_backend import InProcessCache
+from gold_api_service import GoldPriceService
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    """Build GoldPriceServices, each over a bar store in its own directory under tmp_path
+
+    make_service(fetch_fn=..., batch_fetch_fn=..., cache=None, providers=None);
+    the fetch functions default to BarStore's, the cache to an InProcessCache.
+    """
+    stores = itertools.count()
+
+    def make(cache=None, providers=None, **fetch_fns):
+        store = BarStore(str(tmp_path / f'bars-{next(stores)}'), **fetch_fns)
+        return GoldPriceService(cache=cache if cache is not None else InProcessCache(),
+                                bar_store=store, providers=providers)
+
+    return make
@@ -0,0 +1,100 @@
+"""
+Downsampling of bar series for charts
+Largest-Triangle-Three-Buckets keeps the bars that best preserve the shape of
+the close line; OHLC buckets merge runs of bars into candles that keep every
+high and low. Both return a BarSeries of at most max_points bars.
+"""
+
+import numpy as np
+
+from bar_store import BarSeries
+
+METHODS = ('lttb', 'ohlc')
+
+# Requested point counts are rounded down to one of these, so only a handful
+# of downsampled variants of each period is ever built and cached
+POINT_BUDGETS = (10, 25, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def _bucket_edges(count, buckets):
+    """Start indices of `buckets` contiguous, near-equal index ranges over count, plus count"""
+    return np.linspace(0, count, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x, y, max_points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps (first and last included)
+
+    Bucket bounds and the next-bucket averages are computed for all buckets at
+    once; the per-bucket step only picks the largest triangle, vectorized
+    over the bucket's points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(y)
+    if max_points >= count:
+        return np.arange(count)
+    if max_points < 3:
+        raise ValueError("LTTB needs at least 3 points")
+
+    # The middle points are split into max_points - 2 buckets
+    edges = _bucket_edges(count - 2, max_points - 2) + 1
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes
+    # Each bucket's third vertex is the next bucket's average (the last point for the last bucket)
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((ax - next_x[bucket]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y[bucket] - ay))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def lttb(bars, max_points):
+    """The bars LTTB selects on (timestamp, close)"""
+    if len(bars) <= max_points:
+        return bars
+    keep = lttb_indices(bars.timestamp, bars.close, max_points)
+    return BarSeries(*(getattr(bars, name)[keep] for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')))
+
+
+def ohlc_buckets(bars, max_points):
+    """Merge consecutive bars into max_points candles: first open, highest high,
+    lowest low, last close, summed volume, stamped with the first bar's time"""
+    count = len(bars)
+    if count <= max_points:
+        return bars
+    starts = _bucket_edges(count, max_points)[:-1]
+    ends = np.append(starts[1:], count) - 1
+    return BarSeries(
+        bars.timestamp[starts],
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        np.minimum.reduceat(bars.low, starts),
+        bars.close[ends],
+        np.add.reduceat(bars.volume, starts)
+    )
+
+
+def point_budget(max_points):
+    """The largest of POINT_BUDGETS not above max_points; ValueError below the smallest"""
+    if max_points < POINT_BUDGETS[0]:
+        raise ValueError(f"Expected max_points >= {POINT_BUDGETS[0]}")
+    return max(budget for budget in POINT_BUDGETS if budget <= max_points)
+
+
+def downsample(bars, max_points, method='lttb'):
+    """Downsample bars to at most max_points with 'lttb' or 'ohlc'"""
+    if method == 'lttb':
+        return lttb(bars, max_points)
+    if method == 'ohlc':
+        return ohlc_buckets(bars, max_points)
+    raise ValueError(f"Unknown downsampling method: {method} (expected one of {', '.join(METHODS)})")
@@ -3,119 +3,225 @@ Enhanced Gold Price API Service using yfinance
 Provides real-time and historical gold price data
 """
 
-import yfinance as yf
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import json
-from functools import lru_cache
 import time
+import os
+
+from price_poller import PricePoller
+from single_flight import SingleFlight
+from cache_backend import DecodedMemo, create_cache_backend
+from bar_store import BarStore
+from bar_serialization import bars_to_columns, bars_to_records, format_dates
+from price_providers import create_default_registry
+from hedged_fetch import HedgedFetcher
+from http_session import reset_sessions
+from intraday_stats import IntradayAggregator, session_index
+from indicator_engine import IndicatorEngine
+import indicators
+import backtest
+from param_sweep import SweepJobs
+from downsample import METHODS as DOWNSAMPLE_METHODS, downsample, point_budget
+from resample import base_interval, resample
 
 class GoldPriceService:
-    def __init__(self):
+    def __init__(self, cache=None, bar_store=None, providers=None):
         self.cache_duration = 60  # Cache for 60 seconds
-        self.price_cache = {}
-        self.historical_cache = {}
-    
-    def _is_cache_valid(self, cache_key, cache_dict):
-        """Check if cache is still valid"""
-        if cache_key not in cache_dict:
-            return False
-        cache_time = cache_dict[cache_key].get('timestamp', 0)
-        return time.time() - cache_time < self.cache_duration
+        
+        # Shared across workers unless CACHE_BACKEND=memory
+        self.cache = cache if cache is not None else create_cache_backend()
+        
+        # Current price is owned by a background poller; handlers read its snapshot
+        self.poll_interval = float(os.getenv('PRICE_POLL_INTERVAL', self.cache_duration))
+        self.first_snapshot_timeout = 10  # Max wait for the poller's first fetch
+        self.lease_poll_interval = 0.2  # How often to look for the price another worker is fetching
+        self.poller = PricePoller(self._poll_current_price, interval=self.poll_interval)
+        
+        # Quote providers ranked by observed latency and error rate; a slow one is
+        # hedged to the next after PRICE_HEDGE_DELAY seconds (default: its p95 latency)
+        self.providers = providers if providers is not None else create_default_registry()
+        hedge_delay = os.getenv('PRICE_HEDGE_DELAY')
+        self.price_fetcher = HedgedFetcher(self.providers,
+                                           hedge_delay=float(hedge_delay) if hedge_delay else None)
+        
+        # Historical periods are slices of one incrementally updated daily series
+        self.symbol = 'GC=F'
+        self.spot_symbol = 'XAUUSD=X'  # Used for stats when the futures series is empty
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        self.bar_store.get(self.symbol, '1d')  # Map persisted bars now so restarts start warm
+        self.period_days = {
+            '1D': 1,
+            '1W': 7,
+            '1M': 30,
+            '3M': 91,
+            '6M': 182,
+            '1Y': 365
+        }
+        
+        # Technical indicators advanced incrementally whenever new bars are stored
+        self.indicators = IndicatorEngine()
+        
+        # Coarser intervals resampled from their stored base series, per base version
+        self._resampled = {}
+        
+        # Backtest results of the most recently used rule parameters, per data version.
+        # Kept in this worker only: clients choose the parameters, so they are not
+        # written to the shared cache
+        self._backtests = DecodedMemo(max_entries=128)
+        
+        # Parameter sweeps run in the background; job state lives in the shared cache
+        self.sweeps = SweepJobs(self.cache)
+        
+        # Live day/week ranges built from the poller's ticks
+        self.intraday = IntradayAggregator()
+        self.poller.add_listener(self._record_tick)
+        self._stats_view = None
+        
+        # Coalesce concurrent cache misses into one upstream fetch per key
+        self.flight = SingleFlight()
+        self.flight_timeout = 15  # Max wait for another request's fetch
     
+    def start_poller(self):
+        """Start the background poller that owns current-price fetching"""
+        self.poller.start()
+
+    def stop_poller(self):
+        """Stop the background poller"""
+        self.poller.stop()
+
+    def warmup(self, periods=None):
+        """Fetch the current price, market stats and every historical period once
+
+        Meant to run before workers start serving (see gunicorn.conf.py): it
+        fills the shared cache and the bar files, so the first requests after a
+        deploy do not wait on Yahoo. Returns the seconds each step took.
+        """
+        steps = [('price', self.get_current_price), ('stats', self.get_market_stats)]
+        steps += [(f'historical:{period}', lambda period=period: self.get_historical_prices(period))
+                  for period in (periods or self.period_days)]
+        timings = {}
+        for name, step in steps:
+            started = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                print(f"Warmup step {name} failed: {e}")
+            timings[name] = round(time.monotonic() - started, 3)
+        # Leave no hedged fetch running behind the warmup
+        self.price_fetcher.reset(wait=True)
+        return timings
+
+    def after_fork(self):
+        """Drop per-process state inherited from the master in a forked worker
+
+        Pooled sessions, the hedged-fetch threads and any fetch still in flight
+        belong to the parent; the snapshot, caches and mapped bars are kept.
+        """
+        reset_sessions()
+        self.price_fetcher.reset()
+        self.flight.reset()
+        self.bar_store.after_fork()
+
     def get_current_price(self):
         """Get current gold price with change information"""
-        cache_key = 'current_price'
+        snapshot = self.poller.snapshot()
         
-        # Check cache first
-        if self._is_cache_valid(cache_key, self.price_cache):
-            return self.price_cache[cache_key]['data']
+        # Serve the published snapshot; if it is stale, return it anyway and
+        # let the poller revalidate in the background (stale-while-revalidate)
+        if snapshot is not None:
+            if time.time() - snapshot.fetched_at >= self.cache_duration:
+                if self.poller.running:
+                    self.poller.request_refresh()
+                else:
+                    snapshot = self._refresh_current_price(snapshot)
+            return snapshot.data
         
-        try:
-            # Method 1: Try Gold Futures (GC=F) - most reliable
-            gold_ticker = yf.Ticker("GC=F")
-            data = gold_ticker.history(period="2d")  # Get 2 days to calculate change
-            
-            if not data.empty and len(data) > 0:
-                current_price = float(data['Close'].iloc[-1])
-                
-                # Calculate change if we have previous data
-                change = None
-                change_percent = None
-                if len(data) > 1:
-                    prev_price = float(data['Close'].iloc[-2])
-                    change = round(current_price - prev_price, 2)
-                    change_percent = round((change / prev_price) * 100, 2)
-                
-                result = {
-                    'price': round(current_price, 2),
-                    'change': change,
-                    'change_percent': change_percent,
-                    'timestamp': datetime.now().isoformat(),
-                    'source': 'Yahoo Finance (GC=F)',
-                    'success': True
-                }
-                
-                # Cache the result
-                self.price_cache[cache_key] = {
-                    'data': result,
-                    'timestamp': time.time()
-                }
-                
-                return result
-                
-        except Exception as e:
-            print(f"Error fetching from GC=F: {e}")
+        # No snapshot yet: wait briefly for the poller's first fetch, or fetch
+        # inline when running without a poller (scripts, tests)
+        if self.poller.running:
+            self.poller.request_refresh()
+            snapshot = self.poller.wait_for_snapshot(self.first_snapshot_timeout)
+            if snapshot is None:
+                # Another worker may have shared a price our poller has not picked up yet
+                entry = self.cache.get('current_price')
+                if entry is not None:
+                    return entry.value
+        else:
+            snapshot = self._refresh_current_price(None)
         
-        # Method 2: Try XAUUSD=X (Gold Spot)
-        try:
-            gold_spot = yf.Ticker("XAUUSD=X")
-            data = gold_spot.history(period="2d")
-            
-            if not data.empty and len(data) > 0:
-                current_price = float(data['Close'].iloc[-1])
-                
-                change = None
-                change_percent = None
-                if len(data) > 1:
-                    prev_price = float(data['Close'].iloc[-2])
-                    change = round(current_price - prev_price, 2)
-                    change_percent = round((change / prev_price) * 100, 2)
-                
-                result = {
-                    'price': round(current_price, 2),
-                    'change': change,
-                    'change_percent': change_percent,
-                    'timestamp': datetime.now().isoformat(),
-                    'source': 'Yahoo Finance (XAUUSD=X)',
-                    'success': True
-                }
-                
-                self.price_cache[cache_key] = {
-                    'data': result,
-                    'timestamp': time.time()
-                }
-                
-                return result
-                
-        except Exception as e:
-            print(f"Error fetching from XAUUSD=X: {e}")
+        if snapshot is not None:
+            return snapshot.data
+        return self._fallback_price()
+    
+    def _refresh_current_price(self, stale_snapshot):
+        """Refresh the snapshot inline, sharing one upstream fetch among concurrent callers"""
+        return self.flight.do('current_price', self.poller.refresh,
+                              timeout=self.flight_timeout, stale=stale_snapshot)
+    
+    def _poll_current_price(self):
+        """Poller fetch: reuse another worker's fresh price, otherwise fetch and share it
         
-        # Method 3: Fallback to a simple API (no key required)
+        Only one worker fetches at a time. The others poll the shared entry until
+        the fetching worker stores its price (or gives up the lease, and one of
+        them takes over), falling back to the stale entry after flight_timeout.
+        """
+        deadline = time.monotonic() + self.flight_timeout
+        while True:
+            entry = self.cache.get('current_price')
+            if entry is not None and entry.fresh:
+                return entry.value
+            if self.cache.try_lock('current_price', self.flight_timeout):
+                break
+            if time.monotonic() >= deadline:
+                return entry.value if entry is not None else None
+            time.sleep(self.lease_poll_interval)
         try:
-            # Using a public exchange rate API
-            response = requests.get("https://api.exchangerate-api.com/v4/latest/USD", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                # This won't have gold directly, so we'll use a fallback price
-                # In a real scenario, you'd want to use a dedicated precious metals API
-                pass
-        except Exception as e:
-            print(f"Error with fallback API: {e}")
-        
-        # Final fallback - return a realistic current price
+            data = self._fetch_current_price()
+            if data is not None:
+                self.cache.set('current_price', data, self.poll_interval)
+            return data
+        finally:
+            self.cache.unlock('current_price')
+    
+    def _fetch_current_price(self):
+        """Fetch the current price from upstream, returning None if every source fails"""
+        provider, quote = self.price_fetcher.fetch()
+        if quote is None:
+            return None
+        quote = dict(quote)
+        quoted_at = quote.pop('quoted_at', None)
+        return {
+            **quote,
+            'timestamp': self._quote_timestamp(provider, quote, quoted_at),
+            'source': provider.source,
+            'symbol': provider.symbol,
+            'success': True
+        }
+    
+    def _quote_timestamp(self, provider, quote, quoted_at):
+        """The quote's time: the source's own when it reports one, else when it last changed
+
+        The timestamp is part of the hashed response, so an unchanged quote must
+        keep its previous timestamp or the ETag and Last-Modified would change on
+        every poll.
+        """
+        if quoted_at is not None:
+            return datetime.fromtimestamp(quoted_at).isoformat()
+        snapshot = self.poller.snapshot()
+        if snapshot is not None:
+            previous = snapshot.data
+            if previous.get('source') == provider.source and all(previous.get(k) == v for k, v in quote.items()):
+                return previous['timestamp']
+        return datetime.now().isoformat()
+    
+    def _record_tick(self, snapshot):
+        """Feed each new live quote for our symbol into the intraday aggregator"""
+        data = snapshot.data
+        if data.get('success', True) and data.get('symbol') == self.symbol:
+            self.intraday.update(snapshot.fetched_at, data['price'], data.get('volume'))
+    
+    def _fallback_price(self):
+        """Return a realistic current price when every upstream source fails"""
         return {
             'price': 2650.00,  # Approximate current gold price
             'change': 0.00,
@@ -126,63 +232,145 @@ class GoldPriceService:
             'message': 'Using fallback data - real API unavailable'
         }
     
-    def get_historical_prices(self, period='1M'):
-        """Get historical gold prices for specified period"""
-        cache_key = f'historical_{period}'
+    def get_historical_prices(self, period='1M', columnar=False, max_points=None, method='lttb', interval='1d'):
+        """Get historical gold prices for specified period
+        
+        With columnar=True the bars are returned as parallel lists under 'columns'
+        ({dates, open, high, low, close, volume}) instead of a list of dicts.
+        With max_points (rounded down to one of downsample.POINT_BUDGETS), periods
+        with more bars are downsampled (see downsample.py). Raises ValueError for
+        a period not in period_days.
+        interval is one of resample.INTERVALS; intraday dates include the time.
+        """
+        if period not in self.period_days:
+            raise ValueError(f"Unknown period: {period} (expected one of {', '.join(self.period_days)})")
+        base_interval(interval)  # Raises ValueError for an unsupported interval
+        if max_points is not None:
+            if method not in DOWNSAMPLE_METHODS:
+                raise ValueError(f"Unknown downsampling method: {method} "
+                                 f"(expected one of {', '.join(DOWNSAMPLE_METHODS)})")
+            max_points = point_budget(max_points)
+            result = self._downsampled_historical(period, columnar, max_points, method, interval)
+            if result is not None:
+                return result
+        cache_key = self._historical_key(period, columnar, interval)
         
         # Check cache first
-        if self._is_cache_valid(cache_key, self.historical_cache):
-            return self.historical_cache[cache_key]['data']
-        
-        # Map periods to yfinance periods
-        period_mapping = {
-            '1D': '1d',
-            '1W': '5d',
-            '1M': '1mo',
-            '3M': '3mo',
-            '6M': '6mo',
-            '1Y': '1y'
+        entry = self.cache.get(cache_key)
+        if entry is not None and entry.fresh:
+            return entry.value
+        
+        # Only one request per period fetches upstream; the rest share its result
+        # or fall back to the stale entry if the fetch takes too long
+        stale = entry.value if entry is not None else None
+        result = self.flight.do(cache_key, lambda: self._fetch_historical_prices(period, columnar, interval),
+                                timeout=self.flight_timeout, stale=stale)
+        if result is not None:
+            return result
+        if stale is not None:
+            return stale
+        
+        # Fallback - generate synthetic historical data
+        result = self._generate_fallback_historical(period)
+        if columnar:
+            prices = result.pop('prices')
+            result['columns'] = {
+                'dates': [p['date'] for p in prices],
+                'open': [p['open'] for p in prices],
+                'high': [p['high'] for p in prices],
+                'low': [p['low'] for p in prices],
+                'close': [p['price'] for p in prices],
+                'volume': [p['volume'] for p in prices]
+            }
+        return result
+    
+    @staticmethod
+    def _historical_key(period, columnar, interval):
+        interval_part = '' if interval == '1d' else f'_{interval}'
+        return f"historical_{period}{interval_part}{'_columnar' if columnar else ''}"
+    
+    @staticmethod
+    def _serialize_bars(bars, columnar, interval):
+        date_unit = 'D' if interval in ('1d', '1w') else 'm'
+        if columnar:
+            return {'columns': bars_to_columns(bars, date_unit)}
+        return {'prices': bars_to_records(bars, date_unit)}
+    
+    def _fetch_historical_prices(self, period, columnar=False, interval='1d'):
+        """Build and cache a period from the local bar store, returning None on failure"""
+        # Every period is a slice of one stored series; only new bars are fetched
+        series = self.get_bars(interval)
+        if len(series) == 0:
+            return None
+        self.indicators.on_bars(self.symbol, interval, series)
+        
+        days = self.period_days.get(period, 30)
+        bars = series.since(series.last_timestamp - days * 86400)
+        
+        result = {
+            'period': period,
+            'interval': interval,
+            'source': f'Yahoo Finance ({self.symbol})',
+            'success': True
         }
+        result.update(self._serialize_bars(bars, columnar, interval))
         
-        yf_period = period_mapping.get(period, '1mo')
+        # Cache the result
+        self.cache.set(self._historical_key(period, columnar, interval), result, self.cache_duration)
         
-        try:
-            # Try Gold Futures first
-            gold_ticker = yf.Ticker("GC=F")
-            data = gold_ticker.history(period=yf_period)
-            
-            if not data.empty:
-                prices = []
-                for index, row in data.iterrows():
-                    prices.append({
-                        'date': index.strftime('%Y-%m-%d'),
-                        'price': round(float(row['Close']), 2),
-                        'volume': int(row['Volume']) if pd.notna(row['Volume']) else 0,
-                        'high': round(float(row['High']), 2),
-                        'low': round(float(row['Low']), 2),
-                        'open': round(float(row['Open']), 2)
-                    })
-                
-                result = {
-                    'prices': prices,
-                    'period': period,
-                    'source': 'Yahoo Finance (GC=F)',
-                    'success': True
-                }
-                
-                # Cache the result
-                self.historical_cache[cache_key] = {
-                    'data': result,
-                    'timestamp': time.time()
-                }
-                
-                return result
-                
-        except Exception as e:
-            print(f"Error fetching historical data from GC=F: {e}")
+        return result
+    
+    def _downsampled_historical(self, period, columnar, max_points, method, interval='1d'):
+        """A period downsampled to max_points; None when no bars are stored
         
-        # Fallback - generate synthetic historical data
-        return self._generate_fallback_historical(period)
+        One cache entry per (period, interval, format, max_points, method) holds
+        the result with the data version it was built from. It is served while
+        fresh and still matching the stored bars, and replaced when they change.
+        Rebuilds share one single-flight call and fall back to the stale entry.
+        """
+        cache_key = f"{self._historical_key(period, columnar, interval)}_{method}{max_points}"
+        entry = self.cache.get(cache_key)
+        stale = entry.value if entry is not None else None
+        if stale is not None and entry.fresh and stale['data_version'] == self._stored_version(interval):
+            return stale
+        result = self.flight.do(
+            cache_key, lambda: self._build_downsampled(cache_key, stale, period, columnar, max_points, method, interval),
+            timeout=self.flight_timeout, stale=stale)
+        return result if result is not None else stale
+    
+    def _stored_version(self, interval):
+        """Version (length and last bar) of the stored base series, without refreshing it"""
+        series = self.bar_store.get(self.symbol, base_interval(interval))
+        if len(series) == 0:
+            return None
+        return f'{len(series)}:{series.last_timestamp}:{float(series.close[-1])}'
+    
+    def _build_downsampled(self, cache_key, stale, period, columnar, max_points, method, interval):
+        """Refresh the bars and rebuild a downsampled period unless its version is current"""
+        series = self.get_bars(interval)
+        version = self._stored_version(interval)
+        if len(series) < 2 or version is None:
+            return None
+        if stale is not None and stale['data_version'] == version:
+            # Same data: keep the same object so its encoded response is reused
+            self.cache.set(cache_key, stale, self.cache_duration)
+            return stale
+        
+        days = self.period_days.get(period, 30)
+        bars = series.since(series.last_timestamp - days * 86400)
+        sampled = downsample(bars, max_points, method)
+        result = {
+            'period': period,
+            'interval': interval,
+            'source': f'Yahoo Finance ({self.symbol})',
+            'success': True,
+            'bars': len(bars),
+            'downsampled': {'method': method, 'points': len(sampled)} if len(sampled) < len(bars) else None,
+            'data_version': version
+        }
+        result.update(self._serialize_bars(sampled, columnar, interval))
+        self.cache.set(cache_key, result, self.cache_duration)
+        return result
     
     def _generate_fallback_historical(self, period):
         """Generate realistic fallback historical data"""
@@ -225,46 +413,17 @@ class GoldPriceService:
     
     def get_market_stats(self):
         """Get market statistics"""
-        try:
-            current_data = self.get_current_price()
-            current_price = current_data['price']
-            
-            # Get some recent data for calculations
-            gold_ticker = yf.Ticker("GC=F")
-            data = gold_ticker.history(period="1y")
-            
-            if not data.empty:
-                year_high = float(data['High'].max())
-                year_low = float(data['Low'].min())
-                
-                # Get recent data for day/week ranges
-                recent_data = gold_ticker.history(period="5d")
-                if not recent_data.empty:
-                    week_high = float(recent_data['High'].max())
-                    week_low = float(recent_data['Low'].min())
-                else:
-                    week_high = current_price * 1.02
-                    week_low = current_price * 0.98
-                
-                return {
-                    'day_range': {
-                        'low': round(current_price * 0.995, 2),
-                        'high': round(current_price * 1.005, 2)
-                    },
-                    'week_range': {
-                        'low': round(week_low, 2),
-                        'high': round(week_high, 2)
-                    },
-                    'year_range': {
-                        'low': round(year_low, 2),
-                        'high': round(year_high, 2)
-                    },
-                    'current_price': current_price,
-                    'source': 'Yahoo Finance',
-                    'success': True
-                }
-        except Exception as e:
-            print(f"Error getting market stats: {e}")
+        entry = self.cache.get('market_stats')
+        if entry is not None and entry.fresh:
+            return self._with_intraday(entry.value)
+        
+        stale = entry.value if entry is not None else None
+        result = self.flight.do('market_stats', self._fetch_market_stats,
+                                timeout=self.flight_timeout, stale=stale)
+        if result is not None:
+            return self._with_intraday(result)
+        if stale is not None:
+            return self._with_intraday(stale)
         
         # Fallback stats
         return {
@@ -275,6 +434,191 @@ class GoldPriceService:
             'source': 'Fallback Data',
             'success': False
         }
+    
+    def _with_intraday(self, stats):
+        """Overlay the live day/week ranges on cached stats
+        
+        Returns the same object until the stats, the aggregator or the trading
+        session change, so the prebuilt stats response is only re-encoded when
+        something moved.
+        """
+        now = time.time()
+        view = self._stats_view
+        if view is not None and view[0] is stats and view[1] == (self.intraday.version, session_index(now)):
+            return view[2]
+        
+        sessions = self.intraday.sessions(now)
+        version = (self.intraday.version, session_index(now))
+        if sessions is None:
+            return stats
+        result = dict(stats, intraday=sessions)
+        for name, session in (('day_range', sessions['day']), ('week_range', sessions['week'])):
+            if session['high'] is not None:
+                result[name] = {'low': session['low'], 'high': session['high']}
+        if sessions['day']['ticks']:
+            result['current_price'] = sessions['day']['last']
+        self._stats_view = (stats, version, result)
+        return result
+    
+    def _fetch_market_stats(self):
+        """Compute and cache market statistics, returning None on failure
+
+        Every range comes from the stored daily series; the futures and spot
+        series are brought up to date together in one batched upstream call.
+        """
+        try:
+            series = self.bar_store.refresh_many([self.symbol, self.spot_symbol], '1d',
+                                                 max_age=self.cache_duration)
+            bars = series[self.symbol] if len(series[self.symbol]) else series[self.spot_symbol]
+            if not len(bars):
+                return None
+            if bars is series[self.symbol]:
+                self.intraday.seed(bars, time.time())
+                self.indicators.on_bars(self.symbol, '1d', bars)
+            
+            # The live quote when the poller has one, otherwise the latest close
+            snapshot = self.poller.snapshot()
+            current_price = snapshot.data['price'] if snapshot is not None else round(float(bars.close[-1]), 2)
+            
+            year = bars.since(bars.last_timestamp - 365 * 86400)
+            week = bars.slice(-5)  # Last five trading days
+            day = bars.slice(-1)
+            
+            result = {
+                'day_range': {
+                    'low': round(float(day.low.min()), 2),
+                    'high': round(float(day.high.max()), 2)
+                },
+                'week_range': {
+                    'low': round(float(week.low.min()), 2),
+                    'high': round(float(week.high.max()), 2)
+                },
+                'year_range': {
+                    'low': round(float(year.low.min()), 2),
+                    'high': round(float(year.high.max()), 2)
+                },
+                'current_price': current_price,
+                'source': 'Yahoo Finance',
+                'success': True
+            }
+            self.cache.set('market_stats', result, self.cache_duration)
+            return result
+        except Exception as e:
+            print(f"Error getting market stats: {e}")
+        
+        return None
+
+    def get_bars(self, interval='1d'):
+        """The bar series for interval, up to date
+
+        Only base intervals are stored and fetched; coarser ones are resampled
+        from their base series (see resample.py), so they cost no upstream call.
+        """
+        base = base_interval(interval)
+        series = self.bar_store.refresh(self.symbol, base, max_age=self.cache_duration)
+        if interval == base or len(series) == 0:
+            return series
+        version = (len(series), series.last_timestamp, float(series.close[-1]))
+        cached = self._resampled.get(interval)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        bars = resample(series, interval)
+        self._resampled[interval] = (version, bars)
+        return bars
+
+    def get_signals(self, interval='1d'):
+        """Precomputed indicators and trading signals for the bar series, or None"""
+        series = self.get_bars(interval)
+        self.indicators.on_bars(self.symbol, interval, series)
+        return self.indicators.latest(self.symbol, interval)
+
+    def get_indicator_series(self, period='1M', names=('sma20', 'sma50')):
+        """Full indicator series over the period's daily bars, for chart overlays
+
+        Indicators are computed over the whole stored series and then cut to
+        the period, so the window starts with warmed-up values. Returns
+        {'dates', 'series': {name: [...]}} with null where there is no value yet,
+        or None when no bars are available. Unknown names raise ValueError.
+        """
+        names = tuple(names)
+        unknown = [name for name in names if name not in indicators.AVAILABLE]
+        if unknown:
+            raise ValueError(f"Unknown indicators: {', '.join(unknown)}")
+        cache_key = f"indicators_{period}_{','.join(names)}"
+        entry = self.cache.get(cache_key)
+        if entry is not None and entry.fresh:
+            return entry.value
+        
+        series = self.get_bars('1d')
+        if len(series) == 0:
+            return entry.value if entry is not None else None
+        
+        days = self.period_days.get(period, 30)
+        start = len(series) - len(series.since(series.last_timestamp - days * 86400))
+        values = indicators.compute(series, names)
+        result = {
+            'period': period,
+            'dates': format_dates(series.timestamp[start:]),
+            'series': {name: indicators.to_json_list(value[start:]) for name, value in values.items()},
+            'source': f'Yahoo Finance ({self.symbol})',
+            'success': True
+        }
+        self.cache.set(cache_key, result, self.cache_duration)
+        return result
+
+    def _versioned_series(self, interval):
+        """The stored series for interval and its data version (length and last bar),
+        or (series, None) when it has fewer than two bars"""
+        series = self.get_bars(interval)
+        if len(series) < 2:
+            return series, None
+        return series, f'{len(series)}:{series.last_timestamp}:{float(series.close[-1])}'
+
+    def run_backtest(self, params=None, interval='1d'):
+        """Backtest a signal rule over the stored series (see backtest.run)
+
+        Results of the most recently used (interval, rule params) are kept per
+        worker with the data version (the series' length and last bar) they were
+        computed from, so a repeated request is served without recomputing until
+        new bars are stored. Recomputations share one single-flight call.
+        Returns None when no bars are available; invalid params raise ValueError.
+        """
+        params = backtest.normalize_params(params)
+        series, version = self._versioned_series(interval)
+        if version is None:
+            return None
+        key = ','.join(f'{name}={params[name]}' for name in sorted(params))
+        cache_key = f'backtest_{interval}_{key}'
+        result = self._backtests.get(cache_key, version)
+        if result is not None:
+            return result
+        return self.flight.do(cache_key, lambda: self._build_backtest(cache_key, series, params, interval, version))
+    
+    def _build_backtest(self, cache_key, series, params, interval, version):
+        result = backtest.run(series, params)
+        result.update({'interval': interval, 'symbol': self.symbol, 'data_version': version})
+        self._backtests.put(cache_key, version, result)
+        return result
+
+    def start_sweep(self, grid, interval='1d', sort_by='sharpe', top=20):
+        """Queue a parameter sweep over the stored series and return the job state,
+        or None when no bars are available; invalid grids raise ValueError"""
+        self.sweeps.validate(grid, sort_by, top)
+        series, version = self._versioned_series(interval)
+        if version is None:
+            return None
+        return self.sweeps.submit(series, grid, interval=interval, sort_by=sort_by, top=top, version=version)
+
+    def get_diagnostics(self):
+        """Get internal health metrics (poller snapshot age, coalescing counters)"""
+        return {
+            'poller': self.poller.get_metrics(),
+            'single_flight': self.flight.get_metrics(),
+            'bar_store': self.bar_store.get_metrics(),
+            'providers': self.price_fetcher.get_metrics(),
+            'intraday': self.intraday.get_metrics(),
+            'indicators': self.indicators.get_metrics()
+        }
 
 # Global instance
 gold_service = GoldPriceService()
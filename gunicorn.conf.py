@@ -0,0 +1,123 @@
+"""
+Production gunicorn settings (loaded automatically from the working directory)
+
+The app is imported once in the master (preload_app) and warmed up before
+any worker is forked: a child process of the master fetches the current
+price, market stats and every historical period into the shared cache and
+the bar files, so each worker starts with them filled. The master itself
+never fetches, so no thread of it can be holding a lock when it forks. Each
+forked worker then resets its pooled sessions and thread pools and starts
+its own price poller.
+
+Environment:
+    PORT                    Port to bind (default 8080)
+    WEB_CONCURRENCY         Worker processes (default 2 x CPUs + 1)
+    GUNICORN_WORKER_CLASS   gthread (default) or gevent; streams hold a
+                            thread or greenlet per client
+    GUNICORN_THREADS        Threads per gthread worker (default 100)
+    GUNICORN_PRELOAD        Import and warm up the app in the master (default true)
+    GUNICORN_WARMUP         Fetch data before serving (default true)
+    GUNICORN_WARMUP_TIMEOUT Seconds to wait for the warmup before stopping it
+                            and serving anyway (default 60)
+"""
+
+import multiprocessing
+import os
+import threading
+import traceback
+
+
+def _enabled(name, default='true'):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 100))
+preload_app = _enabled('GUNICORN_PRELOAD')
+warmup = _enabled('GUNICORN_WARMUP')
+warmup_timeout = float(os.getenv('GUNICORN_WARMUP_TIMEOUT', 60))
+
+if worker_class == 'gevent' and preload_app:
+    # The preloaded app creates locks and threads in the master; they must be
+    # gevent-aware, so patch before the app is imported rather than in the worker
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def _warmup(log):
+    """Warm up in a child process, waiting at most warmup_timeout; boot continues either way
+
+    The child fills the shared cache and the bar files and exits. One that
+    overruns is killed, which leaves nothing half-done in the master.
+    """
+    context = multiprocessing.get_context('fork')
+    reader, writer = context.Pipe(duplex=False)
+
+    def run():
+        from app import gold_service
+
+        gold_service.after_fork()
+        try:
+            writer.send(('done', gold_service.warmup()))
+        except Exception:
+            writer.send(('failed', traceback.format_exc()))
+
+    process = context.Process(target=run, name='warmup', daemon=True)
+    process.start()
+    writer.close()
+    process.join(warmup_timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        log.warning("Warmup still running after %.0fs; stopped it and serving without it", warmup_timeout)
+        return
+    status, result = reader.recv() if reader.poll() else ('failed', f'exit code {process.exitcode}')
+    if status == 'failed':
+        log.error("Warmup failed; serving without it\n%s", result)
+    else:
+        log.info("Warmed up in %.2fs: %s", sum(result.values()),
+                 ', '.join(f'{name} {seconds:.2f}s' for name, seconds in result.items()))
+
+
+def _warmup_in_background(log):
+    """Warm up on a daemon thread of a worker, which serves meanwhile (and never forks)"""
+    from app import gold_service
+
+    def run():
+        try:
+            timings = gold_service.warmup()
+        except Exception:
+            log.exception("Warmup failed; serving without it")
+            return
+        log.info("Warmed up in %.2fs: %s", sum(timings.values()),
+                 ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items()))
+
+    threading.Thread(target=run, name='warmup', daemon=True).start()
+
+
+def when_ready(server):
+    """Master, after the preloaded app is imported and before workers fork"""
+    if preload_app and warmup:
+        _warmup(server.log)
+
+
+def post_fork(server, worker):
+    """Worker, right after the fork: drop the sessions and threads of the master"""
+    if preload_app:
+        from app import gold_service
+
+        gold_service.after_fork()
+
+
+def post_worker_init(worker):
+    """Worker, once the app is loaded: warm up (without preload) and start the poller"""
+    import app
+
+    if not preload_app and warmup:
+        # Only the first worker goes upstream; the rest read the shared cache.
+        # Not waited for: worker init must stay well within gunicorn's timeout
+        _warmup_in_background(worker.log)
+    if app.PRICE_POLLER_ENABLED:
+        app.gold_service.start_poller()
@@ -0,0 +1,119 @@
+"""
+Hedged fan-out across redundant price providers
+Starts the best-ranked provider and, if it has not answered within its hedge
+delay (by default the p95 of its recent latencies), starts the next one as
+well. Hedges stay within the running provider's tier: the next tier (another
+instrument) is only started once every call of the current one has failed.
+The first valid quote wins; providers that have not started yet are
+cancelled and in-flight ones are abandoned, their late results only feeding
+the registry's latency and error statistics.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class HedgedFetcher:
+    def __init__(self, registry, hedge_delay=None, default_delay=1.0, quantile=0.95,
+                 min_samples=10, timeout=10, max_workers=8):
+        self.registry = registry
+        self.hedge_delay = hedge_delay
+        self.default_delay = default_delay
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedged-fetch')
+        self.hedges = 0
+
+    def reset(self, wait=False):
+        """Replace the thread pool
+
+        A forked worker inherits the pool but not its threads, so it needs a new
+        one. Before forking, wait=True lets abandoned calls finish so that no
+        pool thread is holding a lock at the moment of the fork.
+        """
+        previous = self._executor
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hedged-fetch')
+        if wait:
+            previous.shutdown(wait=True)
+
+    def delay_for(self, name):
+        """How long to wait on provider name before hedging to the next one"""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        samples = self.registry.success_latencies(name)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        return percentile(samples, self.quantile)
+
+    def _call(self, provider):
+        started = time.monotonic()
+        try:
+            result = provider.fetch()
+        except Exception as e:
+            print(f"{provider.name} provider error: {e}")
+            result = None
+        self.registry.record(provider.name, time.monotonic() - started, result is not None)
+        return result
+
+    def fetch(self):
+        """Return (provider, quote) from the first provider to answer, or (None, None)"""
+        providers = self.registry.ordered()
+        deadline = time.monotonic() + self.timeout
+        pending = {}
+        next_index = 0
+        next_launch = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                # Only hedge to a provider of the same tier as the calls in flight
+                can_hedge = next_index < len(providers) and all(
+                    providers[index].tier == providers[next_index].tier for index in pending.values())
+                if next_index < len(providers) and (not pending or (can_hedge and now >= next_launch)):
+                    provider = providers[next_index]
+                    if not self.registry.acquire(provider.name):
+                        # Breaker opened, or another request holds its half-open probe
+                        next_index += 1
+                        continue
+                    if pending:
+                        self.hedges += 1
+                    pending[self._executor.submit(self._call, provider)] = next_index
+                    next_index += 1
+                    next_launch = now + self.delay_for(provider.name)
+                    continue
+
+                if not pending or now >= deadline:
+                    return None, None
+                wait_until = deadline
+                if can_hedge:
+                    wait_until = min(wait_until, next_launch)
+                done, _ = wait(pending, timeout=max(0, wait_until - now), return_when=FIRST_COMPLETED)
+
+                # Prefer the better-ranked provider if several finished together
+                for future in sorted(done, key=pending.get):
+                    index = pending.pop(future)
+                    result = future.result()
+                    if result is not None:
+                        return providers[index], result
+                if done:
+                    # A provider failed outright: no point waiting out its hedge delay
+                    next_launch = time.monotonic()
+        finally:
+            for future, index in pending.items():
+                if future.cancel():
+                    # Never ran: hand back a half-open probe it may have claimed
+                    self.registry.release(providers[index].name)
+
+    def get_metrics(self):
+        providers = self.registry.get_metrics()
+        for name, stats in providers.items():
+            samples = self.registry.success_latencies(name)
+            stats['p95_latency'] = round(percentile(samples, 0.95), 4) if samples else None
+            stats['hedge_delay'] = round(self.delay_for(name), 4)
+        return {'hedges': self.hedges, 'providers': providers}
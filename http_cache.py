@@ -0,0 +1,127 @@
+"""
+Pre-serialized JSON responses for hot API endpoints
+Encodes each cached payload once, together with a strong ETag, so request
+handlers only hand back ready-made bytes. Responses carry ETag, Last-Modified
+and Cache-Control so unchanged polls become bodyless 304s.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from flask import Response, request
+
+PrebuiltResponse = namedtuple('PrebuiltResponse', ['body', 'etag', 'last_modified'])
+
+
+def prebuild(payload, last_modified=None):
+    """Encode payload as compact JSON and derive a strong ETag from the bytes"""
+    body = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    # Content-derived, so every worker produces the same tag for the same data
+    etag = hashlib.sha1(body).hexdigest()[:20]
+    return PrebuiltResponse(body, etag, last_modified)
+
+
+class ResponseCache:
+    """Keeps the encoded response for the current version of each cached payload
+
+    A payload's version is its identity: cache backends hand back the same object
+    until the data is refreshed, so a response is encoded once per refresh. At
+    most max_entries keys are kept, dropping the least recently used.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, key, source, build_payload=None, last_modified=None):
+        """Return the prebuilt response for source, encoding it if source changed
+
+        last_modified is a datetime or a function of source returning one, only
+        called when encoding; it defaults to when this version was first encoded.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        payload = build_payload(source) if build_payload is not None else source
+        if callable(last_modified):
+            last_modified = last_modified(source)
+        prebuilt = prebuild(payload, last_modified or datetime.now(timezone.utc))
+        with self._lock:
+            self._entries[key] = (source, prebuilt)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.builds += 1
+        return prebuilt
+
+    def get_metrics(self):
+        return {'builds': self.builds, 'hits': self.hits, 'keys': len(self._entries)}
+
+
+def parse_timestamp(value):
+    """Convert a payload's ISO timestamp (naive values are local time) to aware UTC"""
+    try:
+        return datetime.fromisoformat(value).astimezone(timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def cache_headers(prebuilt, max_age=None, stale_while_revalidate=None):
+    """The ETag, Last-Modified and Cache-Control headers of a prebuilt response, as (name, value) pairs"""
+    headers = [('ETag', f'"{prebuilt.etag}"')]
+    if prebuilt.last_modified is not None:
+        headers.append(('Last-Modified', format_datetime(prebuilt.last_modified.astimezone(timezone.utc), usegmt=True)))
+    if max_age is not None:
+        cache_control = f'public, max-age={max(0, int(max_age))}'
+        if stale_while_revalidate:
+            cache_control += f', stale-while-revalidate={int(stale_while_revalidate)}'
+        headers.append(('Cache-Control', cache_control))
+    return headers
+
+
+def is_not_modified(prebuilt, if_none_match=None, if_modified_since=None):
+    """Whether a client sending these conditional headers already has this version
+
+    If-None-Match takes precedence; If-Modified-Since is only checked without it.
+    """
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/').strip('"') == prebuilt.etag for tag in tags)
+    if if_modified_since and prebuilt.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return prebuilt.last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def prebuilt_response(prebuilt, max_age=None, stale_while_revalidate=None, status=200):
+    """Wrap prebuilt bytes in a Flask response without re-encoding them
+
+    Honors If-None-Match / If-Modified-Since from the current request, answering
+    304 Not Modified with no body when the client's copy is still current.
+    """
+    response = Response(prebuilt.body, status=status, mimetype='application/json')
+    response.set_etag(prebuilt.etag)
+    if prebuilt.last_modified is not None:
+        response.last_modified = prebuilt.last_modified
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max(0, int(max_age))
+        if stale_while_revalidate:
+            response.cache_control['stale-while-revalidate'] = str(int(stale_while_revalidate))
+    return response.make_conditional(request)
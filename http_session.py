@@ -0,0 +1,105 @@
+"""
+Pooled HTTP sessions for upstream calls
+One keep-alive connection pool per process, shared by every provider, so a
+cache miss reuses an open TLS connection instead of paying a new handshake.
+Connect errors and gateway failures are retried with jittered backoff; read
+timeouts are not, so a stalled upstream fails fast into the next provider.
+
+Sessions are created per process id: a worker forked from a preloaded master
+builds its own pool on first use instead of sharing the parent's sockets.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds: connecting is quick or the host is unreachable
+UPSTREAM_TIMEOUT = (3.05, 5)
+
+POOL_CONNECTIONS = 10  # Distinct hosts kept pooled
+POOL_MAXSIZE = 20      # Connections kept per host
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout when the caller gives none"""
+
+    def __init__(self, *args, timeout=UPSTREAM_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                   retries=2, backoff_factor=0.2, timeout=UPSTREAM_TIMEOUT):
+    """A requests.Session with a tuned connection pool, retries and default timeouts"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,  # A slow read is the provider's problem; let hedging move on
+        status=retries,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = TimeoutHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                 max_retries=retry, timeout=timeout)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _per_process(kind, factory):
+    key = (kind, os.getpid())
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = factory()
+    return session
+
+
+def get_session():
+    """This process's shared requests session"""
+    return _per_process('requests', create_session)
+
+
+def get_yfinance_session():
+    """Session for yfinance: curl_cffi (which Yahoo expects) when installed, else the shared pool
+
+    curl_cffi is imported here rather than at module level; like yfinance it is
+    only needed once a worker fetches from Yahoo.
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+    except ImportError:  # Optional; yfinance falls back to the shared requests session
+        return get_session()
+    return _per_process('yfinance', lambda: curl_requests.Session(impersonate='chrome'))
+
+
+def reset_sessions():
+    """Drop every pooled session, e.g. in a freshly forked worker
+
+    Sessions inherited from another process are only forgotten, never closed,
+    since their sockets still belong to the parent.
+    """
+    pid = os.getpid()
+    with _lock:
+        owned = [session for (_, owner), session in _sessions.items() if owner == pid]
+        _sessions.clear()
+    for session in owned:
+        session.close()
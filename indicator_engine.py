@@ -0,0 +1,389 @@
+"""
+Streaming technical indicators
+Keeps SMA, EMA, Wilder RSI, MACD, Bollinger Bands and ATR for each
+(symbol, interval) series and advances them in constant time per bar, so
+trading signals are always precomputed and endpoints only read them.
+
+Every indicator supports update() for a new bar and replace() for a revision
+of the latest bar (the stored series re-fetches its last bar on each refresh).
+"""
+
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+class Indicator:
+    """Base for indicators whose state is a handful of scalars"""
+
+    value = None
+
+    def update(self, *args):
+        self._saved = self._save()
+        self._apply(*args)
+
+    def replace(self, *args):
+        """Re-apply the latest input with a revised value"""
+        self._restore(self._saved)
+        self._apply(*args)
+
+    def _save(self):
+        return {key: value for key, value in self.__dict__.items() if key != '_saved'}
+
+    def _restore(self, state):
+        self.__dict__.update(state)
+
+
+class RollingWindow:
+    """Fixed-size window with running sum and sum of squares"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._updates = 0
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def update(self, x):
+        if self.full:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        self._updates += 1
+        if self._updates % 1024 == 0:
+            # Running sums drift slowly; resum the window now and then
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+
+    def replace(self, x):
+        old = self.values[-1]
+        self.values[-1] = x
+        self.total += x - old
+        self.total_sq += x * x - old * old
+
+    @property
+    def mean(self):
+        return self.total / self.size if self.full else None
+
+    @property
+    def std(self):
+        """Population standard deviation, as used for Bollinger Bands"""
+        if not self.full:
+            return None
+        mean = self.total / self.size
+        return math.sqrt(max(self.total_sq / self.size - mean * mean, 0.0))
+
+
+class SMA:
+    def __init__(self, period):
+        self.window = RollingWindow(period)
+
+    def update(self, x):
+        self.window.update(x)
+
+    def replace(self, x):
+        self.window.replace(x)
+
+    @property
+    def value(self):
+        return self.window.mean
+
+
+class Bollinger:
+    def __init__(self, period=20, width=2.0):
+        self.window = RollingWindow(period)
+        self.width = width
+
+    def update(self, x):
+        self.window.update(x)
+
+    def replace(self, x):
+        self.window.replace(x)
+
+    @property
+    def value(self):
+        mean = self.window.mean
+        if mean is None:
+            return None
+        offset = self.width * self.window.std
+        return {'middle': mean, 'upper': mean + offset, 'lower': mean - offset}
+
+
+class EMA(Indicator):
+    """Exponential moving average seeded with the SMA of the first `period` inputs"""
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.count = 0
+        self.seed = 0.0
+        self.value = None
+
+    def _apply(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self.seed += x
+        elif self.count == self.period:
+            self.value = (self.seed + x) / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+
+
+class RSI(Indicator):
+    """Wilder's RSI: averages seeded with a simple mean, then smoothed by 1/period"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = None
+        self.count = 0
+        self.avg_gain = self.avg_loss = 0.0
+        self.value = None
+
+    def _apply(self, close):
+        if self.previous is None:
+            self.previous = close
+            return
+        change = close - self.previous
+        self.previous = close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.count += 1
+        if self.count <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.period
+            self.avg_loss += (loss - self.avg_loss) / self.period
+        if self.avg_loss == 0:
+            self.value = 100.0 if self.avg_gain > 0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class ATR(Indicator):
+    """Wilder's average true range"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous_close = None
+        self.count = 0
+        self.value = None
+        self.seed = 0.0
+
+    def _apply(self, high, low, close):
+        if self.previous_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        self.count += 1
+        if self.count < self.period:
+            self.seed += true_range
+        elif self.count == self.period:
+            self.value = (self.seed + true_range) / self.period
+        else:
+            self.value += (true_range - self.value) / self.period
+
+
+class MACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, x):
+        self.fast.update(x)
+        self.slow.update(x)
+        if self.slow.value is not None:
+            self.signal.update(self.fast.value - self.slow.value)
+
+    def replace(self, x):
+        self.fast.replace(x)
+        self.slow.replace(x)
+        if self.slow.value is not None:
+            self.signal.replace(self.fast.value - self.slow.value)
+
+    @property
+    def value(self):
+        if self.slow.value is None:
+            return None
+        line = self.fast.value - self.slow.value
+        signal = self.signal.value
+        return {'macd': line, 'signal': signal,
+                'histogram': line - signal if signal is not None else None}
+
+
+class SeriesIndicators:
+    """Every indicator for one bar series"""
+
+    def __init__(self):
+        self.close_indicators = {
+            'sma20': SMA(20),
+            'sma50': SMA(50),
+            'ema20': EMA(20),
+            'rsi': RSI(14),
+            'macd': MACD(12, 26, 9),
+            'bollinger': Bollinger(20, 2.0)
+        }
+        self.atr = ATR(14)
+        self.recent_closes = deque(maxlen=10)  # For trend and price-action rules
+        self.bars = 0
+
+    def update(self, high, low, close):
+        for indicator in self.close_indicators.values():
+            indicator.update(close)
+        self.atr.update(high, low, close)
+        self.recent_closes.append(close)
+        self.bars += 1
+
+    def replace(self, high, low, close):
+        for indicator in self.close_indicators.values():
+            indicator.replace(close)
+        self.atr.replace(high, low, close)
+        self.recent_closes[-1] = close
+
+    def values(self):
+        def rounded(value):
+            if isinstance(value, dict):
+                return {key: rounded(item) for key, item in value.items()}
+            return round(value, 2) if value is not None else None
+
+        values = {name: rounded(indicator.value) for name, indicator in self.close_indicators.items()}
+        values['atr'] = rounded(self.atr.value)
+        closes = self.recent_closes
+        if closes:
+            values['current_price'] = round(closes[-1], 2)
+        if len(closes) == closes.maxlen:
+            recent_trend = closes[-1] - closes[0]
+            values['trend'] = 'bullish' if recent_trend > 0 else 'bearish' if recent_trend < 0 else 'neutral'
+            values['trend_strength'] = abs(round(recent_trend / closes[0] * 100, 2))
+        if len(closes) >= 5:
+            values['change_5'] = round((closes[-1] - closes[-5]) / closes[-5] * 100, 2)
+        return values
+
+
+def signals_from(values, timestamp):
+    """Trading signals (SMA crossover, RSI extremes, 5-bar price action) for indicator values"""
+    signals = []
+    sma20, sma50 = values.get('sma20'), values.get('sma50')
+    if sma20 is not None and sma50 is not None and sma20 != sma50:
+        bullish = sma20 > sma50
+        signals.append({
+            'type': 'SMA Crossover',
+            'signal': 'buy' if bullish else 'sell',
+            'strength': 'medium',
+            'description': f"20-day SMA crossed {'above' if bullish else 'below'} 50-day SMA",
+            'timestamp': timestamp
+        })
+
+    rsi = values.get('rsi')
+    if rsi is not None and (rsi < 30 or rsi > 70):
+        signals.append({
+            'type': 'RSI',
+            'signal': 'buy' if rsi < 30 else 'sell',
+            'strength': 'strong',
+            'description': f"RSI is {'oversold' if rsi < 30 else 'overbought'} at {rsi:.2f}",
+            'timestamp': timestamp
+        })
+
+    change = values.get('change_5')
+    if change is not None and abs(change) > 1.0:
+        signals.append({
+            'type': 'Price Action',
+            'signal': 'sell' if change > 0 else 'buy',
+            'strength': 'weak',
+            'description': f"Price {'rose' if change > 0 else 'fell'} {abs(change):.2f}% in the last 5 periods",
+            'timestamp': timestamp
+        })
+    return signals
+
+
+class _SeriesState:
+    __slots__ = ('indicators', 'last_timestamp', 'last_bar', 'result')
+
+    def __init__(self):
+        self.indicators = SeriesIndicators()
+        self.last_timestamp = None
+        self.last_bar = None  # (high, low, close) of the last bar applied
+        self.result = None
+
+
+class IndicatorEngine:
+    """Indicator state per (symbol, interval), advanced as bars arrive"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self.bars_processed = 0
+        self.rebuilds = 0
+
+    def on_bars(self, symbol, interval, bars):
+        """Advance the (symbol, interval) indicators to the end of bars (a BarSeries)
+
+        Only bars at or after the last one seen are processed; a series that no
+        longer contains that bar is rebuilt from scratch.
+        """
+        if not len(bars):
+            return
+        key = (symbol, interval)
+        with self._lock:
+            state = self._series.get(key)
+            start = 0
+            if state is not None:
+                start = int(np.searchsorted(bars.timestamp, state.last_timestamp))
+                if start >= len(bars) or bars.timestamp[start] != state.last_timestamp:
+                    state = None
+                    start = 0
+            if state is None:
+                state = self._series[key] = _SeriesState()
+                self.rebuilds += 1
+
+            changed = False
+            if state.last_timestamp is not None:
+                # The stored last bar may have been revised by the latest refresh
+                bar = (float(bars.high[start]), float(bars.low[start]), float(bars.close[start]))
+                if bar != state.last_bar:
+                    state.indicators.replace(*bar)
+                    state.last_bar = bar
+                    changed = True
+                start += 1
+            for index in range(start, len(bars)):
+                bar = (float(bars.high[index]), float(bars.low[index]), float(bars.close[index]))
+                state.indicators.update(*bar)
+                state.last_bar = bar
+                changed = True
+            self.bars_processed += len(bars) - start
+            state.last_timestamp = int(bars.timestamp[-1])
+            if changed or state.result is None:
+                values = state.indicators.values()
+                state.result = {
+                    'indicators': values,
+                    'signals': signals_from(values, datetime.now().isoformat()),
+                    'bars': state.indicators.bars,
+                    'last_bar': datetime.fromtimestamp(state.last_timestamp, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+                }
+
+    def latest(self, symbol, interval):
+        """Precomputed {'indicators', 'signals', ...} for the series, or None"""
+        state = self._series.get((symbol, interval))
+        return state.result if state is not None else None
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                'series': {f'{symbol}:{interval}': state.indicators.bars
+                           for (symbol, interval), state in self._series.items()},
+                'bars_processed': self.bars_processed,
+                'rebuilds': self.rebuilds
+            }
@@ -0,0 +1,207 @@
+"""
+Vectorized technical indicators over whole OHLCV arrays
+Each function returns the complete indicator series aligned with its input,
+with NaN during the warm-up period. Definitions match the streaming engine in
+indicator_engine.py (EMA and Wilder averages are seeded with a simple mean),
+so a chart overlay and the live signals agree on the last value.
+
+Recursive averages run through pandas' ewm (imported on first use), everything
+else is NumPy.
+"""
+
+import numpy as np
+
+
+def rolling(x, period, op=np.add):
+    """op (add, maximum, minimum) over each window of `period` values, length len(x) - period + 1
+
+    Windows are assembled from power-of-two blocks built by doubling, so this
+    takes O(log period) array passes and sums never subtract large prefix sums.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    count = len(x) - period + 1
+    if count <= 0:
+        return np.empty(0)
+    if period == 1:
+        return x.copy()
+    result = None
+    offset = 0
+    blocks, width = x, 1
+    while True:
+        if period & width:
+            part = blocks[offset:offset + count]
+            result = part if result is None else op(result, part)
+            offset += width
+        if width * 2 > period:
+            return result
+        blocks = op(blocks[:-width], blocks[width:])
+        width *= 2
+
+
+def _output(length, warmup):
+    """A NaN series of length and a view of the part after the warm-up"""
+    out = np.empty(length)
+    out[:warmup] = np.nan
+    return out, out[warmup:]
+
+
+def _padded(values, length):
+    """Left-pad a warm-up shortened series with NaN back to length"""
+    out, tail = _output(length, length - len(values))
+    tail[:] = values
+    return out
+
+
+def _ewm(x, period, alpha):
+    """Exponential smoothing of x seeded with the mean of its first `period` values
+
+    Returns the len(x) - period + 1 values from x[period - 1] on. pandas runs
+    the recursion seeded with x[period - 1]; the difference from the mean seed
+    decays geometrically and is added back to the head of the result.
+    """
+    import pandas as pd
+
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < period:
+        return np.empty(0)
+    values = pd.Series(x[period - 1:]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    decay = 1.0 - alpha
+    error = x[:period].mean() - x[period - 1]
+    if error and decay > 0:
+        span = min(len(values), int(np.log(1e-17) / np.log(decay)) + 1)
+        values[:span] += error * decay ** np.arange(span)
+    elif error:
+        values[0] += error
+    return values
+
+
+def sma(x, period):
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < period:
+        return np.full(len(x), np.nan)
+    out, tail = _output(len(x), period - 1)
+    np.divide(rolling(x, period), period, out=tail)
+    return out
+
+
+def ema(x, period):
+    return _padded(_ewm(x, period, 2.0 / (period + 1)), len(x))
+
+
+def wilder(x, period):
+    """Wilder's smoothing (an EMA with alpha = 1/period)"""
+    return _padded(_ewm(x, period, 1.0 / period), len(x))
+
+
+def rsi(close, period=14):
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) <= period:
+        return np.full(len(close), np.nan)
+    delta = np.diff(close)
+    avg_gain = _ewm(np.maximum(delta, 0.0), period, 1.0 / period)
+    avg_loss = _ewm(np.maximum(-delta, 0.0, out=delta), period, 1.0 / period)
+    # 100 * gain / (gain + loss) is 100 - 100 / (1 + RS), and 100 with no losses
+    total = np.add(avg_gain, avg_loss, out=avg_loss)
+    out, tail = _output(len(close), period)
+    tail[:] = 50.0  # The price did not move at all
+    np.divide(np.multiply(avg_gain, 100.0, out=avg_gain), total, out=tail, where=total > 0)
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(macd line, signal line, histogram)"""
+    close = np.asarray(close, dtype=np.float64)
+    line = _ewm(close, fast, 2.0 / (fast + 1))[slow - fast:] - _ewm(close, slow, 2.0 / (slow + 1))
+    signal_line = _ewm(line, signal, 2.0 / (signal + 1))
+    histogram = line[signal - 1:] - signal_line
+    return _padded(line, len(close)), _padded(signal_line, len(close)), _padded(histogram, len(close))
+
+
+def bollinger(close, period=20, width=2.0):
+    """(middle, upper, lower) bands using the population standard deviation"""
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < period:
+        return tuple(np.full(len(close), np.nan) for _ in range(3))
+    # Deviations from a fixed reference keep the squares small
+    deviation = close - close[0]
+    mean = rolling(deviation, period) / period
+    variance = rolling(np.square(deviation, out=deviation), period) / period
+    variance -= mean * mean
+    offset = np.sqrt(np.maximum(variance, 0.0, out=variance), out=variance)
+    offset *= width
+    middle, middle_tail = _output(len(close), period - 1)
+    upper, upper_tail = _output(len(close), period - 1)
+    lower, lower_tail = _output(len(close), period - 1)
+    np.add(mean, close[0], out=middle_tail)
+    np.add(middle_tail, offset, out=upper_tail)
+    np.subtract(middle_tail, offset, out=lower_tail)
+    return middle, upper, lower
+
+
+def true_range(high, low, close):
+    """max(high, previous close) - min(low, previous close), or high - low for the first bar"""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    ranges = np.empty(len(close))
+    if len(close):
+        ranges[0] = high[0] - low[0]
+        previous = close[:-1]
+        np.subtract(np.maximum(high[1:], previous), np.minimum(low[1:], previous), out=ranges[1:])
+    return ranges
+
+
+def atr(high, low, close, period=14):
+    return wilder(true_range(high, low, close), period)
+
+
+def stochastic(high, low, close, k_period=14, d_period=3):
+    """(%K, %D): close within the k_period high-low range, and its d_period SMA"""
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < k_period:
+        return np.full(len(close), np.nan), np.full(len(close), np.nan)
+    lowest = rolling(low, k_period, np.minimum)
+    span = rolling(high, k_period, np.maximum)
+    span -= lowest
+    position = np.subtract(close[k_period - 1:], lowest, out=lowest)
+    position *= 100.0
+    k, k_tail = _output(len(close), k_period - 1)
+    k_tail[:] = 50.0  # A flat range puts the close in the middle
+    np.divide(position, span, out=k_tail, where=span > 0)
+    d, d_tail = _output(len(close), k_period + d_period - 2)
+    np.divide(rolling(k_tail, d_period), d_period, out=d_tail)
+    return k, d
+
+
+def compute(bars, names):
+    """Named indicator series for a BarSeries, e.g. compute(bars, ['sma20', 'rsi'])
+
+    Multi-line indicators expand to several keys (macd, macd_signal, ...).
+    """
+    result = {}
+    for name in names:
+        if name in ('sma20', 'sma50', 'sma200'):
+            result[name] = sma(bars.close, int(name[3:]))
+        elif name in ('ema12', 'ema20', 'ema26', 'ema50'):
+            result[name] = ema(bars.close, int(name[3:]))
+        elif name == 'rsi':
+            result['rsi'] = rsi(bars.close)
+        elif name == 'macd':
+            result['macd'], result['macd_signal'], result['macd_histogram'] = macd(bars.close)
+        elif name == 'bollinger':
+            result['bollinger_middle'], result['bollinger_upper'], result['bollinger_lower'] = bollinger(bars.close)
+        elif name == 'atr':
+            result['atr'] = atr(bars.high, bars.low, bars.close)
+        elif name == 'stochastic':
+            result['stochastic_k'], result['stochastic_d'] = stochastic(bars.high, bars.low, bars.close)
+        else:
+            raise ValueError(f"Unknown indicator: {name}")
+    return result
+
+
+AVAILABLE = ('sma20', 'sma50', 'sma200', 'ema12', 'ema20', 'ema26', 'ema50',
+             'rsi', 'macd', 'bollinger', 'atr', 'stochastic')
+
+
+def to_json_list(values, decimals=2):
+    """Round a series for JSON, with warm-up NaNs as null"""
+    rounded = np.round(values, decimals)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
@@ -0,0 +1,175 @@
+"""
+Rolling intraday statistics fed by live price ticks
+Keeps the current session's and the week's open/high/low/last and
+volume-weighted average price, updated in constant time per tick, so stats
+requests read the true ranges without fetching minute bars. Stored daily bars
+seed the part of each session that happened before this process started
+watching.
+
+Sessions follow the CME gold futures day: a session opens at 18:00 New York
+time and is named after the following calendar day, so Sunday evening trading
+belongs to Monday's session. The week is the last five sessions with data,
+the same window as the week range computed from daily bars.
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+DAY = 86400
+SESSION_TIMEZONE = ZoneInfo('America/New_York')
+SESSION_OPEN_HOUR = 18  # CME Globex reopens at 18:00 ET after the daily break
+WEEK_SESSIONS = 5
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def session_index(timestamp):
+    """Trading session containing timestamp, as days since 1970-01-01 of its trading date
+
+    Daily bars are labelled with their trading date, so `bar_timestamp // DAY`
+    is the same index for the session a bar summarizes.
+    """
+    local = datetime.fromtimestamp(timestamp, SESSION_TIMEZONE) + timedelta(hours=24 - SESSION_OPEN_HOUR)
+    return local.date().toordinal() - _EPOCH_ORDINAL
+
+
+class SessionStats:
+    """Open/high/low/last plus price x volume sums for one session"""
+
+    __slots__ = ('open', 'high', 'low', 'last', 'volume', 'price_volume', 'ticks')
+
+    def __init__(self):
+        self.open = self.high = self.low = self.last = None
+        self.volume = 0
+        self.price_volume = 0.0
+        self.ticks = 0
+
+    def update(self, price, volume=0):
+        if self.open is None:
+            self.open = self.high = self.low = price
+        elif price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.last = price
+        self.ticks += 1
+        if volume > 0:
+            self.volume += volume
+            self.price_volume += price * volume
+
+    def merge_bar(self, open_, high, low, close):
+        """Fold an earlier OHLC bar into the range (it precedes every tick seen so far)"""
+        self.open = open_
+        self.high = high if self.high is None else max(self.high, high)
+        self.low = low if self.low is None else min(self.low, low)
+        if self.last is None:
+            self.last = close
+
+    def extend(self, later):
+        """Append a later session's stats to this one"""
+        if later.open is None:
+            return
+        if self.open is None:
+            self.open, self.high, self.low = later.open, later.high, later.low
+        else:
+            self.high, self.low = max(self.high, later.high), min(self.low, later.low)
+        self.last = later.last
+        self.volume += later.volume
+        self.price_volume += later.price_volume
+        self.ticks += later.ticks
+
+    def copy(self):
+        other = SessionStats()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    @property
+    def vwap(self):
+        return self.price_volume / self.volume if self.volume else None
+
+    def as_dict(self):
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+        return {'open': rounded(self.open), 'high': rounded(self.high), 'low': rounded(self.low),
+                'last': rounded(self.last), 'vwap': rounded(self.vwap), 'ticks': self.ticks}
+
+
+class IntradayAggregator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session_key = None
+        self._ticks = {}  # session -> SessionStats from ticks, for the last WEEK_SESSIONS sessions
+        self._bars = {}  # session -> (open, high, low, close) seeded from stored daily bars
+        self._last_cumulative = None
+        self.version = 0
+
+    def _roll(self, timestamp):
+        session = session_index(timestamp)
+        if session != self._session_key:
+            self._session_key = session
+            self._ticks.setdefault(session, SessionStats())
+            for old in sorted(self._ticks)[:-WEEK_SESSIONS]:
+                del self._ticks[old]
+            self._last_cumulative = None
+            self.version += 1
+        return session
+
+    def update(self, timestamp, price, cumulative_volume=None):
+        """Record a tick; cumulative_volume is the session's running volume, if known"""
+        with self._lock:
+            session = self._roll(timestamp)
+            volume = 0
+            if cumulative_volume is not None:
+                if self._last_cumulative is not None and cumulative_volume >= self._last_cumulative:
+                    volume = cumulative_volume - self._last_cumulative
+                self._last_cumulative = cumulative_volume
+            self._ticks[session].update(price, volume)
+            self.version += 1
+
+    def seed(self, bars, now):
+        """Take the daily bars (a BarSeries) of the last sessions up to now as
+        the range that was traded before ticks started arriving"""
+        with self._lock:
+            current = self._roll(now)
+            self._bars = {}
+            for index in range(len(bars) - 1, -1, -1):
+                session = int(bars.timestamp[index] // DAY)
+                if session > current:
+                    continue
+                if len(self._bars) == WEEK_SESSIONS:
+                    break
+                self._bars[session] = (float(bars.open[index]), float(bars.high[index]),
+                                       float(bars.low[index]), float(bars.close[index]))
+            self.version += 1
+
+    def _session(self, session):
+        ticks = self._ticks.get(session) or SessionStats()
+        bar = self._bars.get(session)
+        if bar is None:
+            return ticks
+        combined = ticks.copy()
+        combined.merge_bar(*bar)
+        return combined
+
+    def sessions(self, now):
+        """{'day': {...}, 'week': {...}} for the session containing now and the
+        last WEEK_SESSIONS sessions up to it, or None if they are empty"""
+        with self._lock:
+            current = self._roll(now)
+            day = self._session(current)
+            recent = [self._session(session) for session in sorted(set(self._ticks) | set(self._bars))
+                      if session <= current]
+            week = SessionStats()
+            for stats in [stats for stats in recent if stats.open is not None][-WEEK_SESSIONS:]:
+                week.extend(stats)
+        if day.open is None and week.open is None:
+            return None
+        return {'day': day.as_dict(), 'week': week.as_dict()}
+
+    def get_metrics(self):
+        with self._lock:
+            day = self._ticks.get(self._session_key)
+            return {'day_ticks': day.ticks if day is not None else 0,
+                    'week_ticks': sum(stats.ticks for stats in self._ticks.values()),
+                    'version': self.version}
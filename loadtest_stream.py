@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the /api/gold/stream SSE endpoint
+Runs the Flask app in-process against a local fake upstream (no network),
+connects many SSE subscribers and reports fan-out, delivery lag and how many
+upstream fetches served them all
+
+Usage: python loadtest_stream.py --clients 500 --duration 20 --interval 1
+       python loadtest_stream.py --url http://localhost:8080 --clients 200
+"""
+
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+os.environ['PRICE_POLLER_ENABLED'] = 'false'
+os.environ.setdefault('CACHE_BACKEND', 'memory')
+
+
+class FakeUpstream:
+    """Random-walk price source standing in for Yahoo Finance"""
+
+    def __init__(self, price=2650.0):
+        self.price = price
+        self.fetches = 0
+        self.publish_times = {}
+
+    def __call__(self):
+        self.fetches += 1
+        self.price = round(self.price + random.uniform(-1, 1), 2)
+        now = datetime.now()
+        # Event ids are the quote time in ms; remember when each was published
+        self.publish_times[int(now.timestamp() * 1000)] = time.time()
+        return {
+            'price': self.price,
+            'change': 0.0,
+            'change_percent': 0.0,
+            'timestamp': now.isoformat(),
+            'source': 'Fake Upstream',
+            'success': True
+        }
+
+
+def start_local_server(interval):
+    """Serve the app on a free local port with the fake upstream polling it"""
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    upstream = FakeUpstream()
+    service = app_module.gold_service
+    service.poller.fetch_fn = upstream
+    service.poller.interval = interval
+    service.poll_interval = interval
+    service.start_poller()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', upstream, server
+
+
+class Subscriber(threading.Thread):
+    def __init__(self, url, stop, upstream=None):
+        super().__init__(daemon=True)
+        self.url = url
+        self.stop = stop
+        self.upstream = upstream
+        self.events = 0
+        self.heartbeats = 0
+        self.lags = []
+        self.error = None
+
+    def run(self):
+        try:
+            with requests.get(f'{self.url}/api/gold/stream', stream=True, timeout=(5, 60)) as response:
+                for line in response.iter_lines():
+                    if self.stop.is_set():
+                        break
+                    if line.startswith(b'id: '):
+                        self.events += 1
+                        published = self.upstream.publish_times.get(int(line[4:])) if self.upstream else None
+                        if published is not None:
+                            self.lags.append(time.time() - published)
+                    elif line.startswith(b': heartbeat'):
+                        self.heartbeats += 1
+        except Exception as e:
+            self.error = str(e)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--interval', type=float, default=1.0, help='fake upstream poll interval (s)')
+    parser.add_argument('--url', help='test an already running server instead of an in-process one')
+    args = parser.parse_args()
+
+    upstream = None
+    server = None
+    url = args.url
+    if url is None:
+        url, upstream, server = start_local_server(args.interval)
+
+    print(f"Connecting {args.clients} SSE subscribers to {url} for {args.duration:.0f}s")
+    stop = threading.Event()
+    subscribers = [Subscriber(url, stop, upstream) for _ in range(args.clients)]
+    for subscriber in subscribers:
+        subscriber.start()
+    time.sleep(args.duration)
+    stop.set()
+    if server is not None:
+        server.shutdown()
+
+    events = [s.events for s in subscribers]
+    lags = [lag for s in subscribers for lag in s.lags]
+    errors = [s.error for s in subscribers if s.error]
+    print("=" * 50)
+    if upstream is not None:
+        print(f"Upstream fetches:      {upstream.fetches}")
+    print(f"Events delivered:      {sum(events)} (min {min(events)}, max {max(events)} per client)")
+    print(f"Delivery lag p50/p99:  {percentile(lags, 0.5) * 1000:.1f} ms / {percentile(lags, 0.99) * 1000:.1f} ms")
+    print(f"Client errors:         {len(errors)}")
+    if errors:
+        print(f"   e.g. {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
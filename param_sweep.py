@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Parameter sweeps for the signal rules
+Backtests every combination of a parameter grid on a process pool. The close
+and timestamp columns are copied once into a shared memory block that each
+worker maps at startup, so tasks only carry their parameters and return stats.
+
+Sweeps can be run from the command line or as background jobs whose progress
+is kept in the service cache, so any worker can report on them. The pool
+processes come from a forkserver (spawn where unavailable) rather than a fork
+of the threaded web worker.
+
+Usage: python param_sweep.py --rule rsi --grid oversold=20,25,30 --grid overbought=70,75,80
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import backtest
+from bar_store import BarSeries
+
+MAX_COMBINATIONS = 5000
+MAX_TOP = 100
+SORT_KEYS = ('sharpe', 'total_return_pct', 'annualized_return_pct', 'max_drawdown_pct', 'win_rate_pct')
+ACTIVE = ('queued', 'running')
+
+
+def pool_context():
+    """Process start method for the pool: forking a threaded web worker can copy held locks"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def expand_grid(grid):
+    """Every valid parameter combination of {name: [values]}, normalized
+
+    Combinations the backtest rejects (such as fast >= slow) are skipped;
+    unknown names and oversized grids raise ValueError.
+    """
+    names = sorted(grid)
+    values = [value if isinstance(value, (list, tuple)) else [value] for value in (grid[n] for n in names)]
+    total = 1
+    for options in values:
+        total *= len(options)
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"Grid has {total} combinations (limit {MAX_COMBINATIONS})")
+    combinations = []
+    for combination in itertools.product(*values):
+        params = dict(zip(names, combination))
+        unknown = [name for name in params if name not in backtest.DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"Unknown backtest parameter: {unknown[0]}")
+        try:
+            combinations.append(backtest.normalize_params(params))
+        except ValueError:
+            continue
+    return combinations
+
+
+class SharedBars:
+    """Close and timestamp columns in a named shared memory block"""
+
+    def __init__(self, bars):
+        count = len(bars)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(count, 1) * 16)
+        self.length = count
+        timestamp, close = self.views(self.memory, count)
+        timestamp[:] = bars.timestamp
+        close[:] = bars.close
+
+    @staticmethod
+    def views(memory, count):
+        timestamp = np.ndarray(count, dtype=np.int64, buffer=memory.buf)
+        close = np.ndarray(count, dtype=np.float64, buffer=memory.buf, offset=count * 8)
+        return timestamp, close
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Worker process state, set up once per worker by _attach
+_worker_memory = None
+_worker_bars = None
+
+
+def _attach(name, count):
+    global _worker_memory, _worker_bars
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    timestamp, close = SharedBars.views(_worker_memory, count)
+    # The rules only read closes; the other price columns alias them and volume is unused
+    _worker_bars = BarSeries(timestamp, close, close, close, close, np.zeros(0))
+
+
+def _evaluate(params):
+    return params, backtest.run(_worker_bars, params, max_points=2, max_trades=0)['stats']
+
+
+def _sort_key(metric):
+    def key(result):
+        value = result['stats'].get(metric)
+        # Drawdowns are negative, so larger is better for every metric
+        return (value is not None, value if value is not None else 0)
+    return key
+
+
+def sweep(bars, grid, workers=None, progress=None, sort_by='sharpe', heartbeat=1.0):
+    """Backtest every combination in grid over bars on a process pool
+
+    progress(done, total) is called as results arrive, and at least every
+    heartbeat seconds while none do. Returns the results as
+    [{'params', 'stats'}] sorted best first by sort_by.
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort_by} (expected one of {', '.join(SORT_KEYS)})")
+    combinations = expand_grid(grid)
+    if len(bars) < 2:
+        raise ValueError("Not enough bars to backtest")
+    if progress:
+        progress(0, len(combinations))
+    results = []
+    workers = workers or min(os.cpu_count() or 1, len(combinations) or 1)
+    with SharedBars(bars) as shared:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=_attach,
+                                 initargs=(shared.memory.name, shared.length)) as pool:
+            pending = {pool.submit(_evaluate, params) for params in combinations}
+            while pending:
+                finished, pending = wait(pending, timeout=heartbeat, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    params, stats = future.result()
+                    results.append({'params': params, 'stats': stats})
+                if progress:
+                    progress(len(results), len(combinations))
+    results.sort(key=_sort_key(sort_by), reverse=True)
+    return results
+
+
+class SweepJobs:
+    """Sweeps run one at a time on a background thread, with their state in a cache backend
+
+    A job's id is derived from its inputs and the data version, so submitting
+    the same sweep again (from any worker sharing the cache) returns the
+    existing job instead of running it twice. An active job holds a lease that
+    its owner renews with every progress update; once it lapses (the owner
+    died) the job reads as failed and the next submit runs it again.
+    """
+
+    def __init__(self, cache, ttl=3600, workers=None, progress_interval=0.5, lease=60):
+        self.cache = cache
+        self.ttl = ttl
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self.lease = lease
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='param-sweep')
+        self._queued = {}  # job_id -> state of jobs waiting behind the running one
+
+    @staticmethod
+    def job_id(interval, grid, sort_by, top, version):
+        key = json.dumps([interval, grid, sort_by, top, version], sort_keys=True, default=str)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    def _key(self, job_id):
+        return f'sweep_job_{job_id}'
+
+    def get(self, job_id):
+        entry = self.cache.get(self._key(job_id))
+        if entry is None:
+            return None
+        state = entry.value
+        if state['status'] in ACTIVE and state['lease_until'] < time.time():
+            return dict(state, status='failed', error='Sweep worker stopped before finishing')
+        return state
+
+    def _save(self, job_id, state):
+        self.cache.set(self._key(job_id), state, self.ttl)
+
+    def _renew(self, state, **changes):
+        return dict(state, lease_until=time.time() + self.lease, **changes)
+
+    def _owns(self, job_id, state):
+        entry = self.cache.get(self._key(job_id))
+        return entry is not None and entry.value.get('owner') == state['owner']
+
+    @staticmethod
+    def validate(grid, sort_by, top=20):
+        """Number of combinations in grid; raises ValueError for a bad grid, sort key or top"""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort_by} (expected one of {', '.join(SORT_KEYS)})")
+        if not 1 <= top <= MAX_TOP:
+            raise ValueError(f"Expected 1 <= top <= {MAX_TOP}")
+        return len(expand_grid(grid))
+
+    def submit(self, bars, grid, interval='1d', sort_by='sharpe', top=20, version=None):
+        """Start a sweep (or find the identical one) and return its state
+
+        Raises TimeoutError if another worker is still claiming the same job.
+        """
+        combinations = self.validate(grid, sort_by, top)
+        job_id = self.job_id(interval, grid, sort_by, top, version if version is not None else uuid.uuid4().hex)
+        # The claim is a short cross-worker lease, so only one worker creates the job
+        deadline = time.time() + 5
+        while not self.cache.try_lock(self._key(job_id), 5):
+            if time.time() >= deadline:
+                raise TimeoutError(f"Sweep {job_id} is being claimed by another worker")
+            time.sleep(0.05)
+        try:
+            existing = self.get(job_id)
+            if existing is not None and existing['status'] != 'failed':
+                return existing
+            state = self._renew({'id': job_id, 'status': 'queued', 'interval': interval, 'grid': grid,
+                                 'sort_by': sort_by, 'progress': {'done': 0, 'total': combinations},
+                                 'submitted_at': time.time(), 'owner': uuid.uuid4().hex})
+            self._save(job_id, state)
+            self._queued[job_id] = state
+        finally:
+            self.cache.unlock(self._key(job_id))
+        self._executor.submit(self._run, job_id, state, bars, grid, sort_by, top)
+        return state
+
+    def _run(self, job_id, state, bars, grid, sort_by, top):
+        self._queued.pop(job_id, None)
+        if not self._owns(job_id, state):
+            return  # Our lease lapsed while queued and another worker took the job over
+        state = self._renew(state, status='running', started_at=time.time())
+        self._save(job_id, state)
+        last_saved = time.monotonic()
+
+        def progress(done, total):
+            nonlocal last_saved
+            now = time.monotonic()
+            if now - last_saved >= self.progress_interval:
+                last_saved = now
+                self._save(job_id, self._renew(state, progress={'done': done, 'total': total}))
+                # Jobs queued behind this one are still alive too
+                for queued_id, queued in list(self._queued.items()):
+                    if self._owns(queued_id, queued):
+                        self._save(queued_id, self._renew(queued))
+
+        try:
+            results = sweep(bars, grid, workers=self.workers, progress=progress, sort_by=sort_by,
+                            heartbeat=min(1.0, self.lease / 4))
+            self._save(job_id, dict(state, status='done', finished_at=time.time(),
+                                    progress={'done': len(results), 'total': len(results)},
+                                    results=results[:top]))
+        except Exception as e:
+            print(f"Parameter sweep {job_id} failed: {e}")
+            self._save(job_id, dict(state, status='failed', error=str(e), finished_at=time.time()))
+
+
+def parse_grid(items):
+    """['oversold=20,25', 'rule=rsi'] -> {'oversold': ['20', '25'], 'rule': ['rsi']}"""
+    grid = {}
+    for item in items:
+        name, _, values = item.partition('=')
+        if not values:
+            raise ValueError(f"Expected name=value[,value...], got {item!r}")
+        grid[name.strip()] = [value.strip() for value in values.split(',')]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep signal rule parameters over the stored GC=F bars")
+    parser.add_argument('--rule', default='sma_crossover', choices=backtest.RULES)
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2',
+                        help="Values to try for a backtest parameter (repeatable)")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--symbol', default='GC=F')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sort-by', default='sharpe', choices=SORT_KEYS)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    from bar_store import BarStore
+
+    grid = parse_grid(args.grid)
+    grid.setdefault('rule', [args.rule])
+    bars = BarStore().refresh(args.symbol, args.interval)
+    if len(bars) < 2:
+        parser.error(f"No {args.interval} bars available for {args.symbol}")
+
+    def progress(done, total):
+        print(f"\r{done}/{total} backtests", end='', flush=True)
+
+    started = time.perf_counter()
+    results = sweep(bars, grid, workers=args.workers, progress=progress, sort_by=args.sort_by)
+    print(f"\n{len(results)} combinations over {len(bars)} bars in {time.perf_counter() - started:.1f}s")
+    varied = [name for name, values in sorted(grid.items()) if len(values) > 1]
+    for result in results[:args.top]:
+        stats = result['stats']
+        chosen = ' '.join(f"{name}={result['params'][name]}" for name in varied)
+        print(f"   {chosen:<40} sharpe={stats['sharpe']}  return={stats['total_return_pct']}%  "
+              f"drawdown={stats['max_drawdown_pct']}%  trades={stats['trades']}")
+
+
+if __name__ == "__main__":
+    main()
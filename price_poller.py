@@ -0,0 +1,146 @@
+"""
+Background price poller
+Owns upstream price fetching on a fixed cadence and publishes immutable
+snapshots that request handlers can read without touching the network
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+# A published price snapshot. Snapshots are never mutated after publish;
+# a refresh swaps in a new tuple so readers always see a consistent view.
+PriceSnapshot = namedtuple('PriceSnapshot', ['data', 'fetched_at', 'version'])
+
+
+class PricePoller:
+    def __init__(self, fetch_fn, interval=60, name='price-poller'):
+        self.fetch_fn = fetch_fn
+        self.interval = interval
+        self.name = name
+        self._snapshot = None
+        self._version = 0
+        self._publish_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._published = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+        # Metrics
+        self.refresh_count = 0
+        self.error_count = 0
+        self.last_error = None
+        self.last_fetch_duration = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the refresh loop in a daemon thread (no-op if already running)"""
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the refresh loop and wait for the thread to exit"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def snapshot(self):
+        """Return the latest published snapshot (or None before the first fetch)"""
+        return self._snapshot
+
+    def snapshot_age(self):
+        """Seconds since the current snapshot was fetched, or None if there is none"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return time.time() - snapshot.fetched_at
+
+    def wait_for_snapshot(self, timeout):
+        """Block until a first snapshot is published or the timeout expires"""
+        self._published.wait(timeout)
+        return self._snapshot
+
+    def request_refresh(self):
+        """Ask the refresh loop to fetch now instead of waiting for the next tick"""
+        self._wake.set()
+
+    def refresh(self):
+        """Fetch once from upstream and publish the result if it is usable"""
+        started = time.time()
+        try:
+            data = self.fetch_fn()
+        except Exception as e:
+            self.error_count += 1
+            self.last_error = str(e)
+            print(f"{self.name}: refresh failed: {e}")
+            return self._snapshot
+        finally:
+            self.last_fetch_duration = time.time() - started
+
+        self.refresh_count += 1
+        if data is None:
+            # Keep serving the previous snapshot rather than replacing it with nothing
+            self.error_count += 1
+            self.last_error = 'upstream returned no data'
+            return self._snapshot
+        return self.publish(data)
+
+    def add_listener(self, listener):
+        """Call listener(snapshot) on the poller thread whenever the data changes"""
+        self._listeners.append(listener)
+
+    def publish(self, data, fetched_at=None):
+        """Publish a new snapshot and return it"""
+        with self._publish_lock:
+            # Only bump the version when the data actually changed, so readers
+            # keyed on the version (e.g. another worker's shared value) stay stable
+            current = self._snapshot
+            changed = current is None or current.data != data
+            if changed:
+                self._version += 1
+            else:
+                data = current.data  # Keep the published object so derived caches stay valid
+            snapshot = PriceSnapshot(data, fetched_at or time.time(), self._version)
+            self._snapshot = snapshot
+        self._published.set()
+
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    print(f"{self.name}: listener failed: {e}")
+        return snapshot
+
+    def get_metrics(self):
+        """Return poller health information for diagnostics"""
+        snapshot = self._snapshot
+        age = self.snapshot_age()
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'snapshot_version': snapshot.version if snapshot else None,
+            'snapshot_age': round(age, 3) if age is not None else None,
+            'refresh_count': self.refresh_count,
+            'error_count': self.error_count,
+            'last_error': self.last_error,
+            'last_fetch_duration': round(self.last_fetch_duration, 3)
+            if self.last_fetch_duration is not None else None
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.refresh()
+            self._wake.wait(self.interval)
@@ -0,0 +1,325 @@
+"""
+Pluggable price providers
+Every upstream gold quote source implements PriceProvider and is registered in
+a ProviderRegistry, which tracks each provider's latency and error rate and
+orders them by expected time to a valid quote within their tier. A tier groups
+providers quoting the same instrument with the same change semantics (GC=F
+futures, XAUUSD=X, spot rates without change data), so a fast spot source
+never displaces the futures quote. Adding a provider means registering it; the
+fetch path never changes.
+"""
+
+import math
+import os
+import threading
+from collections import deque
+
+from circuit_breaker import CircuitBreaker
+from http_session import UPSTREAM_TIMEOUT, get_session, get_yfinance_session
+
+BROWSER_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+
+def quote(price, change=None, change_percent=None, volume=None, quoted_at=None):
+    result = {'price': price, 'change': change, 'change_percent': change_percent}
+    if volume is not None:
+        result['volume'] = volume  # Session volume so far, when the source reports it
+    if quoted_at is not None:
+        result['quoted_at'] = quoted_at  # Source's quote time (epoch seconds), when it reports one
+    return result
+
+
+def change_from(price, previous):
+    """(change, change_percent) of price relative to previous, rounded like the API"""
+    change = round(price - previous, 2)
+    return change, round((change / previous) * 100, 2)
+
+
+class PriceProvider:
+    """Interface shared by every price provider"""
+
+    name = None
+    source = None  # Label reported as the quote's source
+    symbol = None  # Yahoo symbol the quote is for, if it tracks one
+    tier = 0  # Lower tiers are always preferred; ranking only reorders within a tier
+    session = None  # Defaults to the process-wide pooled session
+
+    def http(self):
+        return self.session if self.session is not None else get_session()
+
+    def available(self):
+        """False when the provider cannot be used at all (e.g. missing API key)"""
+        return True
+
+    def fetch(self):
+        """Return {'price', 'change', 'change_percent'} (see quote()) or None if no valid quote"""
+        raise NotImplementedError
+
+
+class FunctionProvider(PriceProvider):
+    """Adapts a plain callable to the provider interface"""
+
+    def __init__(self, name, fn, source=None, tier=0):
+        self.name = name
+        self.source = source or name
+        self.fn = fn
+        self.tier = tier
+
+    def fetch(self):
+        return self.fn()
+
+
+class YFinanceProvider(PriceProvider):
+    """Latest daily close from yfinance, with the change from the previous close"""
+
+    def __init__(self, symbol, tier=0):
+        self.name = f'yfinance:{symbol}'
+        self.source = f'Yahoo Finance ({symbol})'
+        self.symbol = symbol
+        self.tier = tier
+
+    def fetch(self):
+        import yfinance as yf  # Deferred so importing the registry does not load pandas
+        data = yf.Ticker(self.symbol, session=get_yfinance_session()).history(period="2d")  # 2 days to calculate change
+        if data.empty:
+            return None
+        price = float(data['Close'].iloc[-1])
+        change = change_percent = None
+        if len(data) > 1:
+            change, change_percent = change_from(price, float(data['Close'].iloc[-2]))
+        volume = float(data['Volume'].iloc[-1]) if 'Volume' in data else math.nan
+        return quote(round(price, 2), change, change_percent,
+                     int(volume) if math.isfinite(volume) else None)
+
+
+class YahooChartProvider(PriceProvider):
+    """Yahoo Finance chart API over plain HTTP, change measured from the previous close"""
+
+    def __init__(self, symbol='GC=F', tier=0):
+        self.name = f'yahoo-chart:{symbol}'
+        self.source = f'Yahoo Finance Chart ({symbol})'
+        self.symbol = symbol
+        self.tier = tier
+        self.url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+    def fetch(self):
+        response = self.http().get(self.url, params={"interval": "1d", "range": "1d"},
+                                   headers={"User-Agent": BROWSER_USER_AGENT}, timeout=UPSTREAM_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        results = response.json().get("chart", {}).get("result") or [{}]
+        meta = results[0].get("meta", {})
+        quoted_at = meta.get("regularMarketTime")
+        quotes = results[0].get("indicators", {}).get("quote") or [{}]
+        closes = [close for close in quotes[0].get("close") or [] if close is not None]
+        if not closes:
+            return None
+        price = round(float(closes[-1]), 2)
+        change = change_percent = None
+        # Same semantics as YFinanceProvider: change from the previous session's close
+        previous = meta.get("chartPreviousClose") or meta.get("previousClose")
+        if previous:
+            change, change_percent = change_from(price, float(previous))
+        volumes = [volume for volume in quotes[0].get("volume") or [] if volume is not None]
+        return quote(price, change, change_percent, int(volumes[-1]) if volumes else None, quoted_at)
+
+
+class CoinbaseProvider(PriceProvider):
+    """Gold per ounce from Coinbase's USD exchange rates (no change data)"""
+
+    name = 'coinbase'
+    source = 'Coinbase'
+    tier = 2
+
+    def fetch(self):
+        response = self.http().get("https://api.coinbase.com/v2/exchange-rates?currency=USD",
+                                   timeout=UPSTREAM_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        rate = response.json().get("data", {}).get("rates", {}).get("XAU")
+        if not rate:
+            return None
+        # Rates are XAU per USD; invert for USD per ounce
+        return quote(round(1 / float(rate), 2))
+
+
+class FCSProvider(PriceProvider):
+    """XAU/USD from FCS API (requires FCS_API_KEY)"""
+
+    name = 'fcs'
+    source = 'FCS API'
+    tier = 2
+
+    def available(self):
+        return bool(os.getenv('FCS_API_KEY'))
+
+    def fetch(self):
+        url = f"https://fcsapi.com/api-v3/forex/latest?symbol=XAU/USD&access_key={os.getenv('FCS_API_KEY')}"
+        response = self.http().get(url, timeout=UPSTREAM_TIMEOUT)
+        if response.status_code != 200:
+            print(f"FCS API error: {response.status_code} - {response.text}")
+            return None
+        data = response.json().get("response") or []
+        if not data:
+            return None
+        quoted_at = data[0].get("t")
+        return quote(float(data[0]["price"]), quoted_at=int(quoted_at) if quoted_at else None)
+
+
+class AlphaVantageProvider(PriceProvider):
+    """XAU/USD exchange rate from Alpha Vantage (requires ALPHA_VANTAGE_API_KEY)"""
+
+    name = 'alpha-vantage'
+    source = 'Alpha Vantage'
+    tier = 2
+
+    def available(self):
+        return bool(os.getenv('ALPHA_VANTAGE_API_KEY'))
+
+    def fetch(self):
+        url = ("https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE"
+               f"&from_currency=XAU&to_currency=USD&apikey={os.getenv('ALPHA_VANTAGE_API_KEY')}")
+        response = self.http().get(url, timeout=UPSTREAM_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        exchange_data = response.json().get("Realtime Currency Exchange Rate") or {}
+        if "5. Exchange Rate" not in exchange_data:
+            return None
+        return quote(float(exchange_data["5. Exchange Rate"]))
+
+
+class ProviderStats:
+    """Exponentially weighted latency and error rate for one provider"""
+
+    def __init__(self, alpha=0.2, history=100):
+        self.alpha = alpha
+        self.latency = None  # EWMA over every attempt, successful or not
+        self.error_rate = 0.0
+        self.successes = deque(maxlen=history)  # Recent successful latencies
+        self.attempts = 0
+        self.errors = 0
+
+    def record(self, latency, ok):
+        self.attempts += 1
+        if ok:
+            self.successes.append(latency)
+        else:
+            self.errors += 1
+        if self.latency is None:
+            self.latency = latency
+            self.error_rate = 0.0 if ok else 1.0
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def expected_time(self, default_latency, min_success_rate=0.05):
+        """Expected seconds until this provider yields a valid quote, retrying on failure"""
+        latency = self.latency if self.latency is not None else default_latency
+        return latency / max(1.0 - self.error_rate, min_success_rate)
+
+
+class ProviderRegistry:
+    """Registered providers, ordered by tier and then by expected time to a valid quote
+
+    Providers that have not been tried yet are assumed to answer in
+    default_latency, so a degraded favourite is overtaken by untried ones.
+    Registration order breaks ties. Each provider also has a circuit breaker;
+    while it is open the provider is left out of the order entirely.
+    """
+
+    def __init__(self, providers=(), default_latency=1.0, alpha=0.2, breaker_factory=CircuitBreaker):
+        self.default_latency = default_latency
+        self.alpha = alpha
+        self.breaker_factory = breaker_factory
+        self._lock = threading.Lock()
+        self._providers = []
+        self._stats = {}
+        self._breakers = {}
+        for provider in providers:
+            self.register(provider)
+
+    def register(self, provider):
+        with self._lock:
+            if provider.name in self._stats:
+                raise ValueError(f"Provider {provider.name} is already registered")
+            self._providers.append(provider)
+            self._stats[provider.name] = ProviderStats(self.alpha)
+            self._breakers[provider.name] = self.breaker_factory()
+
+    def unregister(self, name):
+        with self._lock:
+            self._providers = [p for p in self._providers if p.name != name]
+            self._stats.pop(name, None)
+            self._breakers.pop(name, None)
+
+    def get(self, name):
+        return next((p for p in self._providers if p.name == name), None)
+
+    def ordered(self):
+        """Available providers with a closed (or probing) breaker, lowest tier
+        first and best expected time-to-valid-quote first within a tier"""
+        with self._lock:
+            ranked = [(p.tier, self._stats[p.name].expected_time(self.default_latency), index, p,
+                       self._breakers[p.name]) for index, p in enumerate(self._providers)]
+        ranked.sort(key=lambda item: item[:3])
+        return [provider for _, _, _, provider, breaker in ranked
+                if provider.available() and breaker.ready()]
+
+    def acquire(self, name):
+        """Ask the provider's breaker for permission to call it right now"""
+        breaker = self._breakers.get(name)
+        return breaker is None or breaker.allow()
+
+    def release(self, name):
+        """Give back a call permission that was acquired but never used"""
+        breaker = self._breakers.get(name)
+        if breaker is not None:
+            breaker.release()
+
+    def record(self, name, latency, ok):
+        with self._lock:
+            stats = self._stats.get(name)
+            breaker = self._breakers.get(name)
+            if stats is not None:
+                stats.record(latency, ok)
+        if breaker is not None:
+            breaker.record(latency, ok)
+
+    def success_latencies(self, name):
+        with self._lock:
+            stats = self._stats.get(name)
+            return list(stats.successes) if stats is not None else []
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = {}
+            for provider in self._providers:
+                stats = self._stats[provider.name]
+                metrics[provider.name] = {
+                    'available': provider.available(),
+                    'attempts': stats.attempts,
+                    'errors': stats.errors,
+                    'latency_ewma': round(stats.latency, 4) if stats.latency is not None else None,
+                    'error_rate_ewma': round(stats.error_rate, 4),
+                    'tier': provider.tier,
+                    'expected_time': round(stats.expected_time(self.default_latency), 4),
+                    'breaker': self._breakers[provider.name].get_metrics()
+                }
+            return metrics
+
+
+def create_default_registry():
+    """Every built-in gold quote provider, most trusted first"""
+    # Reads time out after 5s; a provider that keeps taking over 4s is as good as down
+    def breaker():
+        return CircuitBreaker(failure_threshold=0.5, latency_threshold=4.0, cooldown=30)
+
+    return ProviderRegistry(breaker_factory=breaker, providers=[
+        YFinanceProvider('GC=F'),
+        YahooChartProvider('GC=F'),
+        YFinanceProvider('XAUUSD=X', tier=1),
+        CoinbaseProvider(),
+        FCSProvider(),
+        AlphaVantageProvider()
+    ])
@@ -0,0 +1,142 @@
+"""
+Server-Sent Events broadcaster for live price ticks
+One upstream fetch is encoded once and fanned out to every subscriber;
+subscribers block on a shared condition until the next snapshot or heartbeat.
+Async subscribers (the ASGI app) wait on a future of their event loop instead,
+so an open stream costs no thread.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+def format_event(event_id, data, event='price'):
+    """Encode one SSE message; data must already be JSON bytes"""
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode('ascii'), data)
+
+
+class PriceBroadcaster:
+    def __init__(self, heartbeat_interval=15, history=100, retry_ms=3000):
+        self.heartbeat_interval = heartbeat_interval
+        self.retry_ms = retry_ms
+        self._cond = threading.Condition()
+        # Recent (event_id, encoded message) pairs, for Last-Event-ID replay
+        self._events = deque(maxlen=history)
+        # Event loop -> future resolved on the next publish, shared by that loop's subscribers
+        self._waiters = {}
+        self.subscribers = 0
+        self.published = 0
+
+    @property
+    def last_event_id(self):
+        return self._events[-1][0] if self._events else None
+
+    def publish(self, event_id, data):
+        """Queue a new event for every subscriber; ids must increase"""
+        message = format_event(event_id, data)
+        with self._cond:
+            if self._events and event_id <= self._events[-1][0]:
+                return
+            self._events.append((event_id, message))
+            self.published += 1
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, {}
+        for loop, waiter in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:  # Loop already closed
+                pass
+
+    def _events_after(self, last_id):
+        """Events a subscriber that has seen last_id still needs"""
+        if not self._events:
+            return []
+        if last_id is None or last_id < self._events[0][0]:
+            # New subscriber, or it missed more than we remember: send the latest only
+            return [self._events[-1]]
+        pending = []
+        for event in reversed(self._events):
+            if event[0] <= last_id:
+                break
+            pending.append(event)
+        pending.reverse()
+        return pending
+
+    def stream(self, last_event_id=None):
+        """Generate the SSE byte stream for one subscriber"""
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield b'retry: %d\n\n' % self.retry_ms
+            last_id = last_event_id
+            while True:
+                with self._cond:
+                    pending = self._events_after(last_id)
+                    if not pending:
+                        self._cond.wait(self.heartbeat_interval)
+                        pending = self._events_after(last_id)
+                if pending:
+                    for event_id, message in pending:
+                        yield message
+                        last_id = event_id
+                else:
+                    # Keeps proxies from closing idle connections and detects dead clients
+                    yield b': heartbeat %d\n\n' % int(time.time())
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    async def astream(self, last_event_id=None):
+        """Async generator of the SSE byte stream for one subscriber on the running loop"""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield b'retry: %d\n\n' % self.retry_ms
+            last_id = last_event_id
+            while True:
+                with self._cond:
+                    pending = self._events_after(last_id)
+                    if not pending:
+                        waiter = self._waiters.get(loop)
+                        if waiter is None:
+                            waiter = self._waiters[loop] = loop.create_future()
+                if not pending:
+                    try:
+                        # Shielded: a subscriber timing out must not cancel the shared future
+                        await asyncio.wait_for(asyncio.shield(waiter), self.heartbeat_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    with self._cond:
+                        pending = self._events_after(last_id)
+                if pending:
+                    for event_id, message in pending:
+                        yield message
+                        last_id = event_id
+                else:
+                    yield b': heartbeat %d\n\n' % int(time.time())
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def get_metrics(self):
+        return {
+            'subscribers': self.subscribers,
+            'published': self.published,
+            'last_event_id': self.last_event_id
+        }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def parse_event_id(value):
+    """Parse a Last-Event-ID header, ignoring malformed values"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
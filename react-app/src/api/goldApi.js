@@ -253,9 +253,11 @@ export const goldApi = {
   /**
    * Get historical gold prices
    * @param {string} period - Time period (1D, 1W, 1M, 3M, 6M, 1Y)
+   * @param {Object} [options]
+   * @param {number} [options.maxPoints] - Ask the backend to downsample to at most this many points
    * @returns {Promise} Historical price data
    */
-  getHistoricalPrices: async (period = '1M') => {
+  getHistoricalPrices: async (period = '1M', { maxPoints } = {}) => {
     // Try multiple free APIs for historical data
     
     // Method 1: Try Alpha Vantage for historical data
@@ -390,7 +392,8 @@ export const goldApi = {
     // Method 3: Try backend API if available
     try {
       console.log(`Trying backend API for historical data (${period})...`);
-      const response = await apiClient.get(`/api/gold/historical?period=${period}`);
+      const downsample = maxPoints ? `&max_points=${maxPoints}` : '';
+      const response = await apiClient.get(`/api/gold/historical?period=${period}${downsample}`);
       if (response.data && response.data.prices) {
         console.log(`✅ Backend API historical data successful: ${response.data.prices.length} points`);
         return {
@@ -0,0 +1,64 @@
+"""
+Time-based OHLC resampling of stored bar series
+Only a few base intervals are fetched from upstream and stored; every coarser
+interval is built from the finest stored series it divides evenly, so serving
+it never costs an upstream call.
+
+Buckets are aligned to UTC: 4h bars start at 00:00, 04:00, ... and weekly bars
+start on Monday.
+"""
+
+import numpy as np
+
+from bar_store import BarSeries
+
+INTERVALS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 3600,
+    '4h': 4 * 3600,
+    '1d': 86400,
+    '1w': 7 * 86400
+}
+
+# The stored series each interval is served from
+BASE_INTERVALS = {
+    '1m': '1m',
+    '5m': '5m',
+    '15m': '5m',
+    '1h': '1h',
+    '4h': '1h',
+    '1d': '1d',
+    '1w': '1d'
+}
+
+WEEK_OFFSET = 4 * 86400  # 1970-01-01 was a Thursday; the following Monday is 4 days later
+
+
+def base_interval(interval):
+    """The stored interval that interval is resampled from; raises ValueError if unsupported"""
+    try:
+        return BASE_INTERVALS[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported interval: {interval} (expected one of {', '.join(INTERVALS)})")
+
+
+def resample(bars, interval):
+    """Aggregate bars into interval buckets: first open, highest high, lowest low,
+    last close, summed volume, stamped with the bucket's start time"""
+    seconds = INTERVALS[interval]
+    offset = WEEK_OFFSET if interval == '1w' else 0
+    if len(bars) == 0:
+        return bars
+    buckets = (bars.timestamp - offset) // seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:], len(bars)) - 1
+    return BarSeries(
+        buckets[starts] * seconds + offset,
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        np.minimum.reduceat(bars.low, starts),
+        bars.close[ends],
+        np.add.reduceat(bars.volume, starts)
+    )
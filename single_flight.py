@@ -0,0 +1,80 @@
+"""
+Single-flight request coalescing
+Ensures only one upstream fetch per cache key is in flight at a time; concurrent
+callers for the same key wait for and share that fetch's result
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def reset(self):
+        """Forget calls in flight, e.g. in a forked child where their threads do not exist"""
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _count(self, key, field):
+        stats = self._stats.setdefault(key, {'originating': 0, 'coalesced': 0, 'timeouts': 0})
+        stats[field] += 1
+
+    def do(self, key, fn, timeout=None, stale=None):
+        """Run fn() for key unless a call is already in flight, then share its result
+
+        Waiters give up after timeout seconds and receive the stale value instead.
+        Exceptions raised by fn() are re-raised in every caller that waited for it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._count(key, 'originating')
+            else:
+                self._count(key, 'coalesced')
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            with self._lock:
+                self._count(key, 'timeouts')
+            return stale
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        """Return the keys that currently have a fetch in flight"""
+        with self._lock:
+            return list(self._calls)
+
+    def get_metrics(self):
+        """Return originating vs. coalesced call counters per key"""
+        with self._lock:
+            per_key = {key: dict(stats) for key, stats in self._stats.items()}
+        return {
+            'originating': sum(s['originating'] for s in per_key.values()),
+            'coalesced': sum(s['coalesced'] for s in per_key.values()),
+            'timeouts': sum(s['timeouts'] for s in per_key.values()),
+            'keys': per_key
+        }
@@ -0,0 +1,236 @@
+"""
+Tests for the ASGI entry point, driven directly through the ASGI interface
+"""
+
+import asyncio
+import json
+import os
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+import app as app_module
+import asgi
+from price_stream import PriceBroadcaster
+from testing_support import FakeUpstream, make_bars
+
+QUOTE = {'price': 2651.75, 'change': 1.25, 'change_percent': 0.05,
+         'timestamp': '2025-01-09T15:40:00', 'source': 'Test', 'success': True}
+
+
+def scope_for(path, query=b'', headers=(), method='GET', kind='http'):
+    return {'type': kind, 'method': method, 'path': path, 'query_string': query, 'root_path': '',
+            'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+            'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}
+
+
+async def call(path, query=b'', headers=(), method='GET'):
+    """Run one request; returns (status, {header: value}, body)"""
+    messages = []
+    received = asyncio.Queue()
+    await received.put({'type': 'http.request', 'body': b'', 'more_body': False})
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi.app(scope_for(path, query, headers, method), received.get, send)
+    start = messages[0]
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    return start['status'], {k.decode(): v.decode() for k, v in start['headers']}, body
+
+
+def request(path, query=b'', headers=(), method='GET'):
+    return asyncio.run(call(path, query, headers, method))
+
+
+def test_price_aliases_serve_the_flask_bytes():
+    app_module.gold_service.poller.publish(QUOTE)
+    expected = app_module.app.test_client().get('/api/gold/price')
+    for path in ('/get_gold_price', '/api/gold_price', '/api/gold/price'):
+        status, headers, body = request(path)
+        assert status == 200 and body == expected.data
+        assert headers['etag'] == expected.headers['ETag']
+        assert headers['last-modified'] == expected.headers['Last-Modified']
+
+
+def test_conditional_requests_get_304():
+    app_module.gold_service.poller.publish(dict(QUOTE, price=2652.0, timestamp='2025-01-09T15:41:00'))
+    _, headers, _ = request('/api/gold/price')
+    status, _, body = request('/api/gold/price', headers=[('If-None-Match', headers['etag'])])
+    assert status == 304 and body == b''
+    status, _, _ = request('/api/gold/price', headers=[('If-Modified-Since', headers['last-modified'])])
+    assert status == 304
+    status, _, body = request('/api/gold/price', method='HEAD')
+    assert status == 200 and body == b''
+
+
+def test_historical_stats_and_news(monkeypatch):
+    history = {'prices': [{'date': '2025-01-10', 'price': 2650.0}], 'period': '1W'}
+    calls = []
+
+    def get_historical_prices(period, **options):
+        calls.append((period, options))
+        if options['interval'] == '2h':
+            raise ValueError('Unsupported interval: 2h')
+        return history
+
+    monkeypatch.setattr(app_module.gold_service, 'get_historical_prices', get_historical_prices)
+    monkeypatch.setattr(app_module.gold_service, 'get_market_stats', lambda: {'current_price': 2650.0})
+    monkeypatch.setattr(app_module, 'load_news', lambda: [{'title': 'Gold'}])
+
+    status, _, body = request('/get_historical_prices', b'period=1W&max_points=bad')
+    assert status == 200 and body == app_module.app.test_client().get('/api/gold/historical?period=1W').data
+    assert calls[0] == ('1W', {'columnar': False, 'max_points': None, 'method': 'lttb', 'interval': '1d'})
+    assert request('/api/gold/historical', b'interval=2h')[0] == 400
+
+    status, _, body = request('/api/market_stats')
+    assert status == 200 and b'"current_price":2650.0' in body
+    assert request('/get_news')[2] == b'{"status": "success", "news": [{"title": "Gold"}]}'
+
+
+def test_other_routes_fall_back_to_flask():
+    status, headers, body = request('/robots.txt')
+    with app_module.app.test_client().get('/robots.txt') as expected:
+        assert status == expected.status_code and body == expected.data
+        assert headers['content-type'] == expected.headers['Content-Type']
+
+
+def test_wsgi_response_is_closed_even_if_iteration_fails(monkeypatch):
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            yield b'partial'
+            raise OSError('disk gone')
+
+        def close(self):
+            closed.append(True)
+
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [])
+        return Body()
+
+    monkeypatch.setattr(asgi.web, 'app', wsgi_app)
+    try:
+        asgi._call_wsgi(asgi._wsgi_environ(scope_for('/robots.txt'), b''))
+    except OSError:
+        pass
+    assert closed == [True]
+
+
+def test_stream_head_sends_headers_only(monkeypatch):
+    broadcaster = PriceBroadcaster()
+    monkeypatch.setattr(app_module, 'price_broadcaster', broadcaster)
+
+    async def scenario():
+        return await asyncio.wait_for(call('/api/gold/stream', method='HEAD'), 5)
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 200 and headers['content-type'].startswith('text/event-stream') and body == b''
+    assert broadcaster.subscribers == 0
+
+
+def test_stream_subscriber_holds_no_thread(monkeypatch):
+    broadcaster = PriceBroadcaster()
+    monkeypatch.setattr(app_module, 'price_broadcaster', broadcaster)
+
+    async def scenario():
+        received = asyncio.Queue()
+        chunks = []
+        got_event = asyncio.Event()
+        event_id = 1
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                chunks.append(message['body'])
+                if message['body'].startswith(b'id: %d\n' % event_id):
+                    got_event.set()
+
+        task = asyncio.ensure_future(asgi.app(scope_for('/api/gold/stream'), received.get, send))
+        await asyncio.sleep(0.05)
+        assert broadcaster.subscribers == 1
+        # Published from another thread, as the poller does
+        await asyncio.get_running_loop().run_in_executor(None, broadcaster.publish, event_id, b'{"price":1}')
+        await asyncio.wait_for(got_event.wait(), 5)
+
+        await received.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 5)
+        assert broadcaster.subscribers == 0
+        assert chunks[0].startswith(b'retry:')
+
+    asyncio.run(scenario())
+
+
+def test_lifespan_starts_and_stops_the_poller(monkeypatch):
+    events = []
+    monkeypatch.setattr(app_module, 'PRICE_POLLER_ENABLED', True)
+    monkeypatch.setattr(app_module.gold_service, 'start_poller', lambda: events.append('start'))
+    monkeypatch.setattr(app_module.gold_service, 'stop_poller', lambda: events.append('stop'))
+
+    async def scenario():
+        received = asyncio.Queue()
+        for message in ('lifespan.startup', 'lifespan.shutdown'):
+            await received.put({'type': message})
+        sent = []
+
+        async def send(message):
+            sent.append(message['type'])
+
+        await asgi.app({'type': 'lifespan'}, received.get, send)
+        return sent
+
+    assert asyncio.run(scenario()) == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert events == ['start', 'stop']
+
+
+def test_websocket_feed_over_asgi():
+    app_module.gold_service.poller.publish(QUOTE)
+
+    async def scenario():
+        received = asyncio.Queue()
+        sent = asyncio.Queue()
+        await received.put({'type': 'websocket.connect'})
+        task = asyncio.ensure_future(asgi.app(scope_for('/ws', kind='websocket'), received.get, sent.put))
+        assert (await asyncio.wait_for(sent.get(), 5))['type'] == 'websocket.accept'
+
+        await received.put({'type': 'websocket.receive', 'text': '{"action": "subscribe", "topics": ["price"]}'})
+        snapshot = json.loads((await asyncio.wait_for(sent.get(), 5))['text'])
+        await received.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(task, 5)
+        return snapshot
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot['type'] == 'snapshot' and snapshot['topic'] == 'price'
+
+
+def test_feed_topics_match_the_service_periods_and_intervals():
+    hub = app_module.feed_hub
+    assert hub.valid_topic('historical') and hub.valid_topic('historical:1Y') and hub.valid_topic('historical:1W:1h')
+    assert not hub.valid_topic('historical:2Y') and not hub.valid_topic('historical:1M:2h')
+
+
+def test_historical_topic_loads_records_and_sends_bar_deltas(monkeypatch, make_service):
+    upstream = FakeUpstream(400)
+    service = make_service(fetch_fn=upstream)
+    service.cache_duration = 0  # Every load sees the latest upstream bars
+    monkeypatch.setattr(app_module, 'gold_service', service)
+    hub = app_module.feed_hub
+
+    weekly = hub.load('historical:1Y:1w')
+    assert weekly['interval'] == '1w' and 'prices' in weekly
+
+    session = hub.connect()
+    try:
+        hub.subscribe(session, 'historical:1W:1d')
+        snapshot = json.loads(hub.snapshot_message('historical:1W:1d'))['data']
+        assert snapshot['interval'] == '1d' and 'columns' not in snapshot
+        while session.next_item(timeout=0) is not None:
+            pass
+
+        upstream.bars = make_bars(0, 401)
+        hub.publish('historical:1W:1d', hub.load('historical:1W:1d'))
+        kind, message = session.next_item(timeout=0)
+        delta = json.loads(message)
+        assert kind == 'message' and delta['type'] == 'delta'
+        assert delta['drop_first'] == 1 and [bar['price'] for bar in delta['append']] == [2400.0]
+    finally:
+        hub.disconnect(session)
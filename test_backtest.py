@@ -0,0 +1,113 @@
+"""
+Tests for the vectorized signal-rule backtests
+"""
+
+import numpy as np
+import pytest
+
+import backtest
+import indicators
+from cache_backend import InProcessCache
+from testing_support import FakeUpstream, make_bars, make_series, random_walk
+
+
+def loop_positions(close, params):
+    """Bar-by-bar reference for the rule positions"""
+    rsi = indicators.rsi(close, params['rsi_period'])
+    fast, slow = indicators.sma(close, params['fast']), indicators.sma(close, params['slow'])
+    rsi_vote = action_vote = 0
+    positions = []
+    for i in range(len(close)):
+        if rsi[i] < params['oversold']:
+            rsi_vote = 1
+        elif rsi[i] > params['overbought']:
+            rsi_vote = -1
+        if i >= params['lookback']:
+            change = (close[i] - close[i - params['lookback']]) / close[i - params['lookback']] * 100
+            if change < -params['threshold']:
+                action_vote = 1
+            elif change > params['threshold']:
+                action_vote = -1
+        sma_vote = 0 if np.isnan(slow[i]) else int(np.sign(fast[i] - slow[i]))
+        positions.append({'sma_crossover': sma_vote, 'rsi': rsi_vote, 'price_action': action_vote,
+                          'combined': int(np.sign(sma_vote + rsi_vote + action_vote))}[params['rule']])
+    return np.array(positions)
+
+
+def test_rule_votes_match_a_bar_by_bar_loop():
+    _, _, close = random_walk(400)
+    for rule in backtest.RULES:
+        params = backtest.normalize_params({'rule': rule})
+        np.testing.assert_array_equal(backtest.rule_votes(close, params), loop_positions(close, params))
+
+
+def test_positions_trade_on_the_next_bar():
+    """Equity only moves with the bar after a position is taken"""
+    close = np.array([100, 100, 100, 100, 110, 121, 100], dtype=float)
+    bars = make_series(close, close, close)
+    result = backtest.run(bars, {'rule': 'sma_crossover', 'fast': 1, 'slow': 3})
+    # Long from the close of bar 4 (first bar with fast > slow), flat after bar 6 drops below
+    assert result['equity']['values'] == pytest.approx([1, 1, 1, 1, 1, 1.1, 100 / 110])
+    assert result['trades'] == [{'side': 'long', 'entry_time': int(bars.timestamp[4]), 'entry_price': 110.0,
+                                 'exit_time': int(bars.timestamp[6]), 'exit_price': 100.0,
+                                 'return_pct': -9.09, 'bars': 2}]
+    assert result['stats']['trades'] == 1 and result['stats']['win_rate_pct'] == 0
+
+
+def test_short_trades_and_fees():
+    high, low, close = random_walk(500)
+    bars = make_series(high, low, close)
+    long_only = backtest.run(bars, {'rule': 'rsi'})
+    both = backtest.run(bars, {'rule': 'rsi', 'allow_short': 'true'})
+    assert {t['side'] for t in long_only['trades']} == {'long'}
+    assert {t['side'] for t in both['trades']} == {'long', 'short'}
+    assert both['stats']['exposure_pct'] > long_only['stats']['exposure_pct']
+
+    with_fees = backtest.run(bars, {'rule': 'rsi', 'fee_bps': 10})
+    assert with_fees['stats']['total_return_pct'] < long_only['stats']['total_return_pct']
+
+
+def test_equity_curve_is_sampled_and_trades_limited():
+    high, low, close = random_walk(5000)
+    result = backtest.run(make_series(high, low, close), {'rule': 'price_action'}, max_points=100, max_trades=5)
+    assert len(result['equity']['values']) == 100
+    assert result['equity']['timestamps'][-1] == result['stats']['end']
+    assert len(result['trades']) == 5 and result['stats']['trades'] > 5
+
+
+def test_invalid_params_are_rejected():
+    for params in ({'rule': 'macd'}, {'fast': 50, 'slow': 20}, {'window': 3}, {'oversold': 70, 'overbought': 30},
+                   {'oversold': 50, 'overbought': 50}, {'overbought': 120}, {'fee_bps': -5}, {'threshold': -1},
+                   {'oversold': 'nan'}, {'fee_bps': float('inf')}, {'fast': 'inf'}):
+        with pytest.raises(ValueError):
+            backtest.normalize_params(params)
+
+
+def test_results_are_cached_by_params_and_data_version(make_service):
+    upstream = FakeUpstream(300)
+    service = make_service(fetch_fn=upstream)
+    first = service.run_backtest({'rule': 'sma_crossover'})
+    assert service.run_backtest({'rule': 'sma_crossover', 'fast': '20'}) is first
+    assert service.run_backtest({'rule': 'rsi'}) is not first
+
+    # New bars are a new data version
+    upstream.bars = make_bars(0, 301)
+    service.bar_store.refresh(service.symbol, '1d', max_age=0)
+    updated = service.run_backtest({'rule': 'sma_crossover'})
+    assert updated is not first and updated['stats']['bars'] == 301
+
+
+def test_backtest_results_stay_in_a_bounded_worker_memo(make_service):
+    upstream = FakeUpstream(300)
+    cache = InProcessCache()
+    service = make_service(fetch_fn=upstream, cache=cache)
+    for count in range(300, 310):
+        upstream.bars = make_bars(0, count)
+        service.bar_store.refresh(service.symbol, '1d', max_age=0)
+        assert service.run_backtest({'rule': 'rsi'})['stats']['bars'] == count
+    assert len(service._backtests) == 1
+
+    for oversold in range(service._backtests.max_entries + 10):
+        service.run_backtest({'rule': 'rsi', 'oversold': oversold / 10})
+    assert len(service._backtests) == service._backtests.max_entries
+    assert not [key for key in cache._entries if key.startswith('backtest_')]
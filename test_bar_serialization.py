@@ -0,0 +1,50 @@
+"""
+Tests for the vectorized historical bar serialization
+"""
+
+import numpy as np
+import pandas as pd
+
+from bar_store import frame_to_series
+from bar_serialization import bars_to_columns, bars_to_records
+
+
+def make_frame(periods):
+    index = pd.date_range('2024-03-01', periods=periods, freq='B', tz='America/New_York')
+    close = 2000 + np.cumsum(np.random.default_rng(7).normal(0, 5, periods))
+    return pd.DataFrame({
+        'Open': close - 0.337, 'High': close + 2.118, 'Low': close - 1.954,
+        'Close': close, 'Volume': np.arange(periods) * 10
+    }, index=index)
+
+
+def test_records_match_the_row_by_row_conversion():
+    """Vectorized records equal what the old iterrows() loop produced"""
+    data = make_frame(260)
+    expected = [{
+        'date': index.strftime('%Y-%m-%d'),
+        'price': round(float(row['Close']), 2),
+        'volume': int(row['Volume']),
+        'high': round(float(row['High']), 2),
+        'low': round(float(row['Low']), 2),
+        'open': round(float(row['Open']), 2)
+    } for index, row in data.iterrows()]
+
+    records = bars_to_records(frame_to_series(data))
+    assert [r['date'] for r in records] == [e['date'] for e in expected]
+    for field in ('price', 'volume', 'high', 'low', 'open'):
+        assert np.allclose([r[field] for r in records], [e[field] for e in expected], atol=0.01)
+
+
+def test_columnar_shape():
+    """Columnar payloads hold one list per field, in bar order"""
+    columns = bars_to_columns(frame_to_series(make_frame(5)), date_unit='m')
+    assert set(columns) == {'dates', 'open', 'high', 'low', 'close', 'volume'}
+    assert columns['dates'][0] == '2024-03-01 05:00'
+    assert all(len(values) == 5 for values in columns.values())
+
+
+if __name__ == "__main__":
+    test_records_match_the_row_by_row_conversion()
+    test_columnar_shape()
+    print("Bar serialization tests passed")
@@ -0,0 +1,175 @@
+"""
+Tests for the incremental OHLCV bar store
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from bar_store import MIN_CAPACITY, BarSeries, BarStore
+from testing_support import FakeBatchUpstream, FakeUpstream, make_bars
+
+
+def _append_from_worker(directory, upstream):
+    BarStore(directory, fetch_fn=upstream).refresh('GC=F', '1d', max_age=0)
+
+
+def test_refresh_only_fetches_bars_after_last_stored(tmp_path):
+    """After the backfill, refreshes ask upstream for the delta only"""
+    directory = str(tmp_path)
+    upstream = FakeUpstream(300)
+    store = BarStore(directory, fetch_fn=upstream)
+    upstream.bars = make_bars(0, 250)
+    last_timestamp = store.refresh('GC=F', '1d', max_age=0).last_timestamp
+    assert len(store.get('GC=F', '1d')) == 250
+
+    # Two new days arrive and the last stored bar is revised
+    upstream.bars = make_bars(0, 252, base=2000.5)
+    series = store.refresh('GC=F', '1d', max_age=0)
+    assert upstream.requests[-1]['start'] == last_timestamp
+    assert store.bars_fetched == 250 + 3
+    assert len(series) == 252
+    assert series.close[-1] == 2000.5 + 251
+    assert np.all(np.diff(series.timestamp) > 0)
+
+
+def test_held_views_never_change(tmp_path):
+    """Appends and revisions leave the rows a reader already holds untouched"""
+    directory = str(tmp_path)
+    upstream = FakeUpstream(30)
+    store = BarStore(directory, fetch_fn=upstream)
+    held = store.refresh('GC=F', '1d')
+    last_close = float(held.close[-1])
+
+    upstream.bars = make_bars(0, 32)  # Appended in place; the last stored bar is unchanged
+    assert len(store.refresh('GC=F', '1d', max_age=0)) == 32
+    assert np.shares_memory(store.get('GC=F', '1d').close, held.close)
+
+    revised = make_bars(0, 33)
+    revised.close[-2:] = 9999.0
+    upstream.bars = revised
+    assert store.refresh('GC=F', '1d', max_age=0).close[-2] == 9999.0
+    assert float(held.close[-1]) == last_close and len(held) == 30
+
+
+def test_empty_or_out_of_window_deltas(tmp_path):
+    """An empty delta is not a refresh; an intraday tail older than Yahoo's window is reloaded"""
+    directory = str(tmp_path)
+    upstream = FakeUpstream(30)
+    store = BarStore(directory, fetch_fn=upstream)
+    store.refresh('GC=F', '1d')
+    refreshed_at = store._file('GC=F', '1d').read()[1]
+    upstream.bars = BarSeries.empty()
+    store.refresh('GC=F', '1d', max_age=0)
+    assert store._file('GC=F', '1d').read()[1] == refreshed_at
+    store.refresh('GC=F', '1d', max_age=0)
+    assert len(upstream.requests) == 3
+
+    # make_bars dates are long past the 1h window, so every refresh is a full reload
+    upstream.bars = make_bars(0, 30)
+    store.refresh('GC=F', '1h')
+    store.refresh('GC=F', '1h', max_age=0)
+    assert [r['period'] for r in upstream.requests[3:]] == ['730d', '730d']
+
+
+def test_store_is_persisted_and_shared(tmp_path):
+    """A second store on the same directory reuses the bars without fetching"""
+    directory = str(tmp_path)
+    upstream = FakeUpstream(30)
+    BarStore(directory, fetch_fn=upstream).refresh('GC=F', '1d')
+
+    other = FakeUpstream(30)
+    series = BarStore(directory, fetch_fn=other).refresh('GC=F', '1d', max_age=60)
+    assert len(series) == 30
+    assert other.requests == []
+
+
+def test_store_requires_a_private_directory(tmp_path, monkeypatch):
+    """Other users must not be able to plant bars (served as prices) or lock files"""
+    directory = str(tmp_path)
+    shared = os.path.join(directory, 'shared')
+    os.mkdir(shared)
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        BarStore(shared)
+
+    monkeypatch.delenv('BAR_STORE_DIR', raising=False)
+    monkeypatch.setattr(tempfile, 'tempdir', directory)
+    store = BarStore()
+    assert os.path.basename(store.directory).startswith('xauusd-bars-')
+    assert os.stat(store.directory).st_mode & 0o777 == 0o700
+
+
+def test_reads_are_zero_copy_views_of_the_shared_file(tmp_path):
+    """Readers see another process's appends through their existing mapping"""
+    directory = str(tmp_path)
+    upstream = FakeUpstream(30)
+    reader = BarStore(directory, fetch_fn=upstream)
+    reader.refresh('GC=F', '1d')
+    series = reader.get('GC=F', '1d')
+    assert isinstance(series.close.base, np.memmap)
+    assert np.shares_memory(series.since(series.timestamp[20]).close, series.close)
+
+    process = multiprocessing.Process(target=_append_from_worker, args=(directory, FakeUpstream(35)))
+    process.start()
+    process.join()
+    assert len(reader.get('GC=F', '1d')) == 35
+
+
+def test_file_grows_past_its_capacity(tmp_path):
+    """Appends beyond the preallocated capacity rewrite the file and readers remap"""
+    directory = str(tmp_path)
+    upstream = FakeUpstream(MIN_CAPACITY - 10)
+    store = BarStore(directory, fetch_fn=upstream)
+    store.refresh('GC=F', '1d')
+    upstream.bars = make_bars(0, MIN_CAPACITY * 3)
+    series = store.refresh('GC=F', '1d', max_age=0)
+    assert len(series) == MIN_CAPACITY * 3
+    assert np.array_equal(series.close, upstream.bars.close)
+
+
+def test_every_period_is_a_slice_of_one_series(make_service):
+    """All chart periods are served from a single upstream backfill"""
+    upstream = FakeUpstream(400)
+    service = make_service(fetch_fn=upstream)
+    lengths = {period: len(service.get_historical_prices(period)['prices'])
+               for period in ('1D', '1W', '1M', '3M', '6M', '1Y')}
+    assert len(upstream.requests) == 1
+    assert lengths == {'1D': 1, '1W': 7, '1M': 30, '3M': 91, '6M': 182, '1Y': 365}
+
+
+def test_refresh_many_fetches_all_symbols_in_one_call(tmp_path):
+    """Stale series share one batched request from their earliest last bar"""
+    directory = str(tmp_path)
+    batch = FakeBatchUpstream(100)
+    store = BarStore(directory, batch_fetch_fn=batch)
+    series = store.refresh_many(['GC=F', 'XAUUSD=X'], '1d')
+    last_timestamp = series['GC=F'].last_timestamp
+    assert len(batch.requests) == 1 and batch.requests[0]['period'] == '1y'
+    assert len(series['GC=F']) == len(series['XAUUSD=X']) == 100
+
+    batch.upstream.bars = make_bars(0, 102)
+    series = store.refresh_many(['GC=F', 'XAUUSD=X'], '1d', max_age=0)
+    assert batch.requests[-1] == {'symbols': ['GC=F', 'XAUUSD=X'], 'start': last_timestamp, 'period': None}
+    assert len(series['XAUUSD=X']) == 102
+
+    # Fresh series are not requested again
+    store.refresh_many(['GC=F', 'XAUUSD=X'], '1d', max_age=60)
+    assert len(batch.requests) == 2
+
+
+def test_market_stats_come_from_the_stored_series(make_service):
+    """Stats need a single batched refresh and no separate 1y/5d history calls"""
+    batch = FakeBatchUpstream(400)
+    service = make_service(fetch_fn=None, batch_fetch_fn=batch)
+    stats = service.get_market_stats()
+    assert len(batch.requests) == 1
+    closes = batch.upstream.bars.close
+    assert stats['current_price'] == closes[-1]
+    assert stats['day_range'] == {'low': closes[-1] - 2, 'high': closes[-1] + 2}
+    assert stats['week_range'] == {'low': closes[-5] - 2, 'high': closes[-1] + 2}
+    assert stats['year_range']['high'] == closes[-1] + 2
+    assert stats['year_range']['low'] == closes[-365] - 2
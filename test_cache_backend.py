@@ -0,0 +1,126 @@
+"""
+Tests for the pluggable cache backends
+"""
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import cache_backend
+from cache_backend import FileCache, InProcessCache, RedisCache
+
+
+def _write_from_worker(directory, value):
+    FileCache(directory).set('current_price', value, 60)
+
+
+def test_in_process_cache_ttl_and_stale_entries():
+    """Expired entries are still returned as stale until the retention window ends"""
+    cache = InProcessCache(stale_retention=0.2)
+    cache.set('price', {'price': 2650.0}, 0.05)
+    assert cache.get_value('price') == {'price': 2650.0}
+
+    time.sleep(0.1)
+    entry = cache.get('price')
+    assert entry is not None and not entry.fresh
+    assert cache.get_value('price') is None
+
+    time.sleep(0.2)
+    assert cache.get('price') is None
+
+
+def test_file_cache_is_shared_between_processes(tmp_path):
+    """A value written by one worker process is read by another"""
+    directory = str(tmp_path)
+    reader = FileCache(directory)
+    process = multiprocessing.Process(target=_write_from_worker,
+                                      args=(directory, {'price': 2651.5}))
+    process.start()
+    process.join()
+    assert reader.get_value('current_price') == {'price': 2651.5}
+
+    # Replacing the entry is picked up despite the reader's decode memo
+    _write_from_worker(directory, {'price': 2652.0})
+    assert reader.get_value('current_price') == {'price': 2652.0}
+
+
+def test_file_cache_lock_is_exclusive(tmp_path):
+    """Only one worker can hold a fetch lease until it is released or expires"""
+    directory = str(tmp_path)
+    first, second = FileCache(directory), FileCache(directory)
+    assert first.try_lock('current_price', 60)
+    assert not second.try_lock('current_price', 60)
+    first.unlock('current_price')
+    assert second.try_lock('current_price', 60)
+    assert first.try_lock('historical_1Y', 0)
+
+
+def test_file_cache_requires_a_private_directory(tmp_path):
+    """A directory other users can write to would let them plant cache entries"""
+    directory = str(tmp_path)
+    shared = os.path.join(directory, 'shared')
+    os.mkdir(shared)
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        FileCache(shared)
+    os.symlink(directory, os.path.join(directory, 'link'))
+    with pytest.raises(PermissionError):
+        FileCache(os.path.join(directory, 'link'))
+    created = os.path.join(directory, 'created')
+    FileCache(created)
+    assert os.stat(created).st_mode & 0o777 == 0o700
+
+
+def test_file_cache_stores_json_and_removes_dead_entries(tmp_path):
+    directory = str(tmp_path)
+    cache = FileCache(directory, stale_retention=0, max_decoded=2)
+    cache.set('old', {'price': 1}, 0)
+    cache.set('kept', {'price': 2}, 60)
+    with open(cache._path('kept'), 'rb') as f:
+        assert f.read().startswith(b'{"value":{"price":2}')
+
+    assert cache.get('old') is None
+    assert not os.path.exists(cache._path('old'))
+    cache.set('swept', [1], 0)
+    assert cache.sweep() == 1 and os.listdir(directory) == [os.path.basename(cache._path('kept'))]
+
+    for key in ('a', 'b', 'c', 'kept'):
+        cache.set(key, key, 60)
+        cache.get(key)
+    assert len(cache._decoded) == 2
+    assert cache.get('kept') is cache.get('kept')
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, nx=False, px=None):
+        self.values[key] = value
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_redis_cache_returns_the_same_object_until_the_value_changes(monkeypatch):
+    monkeypatch.setattr(cache_backend, 'redis', type('redis', (), {'Redis': type('Redis', (), {
+        'from_url': staticmethod(lambda url: FakeRedis())})}))
+    cache = RedisCache('redis://test')
+    cache.set('stats', {'price': 2650.0}, 60)
+    first = cache.get('stats').value
+    assert cache.get('stats').value is first
+    cache.set('stats', {'price': 2650.0}, 60)
+    assert cache.get('stats').value is not first
+
+
+if __name__ == "__main__":
+    test_in_process_cache_ttl_and_stale_entries()
+    test_file_cache_is_shared_between_processes()
+    test_file_cache_lock_is_exclusive()
+    print("Cache backend tests passed")
@@ -0,0 +1,81 @@
+"""
+Tests for per-provider circuit breakers
+"""
+
+import time
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from hedged_fetch import HedgedFetcher
+from price_providers import FunctionProvider, ProviderRegistry, quote
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_on_error_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4, cooldown=30, clock=clock)
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(0.1, ok)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record(0.1, ok=True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_for_another_cooldown():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_calls=1, cooldown=10, clock=clock)
+    breaker.record(0.1, ok=False)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record(0.1, ok=False)
+    assert breaker.state == OPEN
+    assert breaker.get_metrics()['trips'] == 2
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(latency_threshold=2.0, min_calls=3)
+    for _ in range(3):
+        breaker.record(4.5, ok=True)
+    assert breaker.state == OPEN
+
+
+def test_unused_probe_can_be_released():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_calls=1, cooldown=10, clock=clock)
+    breaker.record(0.1, ok=False)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.ready() and breaker.allow()
+
+
+def test_open_provider_is_skipped_without_waiting():
+    """Once a hanging provider trips, misses go straight to the next provider"""
+    def hanging():
+        time.sleep(0.3)
+        return None
+
+    registry = ProviderRegistry(
+        [FunctionProvider('down', hanging), FunctionProvider('backup', lambda: quote(2650.0))],
+        breaker_factory=lambda: CircuitBreaker(min_calls=1, cooldown=60))
+    fetcher = HedgedFetcher(registry, hedge_delay=5)
+    registry.record('down', 0.3, ok=False)
+
+    started = time.monotonic()
+    provider, result = fetcher.fetch()
+    assert provider.name == 'backup' and result['price'] == 2650.0
+    assert time.monotonic() - started < 0.2
+    assert registry.get_metrics()['down']['breaker']['state'] == OPEN
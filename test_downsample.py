@@ -0,0 +1,109 @@
+"""
+Tests for LTTB and OHLC bucket downsampling
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import downsample
+from cache_backend import FileCache
+from testing_support import FakeUpstream, make_bars, make_series, random_walk
+
+
+def lttb_reference(x, y, threshold):
+    """Straightforward per-point LTTB"""
+    count = len(x)
+    every = (count - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_stop = stop, min(int((i + 2) * every) + 1, count - 1)
+        if i == threshold - 3:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x = np.mean(x[next_start:next_stop])
+            avg_y = np.mean(y[next_start:next_stop])
+        best, best_area = start, -1.0
+        for j in range(start, stop):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(count - 1)
+    return selected
+
+
+def test_lttb_matches_reference():
+    _, _, close = random_walk(1000)
+    x = np.arange(1000, dtype=float) * 60
+    for threshold in (3, 10, 97, 500):
+        assert downsample.lttb_indices(x, close, threshold).tolist() == lttb_reference(x, close, threshold)
+
+
+def test_lttb_keeps_endpoints_and_short_series():
+    high, low, close = random_walk(300)
+    bars = make_series(high, low, close)
+    sampled = downsample.lttb(bars, 50)
+    assert len(sampled) == 50
+    assert sampled.timestamp[0] == bars.timestamp[0] and sampled.timestamp[-1] == bars.timestamp[-1]
+    assert np.all(np.diff(sampled.timestamp) > 0)
+    assert downsample.lttb(bars, 300) is bars
+    with pytest.raises(ValueError):
+        downsample.lttb(bars, 2)
+
+
+def test_ohlc_buckets_preserve_the_range():
+    high, low, close = random_walk(1003)
+    bars = make_series(high, low, close)
+    candles = downsample.ohlc_buckets(bars, 100)
+    assert len(candles) == 100
+    assert candles.high.max() == high.max() and candles.low.min() == low.min()
+    assert candles.open[0] == bars.open[0] and candles.close[-1] == close[-1]
+    assert candles.volume.sum() == bars.volume.sum()
+    # Each candle covers ~10 bars starting at its own timestamp
+    assert candles.high[0] == high[:10].max() and candles.close[0] == close[9]
+
+
+def test_historical_max_points_is_cached_per_data_version(make_service):
+    upstream = FakeUpstream(400)
+    service = make_service(fetch_fn=upstream)
+    result = service.get_historical_prices('1Y', max_points=100)
+    assert len(result['prices']) == 100 and result['bars'] == 365
+    assert result['downsampled'] == {'method': 'lttb', 'points': 100}
+    assert service.get_historical_prices('1Y', max_points=100) is result
+
+    candles = service.get_historical_prices('1Y', columnar=True, max_points=100, method='ohlc')
+    assert len(candles['columns']['dates']) == 100
+    assert service.get_historical_prices('1M', max_points=100)['downsampled'] is None
+
+    upstream.bars = make_bars(0, 401)
+    service.bar_store.refresh(service.symbol, '1d', max_age=0)
+    assert service.get_historical_prices('1Y', max_points=100) is not result
+
+    with pytest.raises(ValueError):
+        service.get_historical_prices('1Y', max_points=100, method='average')
+
+
+def test_requests_share_a_few_point_budgets(make_service):
+    service = make_service(fetch_fn=FakeUpstream(400))
+    result = service.get_historical_prices('1Y', max_points=100)
+    assert service.get_historical_prices('1Y', max_points=199) is result
+    assert downsample.point_budget(10**9) == downsample.POINT_BUDGETS[-1]
+    for period, max_points in (('2Y', None), ('1Y', 5), ('1Y', -100)):
+        with pytest.raises(ValueError):
+            service.get_historical_prices(period, max_points=max_points)
+
+
+def test_downsampled_entries_are_replaced_not_accumulated(tmp_path, make_service):
+    cache_dir = str(tmp_path / 'cache')
+    upstream = FakeUpstream(400)
+    service = make_service(fetch_fn=upstream, cache=FileCache(cache_dir))
+    for days in range(400, 420):
+        upstream.bars = make_bars(0, days)
+        service.bar_store.refresh(service.symbol, '1d', max_age=0)
+        assert service.get_historical_prices('1Y', max_points=100)['data_version'].startswith(f'{days}:')
+    assert len(os.listdir(cache_dir)) == 1
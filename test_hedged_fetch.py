@@ -0,0 +1,82 @@
+"""
+Tests for hedged fan-out across price providers, using local fake providers
+"""
+
+import time
+
+from hedged_fetch import HedgedFetcher
+from price_providers import FunctionProvider, ProviderRegistry
+
+
+def provider(result, latency=0.0, calls=None):
+    def fn():
+        if calls is not None:
+            calls.append(result)
+        time.sleep(latency)
+        return result
+    return fn
+
+
+def hedged(providers, **kwargs):
+    registry = ProviderRegistry([FunctionProvider(name, fn) for name, fn in providers])
+    return HedgedFetcher(registry, **kwargs)
+
+
+def fetch_named(fetcher):
+    provider, quote = fetcher.fetch()
+    return (provider.name if provider else None), quote
+
+
+def test_fast_primary_is_not_hedged():
+    calls = []
+    fetcher = hedged([('a', provider(1, 0.01, calls)), ('b', provider(2, 0.01, calls))],
+                            hedge_delay=0.5)
+    assert fetch_named(fetcher) == ('a', 1)
+    assert calls == [1]
+
+
+def test_slow_primary_is_hedged_to_the_next_provider():
+    """A stalled primary costs one hedge delay, not its full latency"""
+    fetcher = hedged([('a', provider(1, 1.0)), ('b', provider(2, 0.01))], hedge_delay=0.05)
+    started = time.monotonic()
+    assert fetch_named(fetcher) == ('b', 2)
+    assert time.monotonic() - started < 0.5
+    assert fetcher.get_metrics()['hedges'] == 1
+
+
+def test_failed_provider_falls_through_immediately():
+    fetcher = hedged([('a', provider(None)), ('b', provider(None)), ('c', provider(3))],
+                            hedge_delay=5)
+    started = time.monotonic()
+    assert fetch_named(fetcher) == ('c', 3)
+    assert time.monotonic() - started < 1
+    assert fetcher.get_metrics()['providers']['a']['errors'] == 1
+
+
+def test_all_providers_failing_returns_nothing():
+    def broken():
+        raise ConnectionError('down')
+    fetcher = hedged([('a', broken), ('b', provider(None))], hedge_delay=5)
+    assert fetch_named(fetcher) == (None, None)
+
+
+def test_hedge_delay_adapts_to_primary_p95():
+    fetcher = hedged([('a', provider(1, 0.02))], default_delay=3, min_samples=5)
+    assert fetcher.delay_for('a') == 3
+    for _ in range(5):
+        fetcher.fetch()
+    assert 0.015 < fetcher.delay_for('a') < 0.5
+
+
+
+def test_hedges_stay_within_the_tier():
+    """A slow futures quote is not hedged to a spot source; a failed one falls through"""
+    registry = ProviderRegistry([FunctionProvider('futures', provider(1, 0.2)),
+                                 FunctionProvider('spot', provider(2, 0.0), tier=2)])
+    fetcher = HedgedFetcher(registry, hedge_delay=0.01)
+    assert fetch_named(fetcher) == ('futures', 1)
+    assert fetcher.get_metrics()['hedges'] == 0
+
+    registry = ProviderRegistry([FunctionProvider('futures', provider(None, 0.05)),
+                                 FunctionProvider('spot', provider(2, 0.0), tier=2)])
+    assert fetch_named(HedgedFetcher(registry, hedge_delay=0.01)) == ('spot', 2)
@@ -0,0 +1,132 @@
+"""
+Tests for pre-serialized API responses
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+import app as app_module
+from http_cache import ResponseCache, prebuild
+from testing_support import FakeUpstream
+
+
+def test_response_is_encoded_once_per_payload_version():
+    """The same payload object reuses its bytes; a refreshed payload is re-encoded"""
+    cache = ResponseCache()
+    payload = {'price': 2650.0}
+    first = cache.get('price', payload)
+    assert cache.get('price', payload) is first
+
+    refreshed = {'price': 2651.0}
+    second = cache.get('price', refreshed)
+    assert second is not first
+    assert json.loads(second.body) == refreshed
+    assert cache.builds == 2 and cache.hits == 1
+
+
+def test_etag_depends_only_on_content():
+    """Workers encoding equal data produce the same strong ETag"""
+    assert prebuild({'a': 1, 'b': 2}).etag == prebuild({'b': 2, 'a': 1}).etag
+    assert prebuild({'a': 1}).etag != prebuild({'a': 2}).etag
+
+
+def test_price_route_serves_prebuilt_bytes():
+    """The price endpoint returns the prebuilt body and its ETag"""
+    quote = {'price': 2650.5, 'change': None, 'change_percent': None,
+             'timestamp': '2025-01-10T15:30:00', 'source': 'Test', 'success': True}
+    app_module.gold_service.poller.publish(quote)
+
+    response = app_module.app.test_client().get('/api/gold/price')
+    data = response.get_json()
+    assert data['price'] == 2650.5
+    assert data['formatted'] == {'price': '2650.50', 'change': '0.00', 'percent': '0.00'}
+    prebuilt = app_module.response_cache.get('price', quote, app_module.build_price_response)
+    assert response.data == prebuilt.body
+    assert response.headers['ETag'] == f'"{prebuilt.etag}"'
+
+
+def test_unchanged_poll_gets_304_without_body():
+    """Conditional GETs with a matching ETag or date are answered 304 Not Modified"""
+    quote = {'price': 2652.25, 'change': 1.5, 'change_percent': 0.06,
+             'timestamp': '2025-01-10T15:30:00', 'source': 'Test', 'success': True}
+    app_module.gold_service.poller.publish(quote)
+    client = app_module.app.test_client()
+
+    first = client.get('/api/gold/price')
+    assert first.status_code == 200
+    assert 'max-age' in first.headers['Cache-Control']
+    assert 'stale-while-revalidate' in first.headers['Cache-Control']
+    assert first.headers['Last-Modified']
+
+    by_etag = client.get('/api/gold/price', headers={'If-None-Match': first.headers['ETag']})
+    assert by_etag.status_code == 304
+    assert by_etag.data == b''
+
+    by_date = client.get('/api/gold/price', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert by_date.status_code == 304
+
+    # A new snapshot changes the ETag, so the same poll downloads the update
+    app_module.gold_service.poller.publish(dict(quote, price=2653.0, timestamp='2025-01-10T15:31:00'))
+    changed = client.get('/api/gold/price', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.get_json()['price'] == 2653.0
+
+
+def test_response_cache_keeps_the_most_recently_used_keys():
+    cache = ResponseCache(max_entries=2)
+    payloads = [{'n': n} for n in range(3)]
+    cache.get('a', payloads[0])
+    cache.get('b', payloads[1])
+    cache.get('a', payloads[0])
+    cache.get('c', payloads[2])
+    assert cache.get_metrics()['keys'] == 2
+    assert cache.get('a', payloads[0]) is not None and cache.builds == 3
+
+
+def test_historical_variants_stay_bounded(monkeypatch, make_service):
+    monkeypatch.setattr(app_module, 'gold_service', make_service(fetch_fn=FakeUpstream(400)))
+    monkeypatch.setattr(app_module, 'response_cache', ResponseCache())
+    client = app_module.app.test_client()
+
+    for max_points in range(100, 400):
+        assert client.get(f'/api/gold/historical?period=1Y&max_points={max_points}').status_code == 200
+    assert app_module.response_cache.get_metrics()['keys'] == 2
+
+    for query in ('period=1Y2', 'period=1Y&max_points=2', 'period=1Y&max_points=-5'):
+        assert client.get(f'/api/gold/historical?{query}').status_code == 400
+    assert app_module.response_cache.get_metrics()['keys'] == 2
+
+
+def test_last_modified_is_the_data_time_not_the_encoding_time(monkeypatch, make_service):
+    """Every worker sends the same Last-Modified for the same data, so date polls get 304s"""
+    service = make_service(fetch_fn=FakeUpstream(400))
+    monkeypatch.setattr(app_module, 'gold_service', service)
+    client = app_module.app.test_client()
+
+    last_bar = datetime.fromtimestamp(int(service.get_bars('1d').last_timestamp), timezone.utc)
+    for path in ('/api/gold/historical?period=1M', '/api/gold/historical?period=1M&format=columnar',
+                 '/api/gold/indicators?period=1M'):
+        modified = [None, None]
+        for worker in range(2):
+            monkeypatch.setattr(app_module, 'response_cache', ResponseCache())
+            response = client.get(path)
+            modified[worker] = response.headers['Last-Modified']
+        assert modified[0] == modified[1] == format_datetime(last_bar.replace(hour=0), usegmt=True)
+        since = client.get(path, headers={'If-Modified-Since': modified[0]})
+        assert since.status_code == 304
+
+    stats = client.get('/api/gold/stats')
+    stored_at = datetime.fromtimestamp(int(service.cache.get('market_stats').stored_at), timezone.utc)
+    assert stats.headers['Last-Modified'] == format_datetime(stored_at, usegmt=True)
+
+
+if __name__ == "__main__":
+    test_response_is_encoded_once_per_payload_version()
+    test_etag_depends_only_on_content()
+    test_price_route_serves_prebuilt_bytes()
+    test_unchanged_poll_gets_304_without_body()
+    print("HTTP cache tests passed")
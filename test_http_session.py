@@ -0,0 +1,62 @@
+"""
+Tests for the pooled upstream HTTP sessions
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+import http_session
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.5)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_is_shared_within_a_process():
+    http_session.reset_sessions()
+    session = http_session.get_session()
+    assert http_session.get_session() is session
+    adapter = session.get_adapter('https://query1.finance.yahoo.com')
+    assert adapter.max_retries.connect == 2 and adapter.max_retries.read == 0
+    assert 503 in adapter.max_retries.status_forcelist
+
+    http_session.reset_sessions()
+    assert http_session.get_session() is not session
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_forked_child_builds_its_own_session():
+    parent_session = http_session.get_session()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, b'1' if http_session.get_session() is not parent_session else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b'1'
+    assert http_session.get_session() is parent_session
+
+
+def test_default_read_timeout_applies_without_an_explicit_timeout():
+    server = HTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = http_session.create_session(timeout=(1, 0.1))
+    try:
+        started = time.monotonic()
+        with pytest.raises(requests.exceptions.RequestException):
+            session.get(f'http://127.0.0.1:{server.server_port}/')
+        # Read timeouts are not retried
+        assert time.monotonic() - started < 0.4
+    finally:
+        server.shutdown()
@@ -0,0 +1,34 @@
+"""
+Tests that the web app imports without the heavy data stack
+"""
+
+import os
+import subprocess
+import sys
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+import app as app_module
+
+HEAVY_MODULES = ('pandas', 'yfinance', 'curl_cffi')
+
+
+def test_import_app_does_not_load_data_libraries():
+    """A fresh `import app` leaves pandas and yfinance for the first data request"""
+    env = dict(os.environ, PRICE_POLLER_ENABLED='true')
+    script = f"import sys, app; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_poller_starts_on_first_data_request(monkeypatch):
+    started = []
+    monkeypatch.setattr(app_module, 'PRICE_POLLER_ENABLED', True)
+    monkeypatch.setattr(app_module.gold_service, 'start_poller', lambda: started.append(True))
+    client = app_module.app.test_client()
+
+    client.get('/robots.txt')
+    assert started == []
+    client.get('/api/gold/diagnostics')
+    assert started == [True]
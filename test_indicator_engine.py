@@ -0,0 +1,99 @@
+"""
+Tests for the streaming indicator engine against batch NumPy references
+"""
+
+import numpy as np
+import pytest
+
+from indicator_engine import ATR, EMA, MACD, RSI, SMA, Bollinger, IndicatorEngine, signals_from
+from testing_support import make_series, random_walk, stream
+
+
+# Batch references
+
+def sma_reference(x, n):
+    return np.convolve(x, np.ones(n) / n, mode='valid')
+
+
+def wilder_reference(values, n, alpha):
+    """Exponential smoothing seeded with the mean of the first n values"""
+    out = np.empty(len(values) - n + 1)
+    out[0] = values[:n].mean()
+    for i in range(1, len(out)):
+        out[i] = out[i - 1] + alpha * (values[n - 1 + i] - out[i - 1])
+    return out
+
+
+def ema_reference(x, n):
+    return wilder_reference(x, n, 2.0 / (n + 1))
+
+
+def rsi_reference(close, n=14):
+    delta = np.diff(close)
+    gain = wilder_reference(np.clip(delta, 0, None), n, 1.0 / n)
+    loss = wilder_reference(np.clip(-delta, 0, None), n, 1.0 / n)
+    return 100 - 100 / (1 + gain / loss)
+
+
+def atr_reference(high, low, close, n=14):
+    previous = np.concatenate([[np.nan], close[:-1]])
+    true_range = np.nanmax(np.vstack([high - low, np.abs(high - previous), np.abs(low - previous)]), axis=0)
+    return wilder_reference(true_range, n, 1.0 / n)
+
+
+def test_sma_ema_rsi_atr_match_batch_references():
+    high, low, close = random_walk(300)
+    np.testing.assert_allclose(stream(SMA(20), close)[19:], sma_reference(close, 20))
+    np.testing.assert_allclose(stream(EMA(12), close)[11:], ema_reference(close, 12))
+    np.testing.assert_allclose(stream(RSI(14), close)[14:], rsi_reference(close))
+    np.testing.assert_allclose(stream(ATR(14), high, low, close)[13:], atr_reference(high, low, close))
+
+
+def test_macd_and_bollinger_match_batch_references():
+    _, _, close = random_walk(300)
+    macd = stream(MACD(12, 26, 9), close)
+    line = ema_reference(close, 12)[14:] - ema_reference(close, 26)
+    np.testing.assert_allclose([v['macd'] for v in macd[25:]], line)
+    np.testing.assert_allclose([v['signal'] for v in macd[33:]], ema_reference(line, 9))
+
+    bands = stream(Bollinger(20, 2.0), close)[19:]
+    windows = np.lib.stride_tricks.sliding_window_view(close, 20)
+    np.testing.assert_allclose([b['upper'] for b in bands], windows.mean(axis=1) + 2 * windows.std(axis=1))
+
+
+def test_replace_matches_recomputing_with_the_revised_bar():
+    high, low, close = random_walk(60)
+    revised = close.copy()
+    revised[-1] += 25
+    for make in (lambda: SMA(20), lambda: EMA(20), lambda: RSI(14), lambda: MACD(), lambda: Bollinger()):
+        incremental = make()
+        stream(incremental, close)
+        incremental.replace(revised[-1])
+        assert incremental.value == pytest.approx(stream(make(), revised)[-1])
+
+
+def test_engine_processes_only_new_bars():
+    high, low, close = random_walk(120)
+    engine = IndicatorEngine()
+    engine.on_bars('GC=F', '1d', make_series(high[:100], low[:100], close[:100]))
+    assert engine.bars_processed == 100
+
+    # The last stored bar is revised and two new bars arrive
+    close = close.copy()
+    close[99] += 3
+    engine.on_bars('GC=F', '1d', make_series(high[:102], low[:102], close[:102]))
+    assert engine.bars_processed == 102 and engine.rebuilds == 1
+
+    latest = engine.latest('GC=F', '1d')
+    assert latest['indicators']['sma20'] == round(close[82:102].mean(), 2)
+    assert latest['indicators']['rsi'] == round(rsi_reference(close[:102])[-1], 2)
+
+    # Unchanged series: nothing to do, same precomputed result
+    engine.on_bars('GC=F', '1d', make_series(high[:102], low[:102], close[:102]))
+    assert engine.latest('GC=F', '1d') is latest
+
+
+def test_signals_follow_the_indicator_rules():
+    signals = signals_from({'sma20': 2010, 'sma50': 2000, 'rsi': 25.0, 'change_5': -1.5}, 'now')
+    assert [(s['type'], s['signal']) for s in signals] == [
+        ('SMA Crossover', 'buy'), ('RSI', 'buy'), ('Price Action', 'buy')]
@@ -0,0 +1,97 @@
+"""
+Tests for the vectorized indicator series against the streaming engine
+"""
+
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+import indicators
+from indicator_engine import ATR, EMA, MACD, RSI, SMA, Bollinger
+from testing_support import FakeUpstream, make_series, random_walk, stream
+
+
+def assert_series(vectorized, streamed):
+    """NaN where the streaming indicator has no value yet, equal afterwards"""
+    streamed = np.array([np.nan if v is None else v for v in streamed], dtype=float)
+    np.testing.assert_allclose(vectorized, streamed, rtol=1e-9, atol=1e-9)
+
+
+def test_rolling_matches_sliding_windows():
+    _, _, close = random_walk(200)
+    for period in (1, 2, 3, 7, 14, 20, 50):
+        windows = sliding_window_view(close, period)
+        np.testing.assert_allclose(indicators.rolling(close, period), windows.sum(axis=1))
+        np.testing.assert_array_equal(indicators.rolling(close, period, np.maximum), windows.max(axis=1))
+        np.testing.assert_array_equal(indicators.rolling(close, period, np.minimum), windows.min(axis=1))
+    assert len(indicators.rolling(close[:5], 20)) == 0
+
+
+def test_series_match_the_streaming_indicators():
+    high, low, close = random_walk(300)
+    assert_series(indicators.sma(close, 20), stream(SMA(20), close))
+    assert_series(indicators.ema(close, 12), stream(EMA(12), close))
+    assert_series(indicators.rsi(close), stream(RSI(14), close))
+    assert_series(indicators.atr(high, low, close), stream(ATR(14), high, low, close))
+
+    streamed = stream(MACD(12, 26, 9), close)
+    line, signal, histogram = indicators.macd(close)
+    assert_series(line, [v and v['macd'] for v in streamed])
+    assert_series(signal, [v and v['signal'] for v in streamed])
+    assert_series(histogram, [v and v['histogram'] for v in streamed])
+
+    streamed = stream(Bollinger(20, 2.0), close)
+    for band, series in zip(('middle', 'upper', 'lower'), indicators.bollinger(close)):
+        assert_series(series, [v and v[band] for v in streamed])
+
+
+def test_rsi_without_losses_or_moves():
+    assert indicators.rsi(np.arange(30.0))[-1] == 100.0
+    assert indicators.rsi(np.full(30, 2000.0))[-1] == 50.0
+    assert np.isnan(indicators.rsi(np.arange(30.0))[:14]).all()
+
+
+def test_stochastic_matches_definition():
+    high, low, close = random_walk(100)
+    k, d = indicators.stochastic(high, low, close, 14, 3)
+    highest = sliding_window_view(high, 14).max(axis=1)
+    lowest = sliding_window_view(low, 14).min(axis=1)
+    expected_k = (close[13:] - lowest) / (highest - lowest) * 100
+    assert np.isnan(k[:13]).all() and np.isnan(d[:15]).all()
+    np.testing.assert_allclose(k[13:], expected_k)
+    np.testing.assert_allclose(d[15:], sliding_window_view(expected_k, 3).mean(axis=1))
+
+
+def test_short_input_is_all_warm_up():
+    high, low, close = random_walk(10)
+    for series in (indicators.sma(close, 20), indicators.rsi(close), indicators.atr(high, low, close),
+                   *indicators.macd(close), *indicators.bollinger(close),
+                   *indicators.stochastic(high, low, close)):
+        assert len(series) == 10 and np.isnan(series).all()
+
+
+def test_compute_named_series_for_bars():
+    high, low, close = random_walk(120)
+    result = indicators.compute(make_series(high, low, close), ['sma20', 'macd', 'stochastic'])
+    assert set(result) == {'sma20', 'macd', 'macd_signal', 'macd_histogram', 'stochastic_k', 'stochastic_d'}
+    assert all(len(series) == 120 for series in result.values())
+    with pytest.raises(ValueError):
+        indicators.compute(make_series(high, low, close), ['vwap'])
+
+
+def test_to_json_list_uses_null_for_warm_up():
+    assert indicators.to_json_list(np.array([np.nan, 1.234, 2.0])) == [None, 1.23, 2.0]
+
+
+def test_overlays_are_cut_from_the_full_series(make_service):
+    """The period window starts with warmed-up values computed from earlier bars"""
+    upstream = FakeUpstream(200)
+    service = make_service(fetch_fn=upstream)
+    overlay = service.get_indicator_series('1M', ['sma50', 'rsi'])
+    historical = service.get_historical_prices('1M', columnar=True)
+    assert overlay['dates'] == historical['columns']['dates']
+    assert overlay['series']['sma50'][0] == round(upstream.bars.close[121:171].mean(), 2)
+    assert overlay['series']['rsi'][-1] == 100.0
+    assert service.get_indicator_series('1M', ['sma50', 'rsi']) is overlay
+    with pytest.raises(ValueError):
+        service.get_indicator_series('1M', ['sma7'])
@@ -0,0 +1,90 @@
+"""
+Tests for the tick-fed intraday day/week aggregator
+"""
+
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+from bar_store import BarSeries
+from intraday_stats import DAY, IntradayAggregator, session_index
+from price_poller import PriceSnapshot
+
+MONDAY = 1704067200  # 2024-01-01 00:00 UTC, Sunday 19:00 in New York
+WEDNESDAY = MONDAY + 2 * DAY
+HOUR = 3600
+
+
+def test_sessions_roll_over_at_the_cme_open():
+    """18:00 New York starts the next day's session, in winter and in summer"""
+    assert session_index(MONDAY) == MONDAY // DAY  # Sunday evening trades for Monday
+    tuesday_open = MONDAY + 23 * HOUR  # Monday 18:00 EST
+    assert session_index(tuesday_open - 1) == MONDAY // DAY
+    assert session_index(tuesday_open) == MONDAY // DAY + 1
+    july_1 = 1719792000  # Monday 2024-07-01 00:00 UTC; 18:00 EDT is 22:00 UTC
+    assert session_index(july_1 + 22 * HOUR - 1) == july_1 // DAY
+    assert session_index(july_1 + 22 * HOUR) == july_1 // DAY + 1
+
+
+def test_ticks_update_day_and_week_with_vwap():
+    aggregator = IntradayAggregator()
+    # Cumulative session volume: 100 traded at 2651, then 300 at 2649
+    for offset, price, volume in ((60, 2650.0, 1000), (120, 2651.0, 1100),
+                                  (180, 2649.0, 1400), (240, 2655.0, None)):
+        aggregator.update(WEDNESDAY + offset, price, volume)
+    day = aggregator.sessions(WEDNESDAY + 300)['day']
+    assert (day['open'], day['high'], day['low'], day['last']) == (2650.0, 2655.0, 2649.0, 2655.0)
+    assert day['vwap'] == round((2651.0 * 100 + 2649.0 * 300) / 400, 2)
+    assert day['ticks'] == 4
+
+
+def test_new_session_resets_the_day_but_not_the_week():
+    aggregator = IntradayAggregator()
+    aggregator.update(WEDNESDAY + 60, 2600.0)
+    aggregator.update(WEDNESDAY + DAY + 60, 2700.0)
+    sessions = aggregator.sessions(WEDNESDAY + DAY + 120)
+    assert (sessions['day']['low'], sessions['day']['high']) == (2700.0, 2700.0)
+    assert (sessions['week']['low'], sessions['week']['high']) == (2600.0, 2700.0)
+
+    # The week is the last five sessions with data, not the calendar week
+    sessions = aggregator.sessions(MONDAY + 7 * DAY + 60)
+    assert sessions['day']['open'] is None and sessions['week']['low'] == 2600.0
+    for day in range(7, 12):
+        aggregator.update(MONDAY + day * DAY + 60, 2650.0 + day)
+    assert aggregator.sessions(MONDAY + 11 * DAY + 120)['week'] == {
+        'open': 2657.0, 'high': 2661.0, 'low': 2657.0, 'last': 2661.0, 'vwap': None, 'ticks': 5}
+
+
+def test_daily_bars_seed_the_range_before_ticks():
+    timestamps = MONDAY + np.arange(-3, 3) * DAY  # Fri, Sat .. Wed
+    close = np.array([2400.0, 2500.0, 2550.0, 2600.0, 2610.0, 2620.0])
+    bars = BarSeries(timestamps, close - 5, close + 10, close - 10, close, np.zeros(6))
+    aggregator = IntradayAggregator()
+    aggregator.seed(bars, WEDNESDAY + 60)
+    aggregator.update(WEDNESDAY + 120, 2640.0)
+    sessions = aggregator.sessions(WEDNESDAY + 180)
+    assert sessions['day'] == {'open': 2615.0, 'high': 2640.0, 'low': 2610.0, 'last': 2640.0,
+                               'vwap': None, 'ticks': 1}
+    # Five sessions: Friday's bar is the sixth most recent and is left out
+    assert (sessions['week']['open'], sessions['week']['low']) == (2495.0, 2490.0)
+
+
+def test_service_stats_use_live_ranges_without_upstream_calls(make_service):
+    service = make_service()
+    service.cache.set('market_stats', {'day_range': {'low': 1, 'high': 2}, 'week_range': {'low': 1, 'high': 2},
+                                       'year_range': {'low': 1, 'high': 3000}, 'current_price': 2,
+                                       'source': 'Yahoo Finance', 'success': True}, 60)
+    now = time.time()
+    for price in (2650.0, 2662.5, 2645.0):
+        service._record_tick(PriceSnapshot({'price': price, 'symbol': 'GC=F'}, now, 1))
+    service._record_tick(PriceSnapshot({'price': 9999.0, 'symbol': 'XAUUSD=X'}, now, 2))
+
+    stats = service.get_market_stats()
+    assert stats['day_range'] == {'low': 2645.0, 'high': 2662.5}
+    assert stats['current_price'] == 2645.0
+    assert stats['year_range'] == {'low': 1, 'high': 3000}
+    # Unchanged aggregator: the same object, so the encoded response is reused
+    assert service.get_market_stats() is stats
@@ -0,0 +1,114 @@
+"""
+Tests for parameter sweeps over a shared-memory process pool
+"""
+
+import os
+import time
+from multiprocessing import shared_memory
+
+import pytest
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+import app as app_module
+import backtest
+import param_sweep
+from cache_backend import InProcessCache
+from testing_support import FakeUpstream, make_series, random_walk
+
+
+def test_expand_grid_skips_invalid_combinations():
+    combinations = param_sweep.expand_grid({'fast': [10, 20, 50], 'slow': ['50'], 'rule': 'sma_crossover'})
+    assert [(c['fast'], c['slow']) for c in combinations] == [(10, 50), (20, 50)]
+    with pytest.raises(ValueError):
+        param_sweep.expand_grid({'window': [1, 2]})
+    with pytest.raises(ValueError):
+        param_sweep.expand_grid({'fast': list(range(1000)), 'slow': list(range(1000))})
+
+
+def test_sweep_matches_single_backtests():
+    high, low, close = random_walk(600)
+    bars = make_series(high, low, close)
+    grid = {'rule': ['rsi'], 'oversold': [20, 30], 'overbought': [70, 80], 'rsi_period': [7, 14]}
+    calls = []
+    results = param_sweep.sweep(bars, grid, workers=2, progress=lambda done, total: calls.append((done, total)))
+
+    assert len(results) == 8 and calls[0] == (0, 8) and calls[-1] == (8, 8)
+    for result in results:
+        assert result['stats'] == backtest.run(bars, result['params'])['stats']
+    sharpes = [r['stats']['sharpe'] for r in results]
+    assert sharpes == sorted(sharpes, reverse=True)
+
+
+def test_shared_memory_is_released():
+    high, low, close = random_walk(100)
+    with param_sweep.SharedBars(make_series(high, low, close)) as shared:
+        name = shared.memory.name
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def wait_for(jobs, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Sweep {job_id} did not finish")
+
+
+def test_jobs_report_progress_and_are_reused(make_service):
+    service = make_service(fetch_fn=FakeUpstream(300))
+    grid = {'rule': ['sma_crossover'], 'fast': [5, 10, 20], 'slow': [30, 50]}
+    job = service.start_sweep(grid, top=3)
+    assert job['status'] == 'queued' and job['progress'] == {'done': 0, 'total': 6}
+
+    done = wait_for(service.sweeps, job['id'])
+    assert done['status'] == 'done' and done['progress'] == {'done': 6, 'total': 6}
+    assert len(done['results']) == 3
+
+    # The same sweep over the same data is the same job
+    assert service.start_sweep(grid, top=3)['id'] == job['id']
+    assert service.start_sweep(grid, top=5)['id'] != job['id']
+
+
+def test_jobs_are_shared_and_expire_with_their_lease():
+    """A second worker sharing the cache reuses the job; a lapsed lease lets it run again"""
+    high, low, close = random_walk(200)
+    bars = make_series(high, low, close)
+    grid = {'rule': ['sma_crossover'], 'fast': [5], 'slow': [30]}
+    cache = InProcessCache()
+    first, second = param_sweep.SweepJobs(cache), param_sweep.SweepJobs(cache)
+    job = first.submit(bars, grid, version='v1')
+    assert second.submit(bars, grid, version='v1')['owner'] == job['owner']
+    assert wait_for(first, job['id'])['status'] == 'done'
+
+    # A worker that died mid-run leaves a job whose lease lapses
+    cache.set(first._key('crashed'), dict(job, id='crashed', status='running', lease_until=time.time() - 1), 60)
+    lost = second.get('crashed')
+    assert lost['status'] == 'failed' and 'stopped' in lost['error']
+
+
+def test_sweep_endpoints(monkeypatch, make_service):
+    service = make_service(fetch_fn=FakeUpstream(300))
+    monkeypatch.setattr(app_module, 'gold_service', service)
+    client = app_module.app.test_client()
+    assert client.post('/api/gold/backtest/sweep', json={'grid': {'window': [1]}}).status_code == 400
+    assert client.post('/api/gold/backtest/sweep', json={}).status_code == 400
+    assert client.get('/api/gold/backtest/sweep/missing').status_code == 404
+    for top in (0, -5, param_sweep.MAX_TOP + 1):
+        assert client.post('/api/gold/backtest/sweep', json={'grid': {'fast': [5]}, 'top': top}).status_code == 400
+
+    def claimed_elsewhere(*args, **kwargs):
+        raise TimeoutError('Sweep is being claimed by another worker')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(service.sweeps, 'submit', claimed_elsewhere)
+        busy = client.post('/api/gold/backtest/sweep', json={'grid': {'fast': [5]}})
+        assert busy.status_code == 503 and busy.headers['Retry-After'] == '1'
+
+    response = client.post('/api/gold/backtest/sweep', json={'grid': {'fast': [5, 10], 'slow': [30]}})
+    assert response.status_code == 202
+    assert wait_for(service.sweeps, response.get_json()['id'])['status'] == 'done'
+    assert client.get(response.headers['Location']).get_json()['status'] == 'done'
@@ -0,0 +1,87 @@
+"""
+Tests for the background price poller and the snapshot-reading service path
+"""
+
+import threading
+import time
+
+from price_poller import PricePoller
+from gold_api_service import GoldPriceService
+from cache_backend import InProcessCache
+from price_providers import FunctionProvider, ProviderRegistry
+
+
+def test_poller_publishes_snapshots():
+    """The refresh loop publishes versioned snapshots and keeps the last good one"""
+    quotes = [{'price': 2650.0}, None, {'price': 2651.0}]
+    poller = PricePoller(lambda: quotes.pop(0), interval=3600)
+
+    first = poller.refresh()
+    assert first.data == {'price': 2650.0}
+    assert first.version == 1
+
+    # A failed fetch keeps serving the previous snapshot
+    assert poller.refresh() is first
+    assert poller.error_count == 1
+
+    second = poller.refresh()
+    assert second.version == 2
+    assert poller.snapshot() is second
+    assert poller.snapshot_age() < 1
+
+
+def test_service_serves_stale_snapshot_while_revalidating():
+    """A stale snapshot is returned immediately and a refresh is requested"""
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(time.time())
+        release.wait(5)
+        return {'price': 2700.0 + len(calls)}
+
+    service = GoldPriceService(cache=InProcessCache())
+    service.poller.fetch_fn = slow_fetch
+    service.poller.publish({'price': 2600.0}, fetched_at=time.time() - 3600)
+    service.start_poller()
+    try:
+        started = time.time()
+        assert service.get_current_price() == {'price': 2600.0}
+        assert time.time() - started < 0.5
+    finally:
+        release.set()
+        service.stop_poller()
+    assert len(calls) >= 1
+
+
+def test_worker_waits_for_the_price_another_worker_is_fetching(make_service):
+    """A poller that finds the fetch lease taken picks up the shared price instead of failing"""
+    shared = InProcessCache()
+    calls = []
+
+    def quote():
+        calls.append(True)
+        return {'price': 2600.0, 'change': 0.0, 'change_percent': 0.0, 'volume': None}
+
+    service = make_service(cache=shared, providers=ProviderRegistry([FunctionProvider('own', quote)]))
+    service.lease_poll_interval = 0.01
+    shared_price = {'price': 2651.5, 'source': 'Other worker', 'success': True}
+    assert shared.try_lock('current_price', 60)  # Another worker is fetching
+
+    def other_worker_finishes():
+        time.sleep(0.1)
+        shared.set('current_price', shared_price, 60)
+
+    threading.Thread(target=other_worker_finishes).start()
+    service.start_poller()
+    try:
+        assert service.get_current_price() == shared_price
+    finally:
+        service.stop_poller()
+    assert service.poller.error_count == 0 and calls == []
+
+
+if __name__ == "__main__":
+    test_poller_publishes_snapshots()
+    test_service_serves_stale_snapshot_while_revalidating()
+    print("Price poller tests passed")
@@ -0,0 +1,105 @@
+"""
+Tests for the price provider registry and its adaptive ordering
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+from circuit_breaker import CircuitBreaker
+from price_providers import FunctionProvider, ProviderRegistry, ProviderStats, quote
+
+
+class UnavailableProvider(FunctionProvider):
+    def available(self):
+        return False
+
+
+def names(registry):
+    return [provider.name for provider in registry.ordered()]
+
+
+def test_untried_providers_keep_registration_order():
+    registry = ProviderRegistry([FunctionProvider(name, lambda: None) for name in 'abc'])
+    assert names(registry) == ['a', 'b', 'c']
+
+
+def test_slow_or_failing_provider_is_demoted():
+    # Breakers that never trip, so b stays in the order while it recovers
+    registry = ProviderRegistry([FunctionProvider(name, lambda: None) for name in 'abc'],
+                                default_latency=1.0,
+                                breaker_factory=lambda: CircuitBreaker(min_calls=100))
+    for _ in range(5):
+        registry.record('a', 2.0, ok=True)   # Slower than an untried provider
+        registry.record('b', 0.1, ok=False)  # Fast but never valid
+        registry.record('c', 0.3, ok=True)
+    assert names(registry) == ['c', 'a', 'b']
+
+    # Recovery is gradual: a few good answers bring b back to the front
+    for _ in range(10):
+        registry.record('b', 0.1, ok=True)
+    assert names(registry)[0] == 'b'
+
+
+def test_ranking_never_crosses_tiers():
+    """A fast spot source stays behind a slower futures provider"""
+    registry = ProviderRegistry([FunctionProvider('futures', lambda: None),
+                                 FunctionProvider('futures-chart', lambda: None),
+                                 FunctionProvider('spot', lambda: None, tier=2)],
+                                breaker_factory=lambda: CircuitBreaker(min_calls=100))
+    for _ in range(5):
+        registry.record('futures', 2.0, ok=True)
+        registry.record('spot', 0.05, ok=True)
+    assert names(registry) == ['futures-chart', 'futures', 'spot']
+    assert registry.get_metrics()['spot']['tier'] == 2
+
+
+def test_unavailable_providers_are_skipped():
+    registry = ProviderRegistry([FunctionProvider('a', lambda: None), UnavailableProvider('b', lambda: None)])
+    assert names(registry) == ['a']
+    assert registry.get_metrics()['b']['available'] is False
+
+
+def test_duplicate_registration_is_rejected():
+    registry = ProviderRegistry([FunctionProvider('a', lambda: None)])
+    with pytest.raises(ValueError):
+        registry.register(FunctionProvider('a', lambda: None))
+    registry.unregister('a')
+    assert names(registry) == []
+
+
+def test_expected_time_accounts_for_errors():
+    stats = ProviderStats(alpha=0.5)
+    stats.record(0.2, ok=True)
+    stats.record(0.2, ok=False)
+    assert stats.error_rate == 0.5
+    assert stats.expected_time(default_latency=1.0) == pytest.approx(0.4)
+
+
+def test_service_quotes_come_from_the_best_provider(make_service):
+    registry = ProviderRegistry([FunctionProvider('down', lambda: None, source='Down'),
+                                 FunctionProvider('spot', lambda: quote(2650.5, 1.5, 0.06), source='Spot')])
+    service = make_service(providers=registry)
+    data = service._fetch_current_price()
+    assert data['price'] == 2650.5 and data['change'] == 1.5
+    assert data['source'] == 'Spot' and data['success'] is True
+    assert names(registry) == ['spot', 'down']
+
+
+def test_unchanged_quotes_keep_their_timestamp(make_service):
+    """The timestamp is hashed into the ETag, so it only moves with the quote"""
+    quotes = [quote(2650.5, 1.5, 0.06), quote(2650.5, 1.5, 0.06), quote(2651.0, 2.0, 0.08),
+              quote(2651.0, 2.0, 0.08, quoted_at=1736437200)]
+    registry = ProviderRegistry([FunctionProvider('spot', lambda: quotes.pop(0), source='Spot')])
+    service = make_service(providers=registry)
+    def poll():
+        return service.poller.publish(service._fetch_current_price()).data
+
+    first = poll()
+    assert poll() is first
+    assert poll()['price'] == 2651.0
+    quoted = poll()
+    assert quoted['timestamp'] == datetime.fromtimestamp(1736437200).isoformat() and 'quoted_at' not in quoted
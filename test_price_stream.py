@@ -0,0 +1,62 @@
+"""
+Tests for the Server-Sent Events price broadcaster
+"""
+
+import os
+import threading
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+from price_stream import PriceBroadcaster, format_event
+
+
+def test_new_subscriber_gets_latest_event_then_live_updates():
+    """A subscriber receives the current price at once and each later tick"""
+    broadcaster = PriceBroadcaster(heartbeat_interval=5)
+    broadcaster.publish(1000, b'{"price":2650.0}')
+    stream = broadcaster.stream()
+
+    assert next(stream).startswith(b'retry:')
+    assert next(stream) == format_event(1000, b'{"price":2650.0}')
+
+    threading.Timer(0.05, broadcaster.publish, args=(2000, b'{"price":2651.0}')).start()
+    assert next(stream) == format_event(2000, b'{"price":2651.0}')
+    assert broadcaster.subscribers == 1
+    stream.close()
+    assert broadcaster.subscribers == 0
+
+
+def test_last_event_id_resumes_after_missed_events():
+    """Reconnecting with Last-Event-ID replays only the events after it"""
+    broadcaster = PriceBroadcaster(heartbeat_interval=0.01)
+    for event_id in (1, 2, 3):
+        broadcaster.publish(event_id, b'{}')
+    stream = broadcaster.stream(last_event_id=1)
+    next(stream)
+    assert [next(stream) for _ in range(2)] == [format_event(2, b'{}'), format_event(3, b'{}')]
+
+    # Fully caught up: only heartbeats until something new is published
+    assert next(stream).startswith(b': heartbeat')
+    stream.close()
+
+
+def test_stream_route_is_event_stream():
+    """The Flask route streams text/event-stream with the current price first"""
+    import app as app_module
+
+    app_module.gold_service.poller.publish({
+        'price': 2654.0, 'change': None, 'change_percent': None,
+        'timestamp': '2025-01-10T15:40:00', 'source': 'Test', 'success': True})
+    response = app_module.app.test_client().get('/api/gold/stream')
+    assert response.mimetype == 'text/event-stream'
+    chunks = response.iter_encoded()
+    next(chunks)
+    assert b'"price":2654.0' in next(chunks)
+    response.close()
+
+
+if __name__ == "__main__":
+    test_new_subscriber_gets_latest_event_then_live_updates()
+    test_last_event_id_resumes_after_missed_events()
+    test_stream_route_is_event_stream()
+    print("Price stream tests passed")
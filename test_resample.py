@@ -0,0 +1,86 @@
+"""
+Tests for OHLC resampling of stored bar series
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import resample
+from bar_store import BarSeries
+
+MONDAY = 1704067200  # 2024-01-01 00:00 UTC
+
+
+def make_intraday(step, count, start=MONDAY, seed=3):
+    rng = np.random.default_rng(seed)
+    timestamp = start + np.arange(count) * step
+    # Leave gaps, as markets close
+    timestamp = timestamp[rng.random(count) > 0.1]
+    count = len(timestamp)
+    close = 2000 + np.cumsum(rng.normal(0, 1, count))
+    return BarSeries(timestamp, close + rng.normal(0, 0.5, count), close + 1, close - 1, close,
+                     rng.integers(1, 100, count))
+
+
+def pandas_reference(bars, rule):
+    frame = pd.DataFrame({name: getattr(bars, name) for name in ('open', 'high', 'low', 'close', 'volume')},
+                         index=pd.to_datetime(bars.timestamp, unit='s'))
+    result = frame.resample(rule, label='left', closed='left').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    return result.index.asi8 // 10**9, result
+
+
+def assert_matches(resampled, timestamps, reference):
+    np.testing.assert_array_equal(resampled.timestamp, timestamps)
+    for name in ('open', 'high', 'low', 'close'):
+        np.testing.assert_allclose(getattr(resampled, name), reference[name].to_numpy())
+    np.testing.assert_array_equal(resampled.volume, reference['volume'].to_numpy())
+
+
+@pytest.mark.parametrize('base_step, interval, rule', [
+    (60, '5m', '5min'), (300, '15m', '15min'), (3600, '4h', '4h'), (86400, '1w', 'W-MON')])
+def test_resample_matches_pandas(base_step, interval, rule):
+    bars = make_intraday(base_step, 3000)
+    timestamps, reference = pandas_reference(bars, rule)
+    resampled = resample.resample(bars, interval)
+    assert_matches(resampled, timestamps, reference)
+
+
+def test_weeks_start_on_monday():
+    bars = make_intraday(86400, 60)
+    weeks = resample.resample(bars, '1w')
+    assert set(pd.to_datetime(weeks.timestamp, unit='s').dayofweek) == {0}
+
+
+def test_unsupported_interval():
+    with pytest.raises(ValueError):
+        resample.base_interval('2h')
+
+
+class IntervalUpstream:
+    """Serves a fixed series per interval and records which intervals were requested"""
+
+    def __init__(self, series):
+        self.series = series
+        self.intervals = []
+
+    def __call__(self, symbol, interval, start=None, period=None):
+        self.intervals.append((interval, period))
+        return self.series[interval]
+
+
+def test_coarser_intervals_never_fetch_upstream(make_service):
+    upstream = IntervalUpstream({'5m': make_intraday(300, 5000), '1h': make_intraday(3600, 3000)})
+    service = make_service(fetch_fn=upstream)
+    fifteen = service.get_historical_prices('1W', columnar=True, interval='15m')
+    four_hour = service.get_historical_prices('1M', interval='4h')
+    service.get_historical_prices('1W', interval='5m')
+    service.get_historical_prices('1M', interval='1h')
+    assert upstream.intervals == [('5m', '60d'), ('1h', '730d')]
+
+    assert fifteen['interval'] == '15m' and len(fifteen['columns']['dates'][0]) == len('2024-01-01 00:00')
+    hours = pd.to_datetime([p['date'] for p in four_hour['prices']]).hour
+    assert set(hours) <= {0, 4, 8, 12, 16, 20}
+    # The resampled series is reused until its base series changes
+    assert service.get_bars('4h') is service.get_bars('4h')
@@ -0,0 +1,80 @@
+"""
+Tests for single-flight coalescing of upstream fetches
+"""
+
+import threading
+import time
+
+from single_flight import SingleFlight
+from gold_api_service import GoldPriceService
+from cache_backend import InProcessCache
+
+
+def test_concurrent_callers_share_one_fetch():
+    """Only the first caller fetches; everyone else receives its result"""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'price': 2650.0}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('price', fetch, timeout=5)))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    while len(calls) == 0 or flight.get_metrics()['coalesced'] < 9:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'price': 2650.0}] * 10
+    metrics = flight.get_metrics()
+    assert metrics['originating'] == 1
+    assert metrics['coalesced'] == 9
+
+
+def test_waiter_falls_back_to_stale_value_on_timeout():
+    """A waiter stops waiting after the bound and gets the stale value"""
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do('price', lambda: release.wait(5)))
+    leader.start()
+    while not flight.in_flight():
+        time.sleep(0.01)
+
+    assert flight.do('price', lambda: 'unused', timeout=0.05, stale='stale') == 'stale'
+    assert flight.get_metrics()['timeouts'] == 1
+    release.set()
+    leader.join()
+
+
+def test_historical_misses_are_coalesced():
+    """Concurrent historical misses for one period make a single upstream call"""
+    service = GoldPriceService(cache=InProcessCache())
+    calls = []
+
+    def fetch(period, columnar=False, interval='1d'):
+        calls.append(period)
+        time.sleep(0.3)
+        return {'prices': [], 'period': period, 'success': True}
+
+    service._fetch_historical_prices = fetch
+    threads = [threading.Thread(target=service.get_historical_prices, args=('1Y',)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ['1Y']
+
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_fetch()
+    test_waiter_falls_back_to_stale_value_on_timeout()
+    test_historical_misses_are_coalesced()
+    print("Single-flight tests passed")
@@ -0,0 +1,136 @@
+"""
+Tests for warming up the service before workers fork
+"""
+
+import importlib.util
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault('PRICE_POLLER_ENABLED', 'false')
+
+from price_providers import FunctionProvider, ProviderRegistry
+from testing_support import FakeBatchUpstream, FakeUpstream
+
+
+@pytest.fixture
+def quote_calls():
+    """The pid of every upstream quote fetch made by the service fixture"""
+    return []
+
+
+@pytest.fixture
+def service(make_service, quote_calls):
+    def quote():
+        quote_calls.append(os.getpid())
+        return {'price': 2650.0, 'change': 1.0, 'change_percent': 0.04, 'volume': None}
+
+    registry = ProviderRegistry([FunctionProvider('fake', quote)])
+    return make_service(fetch_fn=FakeUpstream(400), batch_fetch_fn=FakeBatchUpstream(400), providers=registry)
+
+
+def test_warmup_fetches_everything_once(service, quote_calls):
+    timings = service.warmup()
+    assert list(timings) == ['price', 'stats'] + [f'historical:{p}' for p in service.period_days]
+    assert service.poller.snapshot().data['price'] == 2650.0
+
+    fetches = len(service.bar_store.fetch_fn.requests)
+    for period in service.period_days:
+        assert service.get_historical_prices(period)['period'] == period
+    service.get_current_price()
+    assert len(service.bar_store.fetch_fn.requests) == fetches and len(quote_calls) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_worker_can_fetch_after_reset(service):
+    """The hedged-fetch pool inherited from the parent has no threads in the child"""
+    service.warmup()
+    service._fetch_current_price()  # Leaves an idle pool thread in the parent
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            service.after_fork()
+            status = 0 if service._fetch_current_price()['price'] == 2650.0 else 1
+        finally:
+            os.write(write_end, bytes([status]))
+            os._exit(status)
+    os.close(write_end)
+    assert os.read(read_end, 1) == b'\x00'
+    os.waitpid(pid, 0)
+
+
+class RecordingLog:
+    def __init__(self):
+        self.records = []
+
+    def info(self, message, *args):
+        self.records.append(('info', message % args))
+
+    def warning(self, message, *args):
+        self.records.append(('warning', message % args))
+
+    def error(self, message, *args):
+        self.records.append(('error', message % args))
+
+    def exception(self, message, *args):
+        self.records.append(('exception', message % args))
+
+
+def load_gunicorn_conf():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_master_warmup_runs_in_a_child_with_a_deadline(monkeypatch):
+    import app as app_module
+
+    conf = load_gunicorn_conf()
+    monkeypatch.setattr(conf, 'warmup_timeout', 0.5)
+    monkeypatch.setattr(app_module.gold_service, 'warmup', lambda: {'pid': os.getpid()})
+    log = RecordingLog()
+    conf._warmup(log)
+    (level, message), = log.records
+    assert level == 'info' and f'pid {os.getpid()}' not in message
+
+    monkeypatch.setattr(app_module.gold_service, 'warmup', lambda: time.sleep(5))
+    log = RecordingLog()
+    started = time.monotonic()
+    conf._warmup(log)
+    assert time.monotonic() - started < 2
+    assert log.records[0][0] == 'warning'
+
+    def fail():
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr(app_module.gold_service, 'warmup', fail)
+    log = RecordingLog()
+    conf._warmup(log)
+    (level, message), = log.records
+    assert level == 'error' and 'upstream down' in message
+
+
+def test_worker_warmup_does_not_block_init(monkeypatch):
+    import app as app_module
+
+    conf = load_gunicorn_conf()
+    release = threading.Event()
+    monkeypatch.setattr(app_module.gold_service, 'warmup', lambda: {'blocked': release.wait(5)})
+    log = RecordingLog()
+    started = time.monotonic()
+    conf._warmup_in_background(log)
+    assert time.monotonic() - started < 1
+    release.set()
+
+
+def test_after_fork_drops_locks_held_by_parent_threads(service):
+    service.bar_store._lock_for(('GC=F', '1d')).acquire()  # As if a warmup thread were mid-refresh
+    service.after_fork()
+    assert service.bar_store._lock_for(('GC=F', '1d')).acquire(timeout=1)
@@ -0,0 +1,114 @@
+"""
+Tests for the WebSocket feed hub: deltas, sequence numbers and slow clients
+"""
+
+import json
+
+from ws_feed import FeedHub, diff_bars
+
+
+def bar(date, price):
+    return {'date': date, 'price': price, 'volume': 0, 'high': price, 'low': price, 'open': price}
+
+
+def drain(session):
+    messages = []
+    while True:
+        item = session.next_item(timeout=0)
+        if item is None:
+            return messages
+        messages.append(item)
+
+
+def test_diff_bars_sliding_window():
+    """A window that slid by one day drops one bar, updates the last and appends"""
+    previous = [bar('2024-01-01', 1.0), bar('2024-01-02', 2.0), bar('2024-01-03', 3.0)]
+    current = [bar('2024-01-02', 2.0), bar('2024-01-03', 3.5), bar('2024-01-04', 4.0)]
+    assert diff_bars(previous, current) == {
+        'drop_first': 1,
+        'update_last': bar('2024-01-03', 3.5),
+        'append': [bar('2024-01-04', 4.0)]
+    }
+    assert diff_bars(previous, previous) == {'drop_first': 0, 'update_last': None, 'append': []}
+    # Unrelated windows can only be sent as a snapshot
+    assert diff_bars(previous, [bar('2023-06-01', 1.0)]) is None
+
+
+def test_subscriber_gets_snapshot_then_deltas():
+    payloads = {'price': {'price': 2650.0, 'change': 1.0}}
+    hub = FeedHub({'price': lambda _: payloads['price']})
+    session = hub.connect()
+    hub.subscribe(session, 'price')
+
+    assert drain(session) == [('resync', 'price')]
+    snapshot = json.loads(hub.snapshot_message('price'))
+    assert snapshot == {'type': 'snapshot', 'topic': 'price', 'seq': 1,
+                        'data': {'price': 2650.0, 'change': 1.0}}
+
+    hub.publish('price', {'price': 2651.0, 'change': 1.0})
+    hub.publish('price', {'price': 2651.0, 'change': 1.0})  # unchanged: nothing sent
+    (kind, message), = drain(session)
+    assert kind == 'message'
+    assert json.loads(message) == {'type': 'delta', 'topic': 'price', 'seq': 2,
+                                   'changes': {'price': 2651.0}}
+
+
+def test_historical_topic_sends_bar_deltas():
+    hub = FeedHub({'historical': lambda period: {'period': period, 'prices': [bar('2024-01-01', 1.0)]}})
+    session = hub.connect()
+    hub.subscribe(session, 'historical:1M')
+    drain(session)
+    hub.snapshot_message('historical:1M')
+
+    hub.publish('historical:1M', {'period': '1M', 'prices': [bar('2024-01-01', 1.0), bar('2024-01-02', 2.0)]})
+    (_, message), = drain(session)
+    assert json.loads(message) == {'type': 'delta', 'topic': 'historical:1M', 'seq': 2,
+                                   'drop_first': 0, 'update_last': None,
+                                   'append': [bar('2024-01-02', 2.0)]}
+
+
+def test_slow_client_is_resynced_instead_of_blocking():
+    """Overflowing a client's queue discards its backlog and schedules a snapshot"""
+    hub = FeedHub({'price': lambda _: {'price': 0}})
+    slow = hub.connect(max_queue=3)
+    fast = hub.connect(max_queue=100)
+    for session in (slow, fast):
+        hub.subscribe(session, 'price')
+        drain(session)
+    hub.snapshot_message('price')
+
+    for price in range(1, 11):
+        hub.publish('price', {'price': price})
+
+    assert len(drain(fast)) == 10
+    assert drain(slow) == [('resync', 'price')]
+    assert json.loads(hub.snapshot_message('price'))['data'] == {'price': 10}
+    assert hub.get_metrics()['dropped_messages'] > 0
+
+
+def test_topic_arguments_are_validated():
+    hub = FeedHub({'price': lambda _: {}, 'historical': lambda period: {'prices': []}},
+                  arguments={'historical': lambda argument: argument in ('1M', '1Y')})
+    assert hub.valid_topic('price') and hub.valid_topic('historical:1M')
+    assert not hub.valid_topic('price:extra')
+    assert not hub.valid_topic('historical:1000Y') and not hub.valid_topic('historical')
+    assert not hub.valid_topic('news') and not hub.valid_topic(['price'])
+
+
+def test_removed_fields_are_sent_and_idle_topics_dropped():
+    hub = FeedHub({'price': lambda _: {'price': 2650.0, 'message': 'stale'}})
+    session = hub.connect()
+    hub.subscribe(session, 'price')
+    drain(session)
+    hub.snapshot_message('price')
+
+    hub.publish('price', {'price': 2650.0})
+    (_, message), = drain(session)
+    assert json.loads(message) == {'type': 'delta', 'topic': 'price', 'seq': 2, 'changes': {}, 'removed': ['message']}
+
+    hub.unsubscribe(session, 'price')
+    hub.publish('price', {'price': 2651.0})
+    assert hub.get_metrics()['topics'] == {}
+    hub.subscribe(session, 'price')
+    hub.disconnect(session)
+    assert hub.get_metrics()['topics'] == {}
@@ -0,0 +1,68 @@
+"""
+Synthetic bar series and fake upstreams shared by the tests
+"""
+
+import numpy as np
+
+from bar_store import BarSeries
+
+DAY = 86400
+START = 1704175200  # 2024-01-02 06:00 UTC
+
+
+def make_bars(first_day, count, base=2000.0):
+    """Daily bars from START + first_day whose close rises by 1 per day from base"""
+    timestamp = START + np.arange(first_day, first_day + count) * DAY
+    close = base + np.arange(first_day, first_day + count, dtype=float)
+    return BarSeries(timestamp, close - 1, close + 2, close - 2, close, np.full(count, 100))
+
+
+def random_walk(count, seed=7):
+    """(high, low, close) of a reproducible random walk around 2000"""
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 8, count))
+    high = close + rng.uniform(0, 10, count)
+    low = close - rng.uniform(0, 10, count)
+    return high, low, close
+
+
+def make_series(high, low, close, first_day=0):
+    """Daily BarSeries from START + first_day over the given columns"""
+    timestamp = START + (np.arange(len(close)) + first_day) * DAY
+    return BarSeries(timestamp, close, high, low, close, np.zeros(len(close)))
+
+
+def stream(indicator, *columns):
+    """Feed the columns row by row to a streaming indicator, collecting its values"""
+    values = []
+    for row in zip(*columns):
+        indicator.update(*row)
+        values.append(indicator.value)
+    return values
+
+
+class FakeUpstream:
+    """Serves a fixed daily history and records every request"""
+
+    def __init__(self, total_days):
+        self.bars = make_bars(0, total_days)
+        self.requests = []
+
+    def __call__(self, symbol, interval, start=None, period=None):
+        self.requests.append({'start': start, 'period': period})
+        if start is None:
+            return self.bars
+        start_ts = int(np.datetime64(start, 's').astype(np.int64))
+        return self.bars.since(start_ts - 1)
+
+
+class FakeBatchUpstream:
+    """Serves the same history for every symbol and records each batch request"""
+
+    def __init__(self, total_days):
+        self.upstream = FakeUpstream(total_days)
+        self.requests = []
+
+    def __call__(self, symbols, interval, start=None, period=None):
+        self.requests.append({'symbols': list(symbols), 'start': start, 'period': period})
+        return {symbol: self.upstream(symbol, interval, start=start, period=period) for symbol in symbols}
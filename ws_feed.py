@@ -0,0 +1,309 @@
+"""
+WebSocket price feed with per-client topic subscriptions and delta encoding
+Clients subscribe to `price`, `stats` and `historical:<period>` topics. After an
+initial snapshot they only receive what changed: updated and removed fields for
+price/stats, and appended / updated / dropped bars for historical series.
+Topics are only kept while someone is subscribed to them.
+
+Every message carries a per-topic `seq`; clients apply deltas in order and
+ignore any delta whose seq is not newer than their latest snapshot.
+
+Messages are encoded once and shared by all subscribers. Each client has a
+bounded outbound queue drained by its own sender; if a slow client falls behind,
+its queue is discarded and it is resynced with fresh snapshots, so it never
+stalls the broadcaster or receives an inconsistent delta sequence.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':'))
+
+
+def diff_fields(previous, current):
+    """Fields of a flat-ish dict payload whose values changed or were added"""
+    return {key: value for key, value in current.items() if key not in previous or previous[key] != value}
+
+
+def removed_fields(previous, current):
+    """Fields present in previous but gone from current, sorted"""
+    return sorted(key for key in previous if key not in current)
+
+
+def diff_bars(previous, current):
+    """Describe how a sliding bar window changed, or None if only a snapshot will do
+
+    Returns {'drop_first': n, 'update_last': bar or None, 'append': [bars]} where
+    bars are the dicts of the historical endpoint's `prices` list.
+    """
+    if not previous or not current:
+        return None
+    first_dates = {bar['date']: index for index, bar in enumerate(previous)}
+    drop_first = first_dates.get(current[0]['date'])
+    if drop_first is None:
+        return None
+
+    # Locate the previously last bar in the new window; everything after it is new
+    last_date = previous[-1]['date']
+    last_index = len(previous) - 1 - drop_first
+    if last_index >= len(current) or current[last_index]['date'] != last_date:
+        return None
+    return {
+        'drop_first': drop_first,
+        'update_last': current[last_index] if current[last_index] != previous[-1] else None,
+        'append': current[last_index + 1:]
+    }
+
+
+class ClientSession:
+    """One connected client: its topics and a bounded outbound queue"""
+
+    def __init__(self, max_queue=64):
+        self.topics = set()
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._resync = set()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def offer(self, topic, message):
+        """Queue a message without blocking; on overflow fall back to a resync"""
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.max_queue:
+                # Too slow to keep up: discard the backlog and resend snapshots instead
+                self.dropped += len(self._queue)
+                self._queue.clear()
+                self._resync.update(self.topics)
+            elif topic not in self._resync:
+                self._queue.append(message)
+            self._cond.notify()
+
+    def request_resync(self, topic):
+        with self._cond:
+            self._resync.add(topic)
+            self._cond.notify()
+
+    def next_item(self, timeout=None):
+        """Block until there is something to send: ('message', text) or ('resync', topic)"""
+        with self._cond:
+            while not self.closed and not self._queue and not self._resync:
+                if not self._cond.wait(timeout):
+                    return None
+            if self.closed:
+                return None
+            if self._resync:
+                return 'resync', self._resync.pop()
+            return 'message', self._queue.popleft()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class _Topic:
+    def __init__(self):
+        self.payload = None
+        self.seq = 0
+        self.snapshot_message = None
+
+
+class FeedHub:
+    """Tracks topic state, computes deltas and fans messages out to sessions"""
+
+    def __init__(self, loaders, arguments=None):
+        # loaders: topic prefix -> callable(argument) returning the current payload
+        # arguments: topic prefix -> callable(argument) -> bool, for prefixes that
+        # take a `prefix:argument`; the others accept no argument
+        self.loaders = loaders
+        self.arguments = arguments or {}
+        self._topics = {}
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def valid_topic(self, topic):
+        if not isinstance(topic, str):
+            return False
+        prefix, _, argument = topic.partition(':')
+        if prefix not in self.loaders:
+            return False
+        if prefix not in self.arguments:
+            return not argument
+        return self.arguments[prefix](argument or None)
+
+    def load(self, topic):
+        prefix, _, argument = topic.partition(':')
+        return self.loaders[prefix](argument or None)
+
+    def connect(self, max_queue=64):
+        session = ClientSession(max_queue)
+        with self._lock:
+            self._sessions.add(session)
+        return session
+
+    def disconnect(self, session):
+        session.close()
+        with self._lock:
+            self._sessions.discard(session)
+            self._prune(session.topics)
+
+    def subscribe(self, session, topic):
+        with self._lock:
+            session.topics.add(topic)
+            self._topics.setdefault(topic, _Topic())
+        session.request_resync(topic)
+
+    def unsubscribe(self, session, topic):
+        with self._lock:
+            session.topics.discard(topic)
+            self._prune((topic,))
+
+    def _prune(self, topics):
+        """Forget the state of topics nobody subscribes to any more (call with the lock held)"""
+        for topic in topics:
+            if not any(topic in s.topics for s in self._sessions):
+                self._topics.pop(topic, None)
+
+    def active_topics(self):
+        """Topics with at least one subscriber"""
+        with self._lock:
+            return {topic for session in self._sessions for topic in session.topics}
+
+    def snapshot_message(self, topic):
+        """Encoded full snapshot of a topic, loading it on first use"""
+        with self._lock:
+            state = self._topics.get(topic)
+        payload = None
+        if state is None or state.payload is None:
+            payload = self.load(topic)
+            self.publish(topic, payload)
+        with self._lock:
+            state = self._topics.get(topic)
+            if state is None:  # Unsubscribed meanwhile; nothing to keep
+                return encode({'type': 'snapshot', 'topic': topic, 'seq': 0, 'data': payload})
+            if state.snapshot_message is None:
+                state.snapshot_message = encode({'type': 'snapshot', 'topic': topic,
+                                                 'seq': state.seq, 'data': state.payload})
+            return state.snapshot_message
+
+    def publish(self, topic, payload):
+        """Record a new payload for topic and send subscribers the delta"""
+        with self._lock:
+            subscribers = [s for s in self._sessions if topic in s.topics]
+            if not subscribers:
+                return
+            state = self._topics.setdefault(topic, _Topic())
+            if payload is state.payload or payload == state.payload:
+                return
+            previous, state.payload = state.payload, payload
+            state.seq += 1
+            state.snapshot_message = None
+            seq = state.seq
+        if previous is None:
+            return
+
+        if topic.startswith('historical:'):
+            delta = diff_bars(previous.get('prices'), payload.get('prices'))
+            if delta is None:
+                for session in subscribers:
+                    session.request_resync(topic)
+                return
+            message = {'type': 'delta', 'topic': topic, 'seq': seq, **delta}
+        else:
+            message = {'type': 'delta', 'topic': topic, 'seq': seq,
+                       'changes': diff_fields(previous, payload)}
+            removed = removed_fields(previous, payload)
+            if removed:
+                message['removed'] = removed
+
+        encoded = encode(message)
+        for session in subscribers:
+            session.offer(topic, encoded)
+
+    def refresh_active(self, skip=()):
+        """Reload every subscribed topic and publish whatever changed"""
+        for topic in self.active_topics():
+            if topic in skip:
+                continue
+            try:
+                self.publish(topic, self.load(topic))
+            except Exception as e:
+                print(f"Error refreshing feed topic {topic}: {e}")
+
+    def start_refresher(self, interval, skip=()):
+        """Periodically refresh subscribed topics that have no push source"""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.refresh_active(skip)
+
+        self._refresher = threading.Thread(target=run, name='ws-feed-refresher', daemon=True)
+        self._refresher.start()
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                'clients': len(self._sessions),
+                'topics': {topic: state.seq for topic, state in self._topics.items()},
+                'dropped_messages': sum(s.dropped for s in self._sessions)
+            }
+
+
+def serve_client(hub, ws, max_queue=64):
+    """Run one WebSocket connection: a sender thread drains the queue while this
+    thread handles subscribe/unsubscribe commands"""
+    session = hub.connect(max_queue)
+
+    def sender():
+        try:
+            while True:
+                item = session.next_item()
+                if item is None:
+                    return
+                kind, value = item
+                if kind == 'resync':
+                    try:
+                        value = hub.snapshot_message(value)
+                    except Exception as e:
+                        print(f"Error loading feed topic {value}: {e}")
+                        value = encode({'type': 'error', 'message': f'Topic unavailable: {value}'})
+                ws.send(value)
+        except Exception:
+            session.close()
+
+    thread = threading.Thread(target=sender, name='ws-sender', daemon=True)
+    thread.start()
+    try:
+        while not session.closed:
+            raw = ws.receive()
+            if raw is None:
+                break
+            try:
+                command = json.loads(raw)
+                action = command.get('action')
+                topics = command.get('topics') or []
+            except (ValueError, AttributeError):
+                session.offer(None, encode({'type': 'error', 'message': 'Invalid JSON command'}))
+                continue
+
+            for topic in topics:
+                if not hub.valid_topic(topic):
+                    session.offer(None, encode({'type': 'error', 'message': f'Unknown topic: {topic}'}))
+                elif action == 'subscribe':
+                    hub.subscribe(session, topic)
+                elif action == 'unsubscribe':
+                    hub.unsubscribe(session, topic)
+    finally:
+        hub.disconnect(session)
+        thread.join(timeout=1)